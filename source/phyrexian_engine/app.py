@@ -1,30 +1,63 @@
-import threading, random, os, traceback
+import threading, os, sqlite3, time, traceback
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 
+from . import instrument
 from .models import SetSpec, CardSet, COLORS
-from .generation.distribution import plan_types
-from .generation.cardgen import generate_card
-from .generation.templates import load_packages
-from .llm.ollama_client import name_art_flavor
-from .exporters.json_exporter import export_json
-from .exporters.csv_exporter import export_csv
-from .exporters.mse_exporter import export_mse
+from .generation.library import PackageLibrary
+from .generation.manifest import PackageManifest, SORT_KEYS, filter_packs, sort_packs
+from .generation.dedup import DuplicateIndex
+from .pipeline import PKG_DIR, resolve_seed, plan_set, reroll_card, check_llm, enrich_card, run_pipeline
+from .llm.cache import ResponseCache
+from .llm.backends import default_recording_path, make_backend
+from .table_view import VirtualTable
+from .exporters.fanout import WRITERS, export_all
 
 APP_TITLE = "Phyrexian Engine"
-PKG_DIR = os.path.join(os.path.dirname(__file__), "packages")
+
+# Backend choices in the LLM frame -> (llm.backends kind, recording mode)
+LLM_BACKENDS = {"Ollama": ("ollama", None), "Mock (offline)": ("mock", None),
+                "Ollama, recording": ("ollama", "record"), "Replay recording": ("ollama", "replay")}
+
+# "Export All" choices: format -> (label, file extension)
+EXPORT_FORMATS = {fmt: (label, WRITERS[fmt][0]) for fmt, label in
+                  (("json", "JSON"), ("csv", "CSV"), ("mse", "MSE"), ("sqlite", "SQLite"))}
+
+# Workers post rows and progress to a mailbox; the UI applies them this often (ms)
+TICK_MS = 100
+# How often package files are checked for edits while idle (ms)
+POLL_MS = 1500
 
 class App(tk.Tk):
     def __init__(self):
         super().__init__()
         self.title(APP_TITLE)
         self.geometry("1100x760")
+        self._rows = []
+        self._feed_lock = threading.Lock()
+        self._feed_rows = []
+        self._feed_dirty = set()
+        self._feed_progress = None
+        self._feed_packages = None  # (list changed, reloaded names) from the last package poll
+        self._poll_thread = None
+        self._busy = False
+        self._tick_id = None
+        self.manifest = PackageManifest(PKG_DIR)
+        # parsed packs stay in memory; selection changes and edits only touch what changed
+        self.library = PackageLibrary(PKG_DIR)
+        self._pack_rows = []      # package names in listbox order
+        self._pack_selection = set()  # selected names, including ones the filter hides
+        self._export_formats = {}     # "Export All" choices, kept between exports
+        self._export_dir = None
         self._build_ui()
 
         # initial population of package list
         self.refresh_package_list()
 
         self.card_set = None
+        self.metrics = None  # instrument.Metrics of the last generation
+        self._llm_cache = None
+        self.after(POLL_MS, self._poll_packages)
 
     def _build_ui(self):
         top = ttk.Frame(self, padding=8); top.pack(fill='x')
@@ -42,6 +75,11 @@ class App(tk.Tk):
         self.ent_total = ttk.Entry(top, width=7); self.ent_total.insert(0, "120")
         self.ent_total.grid(row=0, column=5, sticky='w', padx=6)
 
+        # Seed: blank = new random set; reuse a seed to get the same set back
+        ttk.Label(top, text="Seed").grid(row=0, column=6, sticky='w')
+        self.ent_seed = ttk.Entry(top, width=20)
+        self.ent_seed.grid(row=0, column=7, sticky='w', padx=6)
+
         # Colors toggles
         COLORS_LIST = COLORS
         self.color_vars = {c: tk.BooleanVar(value=c in ['W','U','B','R','G']) for c in COLORS_LIST}
@@ -59,6 +97,14 @@ class App(tk.Tk):
             text="Commander Mode (Legendary Creatures Only)",
             variable=self.commander_mode
         ).grid(row=1, column=1, columnspan=4, sticky='w', pady=(4, 0))
+        # hit the type/rarity/curve weights exactly instead of sampling them
+        self.exact_quotas = tk.BooleanVar(value=False)
+        ttk.Checkbutton(colf, text="Exact quotas", variable=self.exact_quotas).grid(
+            row=1, column=5, columnspan=3, sticky='w', pady=(4, 0))
+        # re-roll cards whose rules text repeats (or nearly repeats) an earlier card's
+        self.avoid_duplicates = tk.BooleanVar(value=True)
+        ttk.Checkbutton(colf, text="Avoid duplicates", variable=self.avoid_duplicates).grid(
+            row=1, column=8, columnspan=3, sticky='w', pady=(4, 0))
 
 
         # Description
@@ -77,6 +123,20 @@ class App(tk.Tk):
         self.ent_host.grid(row=0, column=3, sticky='w', padx=6)
         self.chk_use_llm = tk.BooleanVar(value=True)
         ttk.Checkbutton(llm, text="Use LLM for name/art/flavor", variable=self.chk_use_llm).grid(row=0, column=4, padx=8)
+        ttk.Label(llm, text="Parallel requests").grid(row=0, column=5, sticky='w')
+        self.spn_parallel = ttk.Spinbox(llm, from_=1, to=32, width=4); self.spn_parallel.set(4)
+        self.spn_parallel.grid(row=0, column=6, sticky='w', padx=6)
+        ttk.Label(llm, text="Cards per request").grid(row=0, column=7, sticky='w')
+        self.spn_batch = ttk.Spinbox(llm, from_=1, to=16, width=4); self.spn_batch.set(1)
+        self.spn_batch.grid(row=0, column=8, sticky='w', padx=6)
+        # where name/art/flavor come from: Ollama, an offline mock, or a recording of Ollama's replies
+        ttk.Label(llm, text="Backend").grid(row=1, column=0, sticky='w', pady=(4, 0))
+        self.cmb_backend = ttk.Combobox(llm, values=list(LLM_BACKENDS), width=16, state='readonly')
+        self.cmb_backend.set(next(iter(LLM_BACKENDS)))
+        self.cmb_backend.grid(row=1, column=1, sticky='w', padx=6, pady=(4, 0))
+        ttk.Label(llm, text="Recording").grid(row=1, column=2, sticky='w', pady=(4, 0))
+        self.ent_recording = ttk.Entry(llm, width=40); self.ent_recording.insert(0, default_recording_path())
+        self.ent_recording.grid(row=1, column=3, columnspan=4, sticky='we', padx=6, pady=(4, 0))
 
         # Packages
         pkgf = ttk.Labelframe(self, text="Packages (.json in packages/)", padding=8); pkgf.pack(fill='both', expand=False)
@@ -86,8 +146,29 @@ class App(tk.Tk):
         bar.pack(side='top', fill='x', pady=(0,6))
         ttk.Button(bar, text="Select All", command=self._select_all_packages).pack(side='left')
         ttk.Button(bar, text="Deselect All", command=self._deselect_all_packages).pack(side='left', padx=6)
-
+        ttk.Button(bar, text="Rescan", command=self.refresh_package_list).pack(side='left')
+
+        # Filter / sort by manifest metadata (name text, colors, card type)
+        ttk.Label(bar, text="Filter").pack(side='left', padx=(18, 4))
+        self.pack_filter = tk.StringVar()
+        ttk.Entry(bar, textvariable=self.pack_filter, width=16).pack(side='left')
+        ttk.Label(bar, text="Colors").pack(side='left', padx=(10, 4))
+        self.pack_colors = tk.StringVar()
+        ttk.Entry(bar, textvariable=self.pack_colors, width=7).pack(side='left')
+        ttk.Label(bar, text="Type").pack(side='left', padx=(10, 4))
+        self.pack_type = tk.StringVar()
+        self.cmb_pack_type = ttk.Combobox(bar, textvariable=self.pack_type, width=13, state='readonly')
+        self.cmb_pack_type.pack(side='left')
+        ttk.Label(bar, text="Sort").pack(side='left', padx=(10, 4))
+        self.pack_sort = tk.StringVar(value=SORT_KEYS[0])
+        ttk.Combobox(bar, textvariable=self.pack_sort, values=SORT_KEYS, width=10, state='readonly').pack(side='left')
+        for var in (self.pack_filter, self.pack_colors, self.pack_type, self.pack_sort):
+            var.trace_add('write', lambda *_: self._show_packages())
+
+        self.lbl_pack = ttk.Label(pkgf, text="", foreground='gray')
+        self.lbl_pack.pack(side='bottom', fill='x', pady=(6, 0))
         self.lb = tk.Listbox(pkgf, selectmode='multiple', height=6, exportselection=False)
+        self.lb.bind('<<ListboxSelect>>', self._on_package_select)
 
         self.lb.pack(side='left', fill='both', expand=True)
         ttk.Scrollbar(pkgf, orient='vertical', command=self.lb.yview).pack(side='right', fill='y')
@@ -98,36 +179,101 @@ class App(tk.Tk):
         ttk.Button(btnf, text="Export JSON", command=self.on_export_json).pack(side='left', padx=(12,0))
         ttk.Button(btnf, text="Export CSV", command=self.on_export_csv).pack(side='left', padx=6)
         ttk.Button(btnf, text="Export MSE (.mse-set)", command=self.on_export_mse).pack(side='left')
+        ttk.Button(btnf, text="Export SQLite", command=self.on_export_sqlite).pack(side='left', padx=(6,0))
+        ttk.Button(btnf, text="Export All...", command=self.on_export_all).pack(side='left', padx=(6,0))
+        ttk.Button(btnf, text="Save Metrics", command=self.on_save_metrics).pack(side='left', padx=6)
+        self.btn_reroll = ttk.Button(btnf, text="Re-roll Selected", command=self.on_reroll); self.btn_reroll.pack(side='left', padx=(12,0))
         self.prog = ttk.Progressbar(btnf, length=260, mode='determinate'); self.prog.pack(side='left', padx=12)
         self.lbl = ttk.Label(btnf, text="Idle."); self.lbl.pack(side='left')
 
         # Table of generated cards
         table = ttk.Frame(self, padding=8); table.pack(fill='both', expand=True)
         cols = ["#", "Name", "TypeLine", "MV", "Cost", "Rarity", "P/T", "Rules"]
-        self.tree = ttk.Treeview(table, columns=cols, show='headings', height=18)
+        # only the rows on screen exist as Tk items; values come from self._rows
+        self.table = VirtualTable(table, cols, lambda pos: self._row_values(pos + 1, self._rows[pos]))
+        self.tree = self.table.tree
         for c in cols: self.tree.heading(c, text=c)
         self.tree.column("#", width=40, anchor='center'); self.tree.column("Name", width=220)
         self.tree.column("TypeLine", width=220); self.tree.column("MV", width=40, anchor='center')
         self.tree.column("Cost", width=60, anchor='center'); self.tree.column("Rarity", width=70, anchor='center')
         self.tree.column("P/T", width=60, anchor='center'); self.tree.column("Rules", width=520)
-        self.tree.pack(side='left', fill='both', expand=True)
-        ttk.Scrollbar(table, orient='vertical', command=self.tree.yview).pack(side='right', fill='y')
+        self.table.pack(fill='both', expand=True)
 
     # --- data helpers ---
     def refresh_package_list(self):
+        """Rescan the packages folder; only new or edited packs are read (see PackageManifest)."""
+        self.manifest.refresh()
+        self._packages_changed()
+
+    def _packages_changed(self):
+        packs = self.manifest.list()
+        self._pack_selection &= set(self.manifest.packs)
+        self.cmb_pack_type.configure(values=[""] + sorted({t for p in packs for t in p.types}))
+        self._show_packages()
+
+    def _show_packages(self):
+        """Fill the listbox from the manifest with the current filter and sort."""
+        packs = filter_packs(self.manifest.list(), self.pack_filter.get(), self.pack_colors.get(), self.pack_type.get())
+        packs = sort_packs(packs, self.pack_sort.get() or "name", reverse=self.pack_sort.get() != "name")
+        self.lb.configure(state='normal')
         self.lb.delete(0, 'end')
-        try:
-            files = [f for f in os.listdir(PKG_DIR) if f.lower().endswith('.json')]
-        except FileNotFoundError:
-            files = []
-        files = sorted(files)
-        if not files:
+        self._pack_rows = [p.name for p in packs]
+        if not self.manifest.packs:
             self.lb.insert('end', "<no packages found> (put .json files in the folder above)")
             self.lb.configure(state='disabled')
-        else:
-            self.lb.configure(state='normal')
-            for f in files:
-                self.lb.insert('end', f)
+        for k, p in enumerate(packs):
+            self.lb.insert('end', p.summary())
+            if p.name in self._pack_selection:
+                self.lb.selection_set(k)
+        self._show_pack_status()
+
+    def _on_package_select(self, event=None):
+        shown = set(self._pack_rows)
+        picked = {self._pack_rows[i] for i in self.lb.curselection()}
+        self._pack_selection = (self._pack_selection - shown) | picked
+        active = self.lb.index('active') if self._pack_rows else None
+        info = self.manifest.get(self._pack_rows[active]) if active is not None and active < len(self._pack_rows) else None
+        self._show_pack_status(info)
+
+    def _show_pack_status(self, info=None):
+        hidden = len(self._pack_selection - set(self._pack_rows))
+        text = f"{len(self._pack_selection)} of {len(self.manifest.packs)} packages selected"
+        if hidden:
+            text += f" ({hidden} hidden by the filter)"
+        if info is not None:
+            text += f"  |  {info.name}: {info.details()}"
+        self.lbl_pack.config(text=text)
+
+    def _poll_packages(self):
+        """Pick up added, removed and edited package files without a restart."""
+        polling = self._poll_thread
+        if polling is not None and polling.is_alive():
+            # check back soon for its result
+            self.after(TICK_MS, self._poll_packages)
+            return
+        if polling is not None:
+            self._poll_thread = None
+            self._drain()
+        elif not self._busy:
+            self._poll_thread = threading.Thread(target=self._poll_worker, args=(sorted(self._pack_selection),),
+                                                 name="poll-packages", daemon=True)
+            self._poll_thread.start()
+            self.after(TICK_MS, self._poll_packages)
+            return
+        self.after(POLL_MS, self._poll_packages)
+
+    def _poll_worker(self, selection):
+        # stats, parsing and composing stay off the Tk thread; _drain shows the result
+        names = set(self.manifest.packs)
+        self.manifest.refresh()
+        listing = bool(self.manifest.described) or names != set(self.manifest.packs)
+        # poll before select: select() would reload the edited packs without saying so
+        reloaded = self.library.poll()
+        # keep the merged view in step with the selection so Generate starts at once
+        self.library.select(selection)
+        if listing or reloaded:
+            with self._feed_lock:
+                self._feed_packages = (listing, reloaded)
 
     def _gather_spec(self) -> SetSpec:
         name = self.ent_name.get().strip() or "New Set"
@@ -136,10 +282,13 @@ class App(tk.Tk):
             total = int(self.ent_total.get().strip())
         except Exception:
             total = 120
+        try:
+            seed = int(self.ent_seed.get().strip())
+        except ValueError:
+            seed = None
         colors = [c for c,v in self.color_vars.items() if v.get()]
         desc = self.txt_desc.get('1.0', 'end').strip()
-        sel = [self.lb.get(i) for i in self.lb.curselection() if self.lb.get(i).endswith('.json')]
-        selected_packages = [os.path.splitext(s)[0] for s in sel]
+        selected_packages = sorted(self._pack_selection)
         spec = SetSpec(
             name=name,
             code=code,
@@ -150,22 +299,114 @@ class App(tk.Tk):
             description=desc,
             selected_packages=selected_packages,
             commander_mode=self.commander_mode.get(),
+            seed=seed,
         )
         return spec
 
-    # --- thread-safe UI helpers ---
-    def _insert_row(self, idx, card):
+    def _cache(self):
+        """The shared LLM reply cache, opened on first use (None if it cannot be opened)."""
+        if self._llm_cache is None:
+            try:
+                self._llm_cache = ResponseCache()
+            except (OSError, sqlite3.Error):
+                traceback.print_exc()
+        return self._llm_cache
+
+    def _llm_settings(self):
+        """(use_llm, model, host, parallel, batch, cache, backend) read on the main thread for a worker."""
+        try:
+            parallel = max(1, int(self.spn_parallel.get()))
+        except ValueError:
+            parallel = 1
+        try:
+            batch = max(1, int(self.spn_batch.get()))
+        except ValueError:
+            batch = 1
+        use_llm = self.chk_use_llm.get()
+        model, host = self.ent_model.get().strip(), self.ent_host.get().strip()
+        cache = backend = None
+        if use_llm:
+            kind, mode = LLM_BACKENDS.get(self.cmb_backend.get(), ("ollama", None))
+            path = self.ent_recording.get().strip() or default_recording_path()
+            backend = make_backend(kind, model, host, record=path if mode == "record" else None,
+                                   replay=path if mode == "replay" else None)
+            # mock replies are free, and recording or replaying must bypass the reply cache
+            cache = self._cache() if kind == "ollama" and mode is None else None
+        return use_llm, model, host, parallel, batch, cache, backend
+
+    def _row_values(self, idx, card):
         pt = f"{card.power}/{card.toughness}" if (getattr(card, 'power', None) is not None and getattr(card, 'toughness', None) is not None) else ""
-        self.tree.insert('', 'end', values=(idx, getattr(card,'name',"") or "", card.typeline(), getattr(card,'mana_value',""), getattr(card,'mana_cost',""), getattr(card,'rarity',""), pt, getattr(card,'rules_text',"")))
+        return (idx, getattr(card,'name',"") or "", card.typeline(), getattr(card,'mana_value',""), getattr(card,'mana_cost',""), getattr(card,'rarity',""), pt, getattr(card,'rules_text',""))
+
+    # --- worker -> UI mailbox (any thread); _drain applies it on the main thread ---
+    def _post_row(self, idx, card):
+        with self._feed_lock:
+            self._feed_rows.append((idx, card))
+
+    def _post_update(self, idx):
+        with self._feed_lock:
+            self._feed_dirty.add(idx)
+
+    def _post_progress(self, val, text=None):
+        # only the latest progress matters
+        with self._feed_lock:
+            self._feed_progress = (val, text)
+
+    def _drain(self):
+        with self._feed_lock:
+            rows, self._feed_rows = self._feed_rows, []
+            dirty, self._feed_dirty = self._feed_dirty, set()
+            progress, self._feed_progress = self._feed_progress, None
+            packages, self._feed_packages = self._feed_packages, None
+        if rows:
+            rows.sort(key=lambda r: r[0])
+            for idx, card in rows:
+                if idx > len(self._rows):
+                    self._rows.append(card)
+                else:
+                    self._rows[idx - 1] = card
+            self.table.set_count(len(self._rows))
+        if dirty:
+            self.table.refresh_rows(i - 1 for i in dirty)
+        if progress is not None:
+            self._set_progress(*progress)
+        if packages is not None:
+            listing, reloaded = packages
+            if listing:
+                self._packages_changed()
+            if reloaded:
+                self.lbl.config(text=f"Reloaded {', '.join(reloaded)}.")
+
+    def _tick(self):
+        self._tick_id = None
+        self._drain()
+        if self._busy:
+            self._tick_id = self.after(TICK_MS, self._tick)
+
+    def _start_ticking(self):
+        self._busy = True
+        if self._tick_id is None:
+            self._tick_id = self.after(TICK_MS, self._tick)
+
+    def _stop_ticking(self):
+        self._busy = False
+        self._drain()
 
     def _set_progress(self, val, text=None):
         self.prog.config(value=val)
         if text is not None:
             self.lbl.config(text=text)
 
-    def _finish(self):
-        self.btn_gen.config(state='normal')
-        self.lbl.config(text="Done.")
+    def _finish(self, breaker=None, metrics=None):
+        self._stop_ticking()
+        self.btn_gen.config(state='normal'); self.btn_reroll.config(state='normal')
+        text = f"Done. Seed {self.card_set.spec.seed}."
+        if breaker is not None and breaker.degraded:
+            text += f" {breaker.degraded} card(s) got placeholder text ({breaker.last_error})."
+        if metrics is not None:
+            self.metrics = metrics
+            text += f"  {metrics.report()['wall_s']:.2f}s: {metrics.summary()}"
+        self.lbl.config(text=text)
 
     # --- handlers ---
     def on_generate(self):
@@ -173,126 +414,238 @@ class App(tk.Tk):
         if not spec.selected_packages:
             if not messagebox.askyesno("No packages selected", "Proceed with no packages? (Only minimal defaults will be used)"):
                 return
-        self.btn_gen.config(state='disabled'); self.prog.config(value=0, maximum=spec.total_cards)
-        self.lbl.config(text="Generating..."); self.tree.delete(*self.tree.get_children())
-        threading.Thread(target=self._worker, args=(spec,), daemon=True).start()
-
-    def _worker(self, spec: SetSpec):
+        self.btn_gen.config(state='disabled'); self.btn_reroll.config(state='disabled')
+        self.prog.config(value=0, maximum=spec.total_cards)
+        self.lbl.config(text="Generating...")
+        self._rows = []; self.table.clear()
+        self._start_ticking()
+        threading.Thread(target=self._worker, args=(spec, self._llm_settings(), self.exact_quotas.get(),
+                                                    self.avoid_duplicates.get()), daemon=True).start()
+
+    def _worker(self, spec: SetSpec, llm, exact: bool = False, avoid_duplicates: bool = True):
+        use_llm, model, host, parallel, batch, cache, backend = llm
+        # stage times, template and LLM stats for the status bar and "Save Metrics"
+        metrics = instrument.enable()
         try:
-            random.seed(None)
-            effects, subtypes_pool, string_pools, monster_keywords = load_packages(PKG_DIR, spec.selected_packages)
-            types = plan_types(spec)
-            cards = []
-            for i, ctype in enumerate(types, start=1):
-                # schedule progress update on main thread
-                self.after(0, self._set_progress, i, f"Generating {i}/{len(types)}...")
-
-                if spec.commander_mode:
-                    # Commander Mode: 0–5 colors, biased towards multicolor
-                    all_cols = spec.colors or ['W','U','B','R','G']
-
-                    # weights: mostly 2–3 colors, some mono, some 4–5, rare colorless
-                    choices = [0, 1, 2, 3, 4, 5]          # # of colors
-                    weights = [1, 3, 6, 6, 3, 2]          # tweak as desired
-
-                    k = random.choices(choices, weights=weights, k=1)[0]
-                    k = min(k, len(all_cols))            # don't exceed allowed colors
-
-                    if k <= 0:
-                        colors = []                      # colorless commander (weird but allowed)
-                    else:
-                        colors = random.sample(all_cols, k=k)
-                else:
-                    # existing non-commander logic                
-                    # Determine color identity for this card with proper distribution.
-                    if ctype == 'Land':
-                        # Lands are colorless identity for cost purposes (no cost anyway)
-                        colors = []
-                    else:
-                        # Artifacts / Equipment: 80% chance to be colorless
-                        if ctype in ('Artifact', 'Equipment') and spec.include_artifacts and random.random() < 0.80:
-                            colors = []
-                        else:
-                            # 15% chance to be multicolor (only if at least 2 colors available)
-                            can_multicolor = len(spec.colors) >= 2
-                            if can_multicolor and random.random() < 0.15:
-                                pick_n = min(2, len(spec.colors))
-                                colors = random.sample(spec.colors, k=pick_n)
-                            else:
-                                # Otherwise pick ONE mono color or colorless with equal weight
-                                # Build options = each allowed color + 'colorless'
-                                opts = list(spec.colors) + ['colorless']
-                                choice = random.choice(opts) if opts else 'colorless'
-                                if choice == 'colorless':
-                                    colors = []
-                                else:
-                                    colors = [choice]
-
-
-                card = generate_card(f"C{i}", colors, ctype, spec, effects, subtypes_pool, string_pools, monster_keywords)
-                if self.chk_use_llm.get():
-                    pt = f"{card.power}/{card.toughness}" if (getattr(card,'power',None) is not None and getattr(card,'toughness',None) is not None) else None
-                    subline = " ".join(card.subtypes) if getattr(card,'subtypes',None) else ""
-                    res = name_art_flavor(spec.description, card.rules_text, subline, pt, model=self.ent_model.get().strip(), host=self.ent_host.get().strip())
-                    card.name = res.get('name'); card.art_description = res.get('art'); card.flavor_text = res.get('flavor')
-                else:
-                    card.name = f"{ctype} {i}"
-                    card.art_description = "A scene matching the card's color and effect."
-                cards.append(card)
-
-                # schedule row insert on main thread
-                self.after(0, self._insert_row, i, card)
+            # every card draws from its own stream derived from (seed, index)
+            spec.seed = set_seed = resolve_seed(spec)
+            packs = self.library.select(spec.selected_packages)
+            plan = plan_set(spec, set_seed, exact=exact)
+            total = len(plan)
+            dedup = DuplicateIndex() if avoid_duplicates else None
+
+            breaker = None
+            if use_llm:
+                breaker = check_llm(model, host, backend)
+                if breaker.is_open:
+                    self._post_progress(0, f"{breaker.last_error}; using placeholders...")
+
+            # rows appear as rules text is generated and fill in as LLM replies land;
+            # the callbacks run on worker threads, so they only post to the mailbox
+            made = named = 0
+            def _status():
+                if not use_llm:
+                    return made, f"Generating {made}/{total}..."
+                return named, f"Generated {made}/{total}, named {named}/{total}..."
+            def _on_generated(i, card):
+                nonlocal made
+                made = i
+                self._post_row(i, card)
+                self._post_progress(*_status())
+            def _on_card(i, card):
+                nonlocal named
+                named += 1
+                if use_llm:
+                    self._post_update(i)
+                    self._post_progress(*_status())
+            cards = run_pipeline(spec, plan, packs, set_seed, use_llm=use_llm, model=model, host=host,
+                                 concurrency=parallel, batch_size=batch, cache=cache, breaker=breaker,
+                                 on_generated=_on_generated, on_card=_on_card, backend=backend, dedup=dedup)
+            if cache is not None:
+                metrics.extra["llm_cache"] = cache.stats()
+            if dedup is not None:
+                metrics.extra["dedup"] = dict(dedup.stats)
 
             # install the CardSet and finish on the main thread
             def _finalize():
-                self.card_set = CardSet(spec=spec, cards=cards)
-                self._finish()
+                self.card_set = CardSet(spec=spec, cards=cards, plan=plan,
+                                        variants=dict(dedup.variants) if dedup is not None else {})
+                # repeated names were numbered after the rows were last drawn
+                self.table.refresh()
+                self._finish(breaker, metrics)
             self.after(0, _finalize)
 
         except Exception as e:
             # surface exceptions in UI (main thread)
             def _show_err():
                 tb = traceback.format_exc()
+                self._stop_ticking()
                 self.lbl.config(text="Error occurred. See console.")
                 messagebox.showerror("Generation Error", tb)
-                self.btn_gen.config(state='normal')
+                self.btn_gen.config(state='normal'); self.btn_reroll.config(state='normal')
             self.after(0, _show_err)
+        finally:
+            instrument.disable()
 
-    def on_export_json(self):
+    def on_reroll(self):
         if not self.card_set or not self.card_set.cards:
             messagebox.showwarning("No data", "Generate cards first."); return
-        p = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON","*.json")], title="Export to JSON")
+        picked = [pos + 1 for pos in self.table.selection()]
+        if not picked:
+            messagebox.showinfo("Re-roll", "Select one or more cards in the table first."); return
+        # read the widgets here; the worker thread must not touch Tk
+        llm = self._llm_settings()
+        self.btn_gen.config(state='disabled'); self.btn_reroll.config(state='disabled')
+        self.lbl.config(text=f"Re-rolling {len(picked)} card(s)...")
+        self._start_ticking()
+        threading.Thread(target=self._reroll_worker, args=(self.card_set, picked, llm), daemon=True).start()
+
+    def _reroll_worker(self, card_set, picked, llm):
+        use_llm, model, host, _, _, cache, backend = llm
+        try:
+            breaker = check_llm(model, host, backend) if use_llm else None
+            # the set's packs as they are now, so edited packs apply to re-rolls
+            packs = self.library.select(card_set.spec.selected_packages)
+            for idx in picked:
+                card = reroll_card(card_set, idx, packs)
+                enrich_card(card, idx, card_set.plan.types[idx - 1], card_set.spec, use_llm=use_llm, model=model, host=host,
+                            cache=cache, breaker=breaker, backend=backend)
+                # a new Card object: the table's row must point at it, not just be redrawn
+                self._post_row(idx, card)
+            self.after(0, self._finish, breaker)
+        except Exception:
+            tb = traceback.format_exc()
+            def _show_err():
+                self._stop_ticking()
+                self.lbl.config(text="Error occurred. See console.")
+                messagebox.showerror("Re-roll Error", tb)
+                self.btn_gen.config(state='normal'); self.btn_reroll.config(state='normal')
+            self.after(0, _show_err)
+
+    def _can_export(self):
+        if not self.card_set or not self.card_set.cards:
+            messagebox.showwarning("No data", "Generate cards first."); return False
+        # a running generate, re-roll or export may still be changing or reading the cards
+        if self._busy:
+            messagebox.showinfo("Busy", "Wait for the current run or export to finish."); return False
+        return True
+
+    def on_export_json(self):
+        if not self._can_export(): return
+        p = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON","*.json"),("Compressed JSON","*.json.gz *.json.xz")], title="Export to JSON")
         if not p: return
-        export_json(self.card_set, p); messagebox.showinfo("Export", f"Saved to {p}")
+        self._start_export({"json": p})
 
     def on_export_csv(self):
-        if not self.card_set or not self.card_set.cards:
-            messagebox.showwarning("No data", "Generate cards first."); return
-        p = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV","*.csv")], title="Export to CSV")
+        if not self._can_export(): return
+        p = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV","*.csv"),("Compressed CSV","*.csv.gz *.csv.xz")], title="Export to CSV")
         if not p: return
-        export_csv(self.card_set, p); messagebox.showinfo("Export", f"Saved to {p}")
+        self._start_export({"csv": p})
 
     def on_export_mse(self):
-        if not self.card_set or not self.card_set.cards:
-            messagebox.showwarning("No data", "Generate cards first."); return
+        if not self._can_export(): return
         p = filedialog.asksaveasfilename(defaultextension=".mse-set", filetypes=[("Magic Set Editor","*.mse-set")], title="Export to Magic Set Editor (.mse-set)")
         if not p: return
-        export_mse(self.card_set, p); messagebox.showinfo("Export", f"Saved to {p}\nOpen in MSE (M15).")
+        self._start_export({"mse": p}, note="Open in MSE (M15).")
 
-    # --- Package selection helpers ---
-    def _select_all_packages(self):
-        """Select all items in the package listbox."""
+    def on_export_sqlite(self):
+        if not self._can_export(): return
+        # an existing database can take the set alongside the ones already in it
+        p = filedialog.asksaveasfilename(defaultextension=".db", filetypes=[("SQLite","*.db *.sqlite")],
+                                         title="Export to SQLite", confirmoverwrite=False)
+        if not p: return
+        append = False
+        if os.path.exists(p):
+            answer = messagebox.askyesnocancel("Export", f"{p} exists. Add this set to it?\n(No replaces the file.)")
+            if answer is None: return
+            append = answer
+        self._start_export({"sqlite": p}, sqlite_append=append)
+
+    def on_export_all(self):
+        if not self._can_export(): return
+        dlg = tk.Toplevel(self); dlg.title("Export All"); dlg.transient(self); dlg.resizable(False, False)
+        frm = ttk.Frame(dlg, padding=10); frm.pack(fill='both')
+        picked = {fmt: tk.BooleanVar(value=self._export_formats.get(fmt, True)) for fmt in EXPORT_FORMATS}
+        for col, (fmt, (label, _)) in enumerate(EXPORT_FORMATS.items()):
+            ttk.Checkbutton(frm, text=label, variable=picked[fmt]).grid(row=0, column=col, sticky='w', padx=(0, 8))
+        ttk.Label(frm, text="Folder").grid(row=1, column=0, sticky='w', pady=(8, 0))
+        folder = tk.StringVar(value=self._export_dir or os.getcwd())
+        ttk.Entry(frm, textvariable=folder, width=40).grid(row=1, column=1, columnspan=2, sticky='we', pady=(8, 0))
+        def _browse():
+            d = filedialog.askdirectory(parent=dlg, initialdir=folder.get(), title="Export folder")
+            if d: folder.set(d)
+        ttk.Button(frm, text="Browse...", command=_browse).grid(row=1, column=3, padx=(6, 0), pady=(8, 0))
+        ttk.Label(frm, text="File name").grid(row=2, column=0, sticky='w', pady=(6, 0))
+        base = tk.StringVar(value=self.card_set.spec.code or "set")
+        ttk.Entry(frm, textvariable=base, width=20).grid(row=2, column=1, sticky='w', pady=(6, 0))
+        append = tk.BooleanVar(value=False)
+        ttk.Checkbutton(frm, text="Add to an existing SQLite database", variable=append).grid(
+            row=3, column=0, columnspan=4, sticky='w', pady=(6, 0))
+        def _ok():
+            name = base.get().strip()
+            fmts = [fmt for fmt in EXPORT_FORMATS if picked[fmt].get()]
+            if not fmts or not name:
+                messagebox.showwarning("Export All", "Pick at least one format and a file name.", parent=dlg); return
+            self._export_formats = {fmt: var.get() for fmt, var in picked.items()}
+            self._export_dir = folder.get()
+            paths = {fmt: os.path.join(self._export_dir, name + EXPORT_FORMATS[fmt][1]) for fmt in fmts}
+            dlg.destroy()
+            self._start_export(paths, sqlite_append=append.get())
+        btns = ttk.Frame(frm); btns.grid(row=4, column=0, columnspan=4, sticky='e', pady=(10, 0))
+        ttk.Button(btns, text="Export", command=_ok).pack(side='left')
+        ttk.Button(btns, text="Cancel", command=dlg.destroy).pack(side='left', padx=(6, 0))
+        dlg.grab_set()
+
+    def _start_export(self, paths, sqlite_append=False, note=None):
+        # written off the Tk thread; Generate / Re-roll stay disabled so the cards do not change meanwhile
+        self.btn_gen.config(state='disabled'); self.btn_reroll.config(state='disabled')
+        self.prog.config(value=0, maximum=len(self.card_set.cards))
+        self.lbl.config(text="Exporting...")
+        self._start_ticking()
+        threading.Thread(target=self._export_worker, args=(self.card_set, paths, sqlite_append, note),
+                         daemon=True).start()
+
+    def _export_worker(self, card_set, paths, sqlite_append, note):
+        total = len(card_set.cards)
         try:
-            self.lb.selection_set(0, 'end')
+            t0 = time.perf_counter()
+            export_all(card_set, paths, sqlite_append=sqlite_append,
+                       on_progress=lambda done, n: self._post_progress(done, f"Exporting {done}/{n}..."))
+            elapsed = time.perf_counter() - t0
+            def _done():
+                self._stop_ticking()
+                self.btn_gen.config(state='normal'); self.btn_reroll.config(state='normal')
+                self._set_progress(total, f"Exported {total} cards in {elapsed:.2f}s.")
+                text = "Saved to\n" + "\n".join(paths.values())
+                messagebox.showinfo("Export", text + (f"\n{note}" if note else ""))
+            self.after(0, _done)
         except Exception:
-            pass
+            tb = traceback.format_exc()
+            def _show_err():
+                self._stop_ticking()
+                self.lbl.config(text="Export failed. See console.")
+                messagebox.showerror("Export Error", tb)
+                self.btn_gen.config(state='normal'); self.btn_reroll.config(state='normal')
+            self.after(0, _show_err)
+
+    def on_save_metrics(self):
+        if self.metrics is None:
+            messagebox.showwarning("No data", "Generate cards first."); return
+        p = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON","*.json")],
+                                         title="Save run metrics (JSON)")
+        if not p: return
+        self.metrics.write_json(p); messagebox.showinfo("Metrics", f"Saved to {p}")
+
+    # --- Package selection helpers ---
+    def _select_all_packages(self):
+        """Select every package the filter shows."""
+        self._pack_selection |= set(self._pack_rows)
+        self._show_packages()
 
     def _deselect_all_packages(self):
-        """Clear all selections in the package listbox."""
-        try:
-            self.lb.selection_clear(0, 'end')
-        except Exception:
-            pass
+        """Deselect every package the filter shows."""
+        self._pack_selection -= set(self._pack_rows)
+        self._show_packages()
 
 
 def main():
@@ -0,0 +1,299 @@
+# bench.py
+"""
+Benchmarks for the hot paths: python -m phyrexian_engine.bench --help
+
+Times package loading, effect picking, template rendering, card generation per type,
+set planning, every exporter at several sizes and LLM enrichment against a local fake
+Ollama server (llm.fake_server). Results go to stdout (or --out) as JSON; a readable
+table goes to stderr. --compare OLD.json flags cases that got slower than --tolerance
+and exits with status 1, so two runs on the same machine can be diffed in CI.
+"""
+import argparse, copy, fnmatch, json, logging, os, platform, random, shutil, statistics, sys, tempfile, time
+from dataclasses import dataclass
+from typing import Callable, Iterator, List
+
+from .models import CardSet, SetSpec
+from .generation.templates import load_packages, pick_effect
+from .generation.strings import finalize_effect_template
+from .generation.distribution import PLAN_TYPES, plan_skeleton, plan_types, pick_colors
+from .pipeline import PKG_DIR, list_packages, build_card, card_rng, plan_set, generate_cards, enrich_cards
+from .llm.backends import MockBackend
+from .llm.fake_server import FakeOllama
+from .exporters.json_exporter import write_json
+from .exporters.csv_exporter import write_csv
+from .exporters.mse_exporter import write_mse
+from .exporters.sqlite_exporter import write_sqlite
+from .exporters.fanout import export_all
+
+# Bump when case names or the result layout change
+BENCH_VERSION = 1
+
+SEED = 1234
+
+@dataclass
+class Case:
+    """One benchmark: setup() does untimed preparation and returns the timed callable."""
+    name: str
+    setup: Callable[[], Callable[[], object]]
+    ops: int            # operations per call, for ops/s
+    unit: str = "op"
+    repeat: int = 5
+
+class _Context:
+    """Shared inputs, built on first use so --only runs skip what they do not need."""
+    def __init__(self, args):
+        self.args = args
+        self.tmp = tempfile.mkdtemp(prefix="phyrexian-bench-")
+        self.spec = SetSpec(name="Bench", code="BEN", description="A benchmark set of quiet spires.", seed=SEED)
+        self._packs = None
+        self._cards = []
+        self.plan = None
+        self.servers: List[FakeOllama] = []
+
+    def close(self) -> None:
+        for server in self.servers:
+            server.stop()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def names(self) -> List[str]:
+        return [f[:-5] for f in list_packages(self.args.pack_dir)]
+
+    def packs(self):
+        if self._packs is None:
+            self._packs = load_packages(self.args.pack_dir, self.names(), report_tokens=False)
+        return self._packs
+
+    def cards(self, n: int):
+        if len(self._cards) < n:
+            self.spec.total_cards = n
+            self.plan = plan_set(self.spec, SEED)
+            self._cards = generate_cards(self.spec, self.plan, self.packs(), SEED)
+        return self._cards[:n]
+
+def _size_label(n: int) -> str:
+    return f"{n // 1000}k" if n >= 1000 and n % 1000 == 0 else str(n)
+
+def _load_cases(ctx: _Context) -> Iterator[Case]:
+    names = ctx.names()
+    cache_dir = os.path.join(ctx.tmp, "pack-cache")
+    for count in sorted({1, min(20, len(names)), len(names)}):
+        sel = names[:count]
+        # the warm-up run fills the compiled cache, so "cached" is the usual startup cost
+        yield Case(f"load_packages/cached/{count}",
+                   lambda sel=sel: lambda: load_packages(ctx.args.pack_dir, sel, cache_dir=cache_dir,
+                                                         report_tokens=False), 1, "load")
+        yield Case(f"load_packages/parse/{count}",
+                   lambda sel=sel: lambda: load_packages(ctx.args.pack_dir, sel, use_cache=False,
+                                                         report_tokens=False), 1, "load")
+
+def _template_cases(ctx: _Context) -> Iterator[Case]:
+    n = 50000
+
+    def pick():
+        effects, subtypes_pool, string_pools, _ = ctx.packs()
+        rng = random.Random(SEED)
+        draws = [(rng.choice(("Instant", "Sorcery", "Creature", "Enchantment", "Artifact")),
+                  pick_colors(ctx.spec, "Creature", rng), rng.randint(1, 6)) for _ in range(n)]
+        def run():
+            r = random.Random(SEED)
+            for type_key, colors, mv in draws:
+                pick_effect(effects, string_pools, subtypes_pool, type_key, colors, mv, r)
+        return run
+    yield Case("pick_effect", pick, n, "pick")
+
+    m = 20000
+
+    def render():
+        effects, subtypes_pool, string_pools, _ = ctx.packs()
+        templates = [t for by_type in effects.values() for entries in by_type.values() for t, _, _, _ in entries]
+        rng = random.Random(SEED)
+        draws = [(rng.choice(templates), pick_colors(ctx.spec, "Creature", rng), rng.randint(1, 6)) for _ in range(m)]
+        def run():
+            r = random.Random(SEED)
+            for tmpl, colors, mv in draws:
+                finalize_effect_template(tmpl, colors, mv, string_pools, subtypes_pool, r)
+        return run
+    yield Case("finalize_effect_template", render, m, "render")
+
+def _card_cases(ctx: _Context) -> Iterator[Case]:
+    n = 2000
+    for card_type in PLAN_TYPES:
+        def gen(card_type=card_type):
+            effects, subtypes_pool, string_pools, monster_keywords = ctx.packs()
+            def run():
+                for i in range(1, n + 1):
+                    build_card(i, card_type, ctx.spec, effects, subtypes_pool, string_pools, monster_keywords,
+                               rng=card_rng(SEED, i))
+            return run
+        yield Case(f"generate_card/{card_type}", gen, n, "card")
+
+def _plan_cases(ctx: _Context) -> Iterator[Case]:
+    n = 100000
+    spec = SetSpec(name="Bench", code="BEN", description="", total_cards=n, seed=SEED)
+    label = _size_label(n)
+    yield Case(f"plan_types/{label}", lambda: lambda: plan_types(spec, random.Random(SEED)), n, "slot")
+    yield Case(f"plan_skeleton/{label}", lambda: lambda: plan_skeleton(spec, random.Random(SEED)), n, "slot")
+    yield Case(f"plan_skeleton/exact/{label}",
+               lambda: lambda: plan_skeleton(spec, random.Random(SEED), exact=True), n, "slot")
+
+def _export_cases(ctx: _Context) -> Iterator[Case]:
+    writers = (("json", ".json", lambda cards, path: write_json(ctx.spec, cards, path, total=len(cards))),
+               ("csv", ".csv", write_csv),
+               ("mse", ".mse-set", lambda cards, path: write_mse(ctx.spec, cards, path)),
+               ("sqlite", ".db", lambda cards, path: write_sqlite(ctx.spec, cards, path)))
+    for n in ctx.args.sizes:
+        for fmt, ext, write in writers:
+            def export(n=n, ext=ext, write=write):
+                cards = ctx.cards(n)
+                path = os.path.join(ctx.tmp, f"out-{n}{ext}")
+                return lambda: write(cards, path)
+            yield Case(f"export/{fmt}/{_size_label(n)}", export, n, "card", repeat=3 if n < 100000 else 1)
+        # auto, and both modes at every size, so PROCESS_MIN_CARDS can be checked on the machine at hand
+        for mode, processes in (("", None), ("threads/", False), ("processes/", True)):
+            def export_every(n=n, processes=processes):
+                card_set = CardSet(spec=ctx.spec, cards=ctx.cards(n))
+                paths = {fmt: os.path.join(ctx.tmp, f"all-{n}{ext}") for fmt, ext, _ in writers}
+                return lambda: export_all(card_set, paths, processes=processes)
+            yield Case(f"export/all/{mode}{_size_label(n)}", export_every, n, "card", repeat=3 if n < 100000 else 1)
+
+def _enrich_cases(ctx: _Context) -> Iterator[Case]:
+    args = ctx.args
+    n = args.enrich_cards
+    for batch in sorted({1, args.llm_batch}):
+        def enrich(batch=batch):
+            cards = ctx.cards(n)
+            types = ctx.plan.types[:n]
+            server = FakeOllama(latency=args.latency, tokens_per_s=args.tokens_per_s).start()
+            ctx.servers.append(server)
+            def run():
+                enrich_cards([copy.copy(c) for c in cards], types, ctx.spec, use_llm=True, model="gemma3:4b",
+                             host=server.host, concurrency=args.llm_concurrency, batch_size=batch)
+            return run
+        yield Case(f"enrich/batch{batch}/c{args.llm_concurrency}", enrich, n, "card", repeat=3)
+
+    # the enrichment machinery itself (threads, batching, parsing) with no transport at all
+    m = 10000
+
+    def mock():
+        cards = ctx.cards(m)
+        types = ctx.plan.types[:m]
+        def run():
+            enrich_cards([copy.copy(c) for c in cards], types, ctx.spec, use_llm=True,
+                         concurrency=args.llm_concurrency, backend=MockBackend())
+        return run
+    yield Case(f"enrich/mock/c{args.llm_concurrency}", mock, m, "card", repeat=3)
+
+GROUPS = (_load_cases, _template_cases, _card_cases, _plan_cases, _export_cases, _enrich_cases)
+
+def _measure(case: Case, repeat: int) -> dict:
+    run = case.setup()
+    run()  # warm-up: caches, imports, first connections
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - t0)
+    median = statistics.median(times)
+    return {"name": case.name, "ops": case.ops, "unit": case.unit, "repeat": repeat,
+            "min_s": min(times), "median_s": median, "mean_s": statistics.fmean(times),
+            "ops_per_s": case.ops / median if median > 0 else None, "times_s": times}
+
+def run_benchmarks(args) -> dict:
+    ctx = _Context(args)
+    results = []
+    try:
+        for group in GROUPS:
+            for case in group(ctx):
+                if args.only and not any(fnmatch.fnmatch(case.name, pat) for pat in args.only):
+                    continue
+                res = _measure(case, args.repeat or case.repeat)
+                results.append(res)
+                rate = f"{res['ops_per_s']:12.0f} {case.unit}/s" if res["ops_per_s"] else ""
+                print(f"{case.name:<36} {res['median_s'] * 1000:10.2f} ms  {rate}", file=sys.stderr)
+        packages = len(ctx.names())
+    finally:
+        ctx.close()
+    return {
+        "version": BENCH_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "settings": {"sizes": args.sizes, "latency": args.latency, "tokens_per_s": args.tokens_per_s,
+                     "enrich_cards": args.enrich_cards, "llm_concurrency": args.llm_concurrency,
+                     "llm_batch": args.llm_batch, "packages": packages},
+        "results": results,
+    }
+
+def compare(report: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Names of cases whose best time grew by more than tolerance (0.2 = 20%) over baseline."""
+    old = {r["name"]: r for r in baseline.get("results", [])}
+    slower = []
+    for r in report["results"]:
+        base = old.get(r["name"])
+        if not base or not base["min_s"]:
+            continue
+        ratio = r["min_s"] / base["min_s"]
+        flag = "  SLOWER" if ratio > 1 + tolerance else ""
+        print(f"{r['name']:<36} {ratio:6.2f}x{flag}", file=sys.stderr)
+        if flag:
+            slower.append(r["name"])
+    return slower
+
+def _sizes(text: str) -> List[int]:
+    return [int(s) for s in text.split(",") if s.strip()]
+
+def _build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(prog="python -m phyrexian_engine.bench",
+                                description="Time the generation, templating, LLM and export hot paths.")
+    p.add_argument("--only", action="append", default=[], metavar="GLOB",
+                   help="run only cases matching GLOB, e.g. 'export/*' (repeatable)")
+    p.add_argument("--list", action="store_true", help="print the case names and exit")
+    p.add_argument("--repeat", type=int, default=0, help="timed runs per case (default: per case, 1-5)")
+    p.add_argument("--pack-dir", default=PKG_DIR)
+    p.add_argument("--sizes", type=_sizes, default=[100, 10000, 100000], metavar="N,N,...",
+                   help="card counts for the exporter cases (default 100,10000,100000)")
+    p.add_argument("--quick", action="store_true", help="exporters at 100 and 10k cards only")
+    p.add_argument("--latency", type=float, default=0.05, help="fake Ollama seconds per request (default 0.05)")
+    p.add_argument("--tokens-per-s", type=float, default=0.0, help="fake Ollama decode speed (default: instant)")
+    p.add_argument("--enrich-cards", type=int, default=64, metavar="N")
+    p.add_argument("--llm-concurrency", type=int, default=4, metavar="N")
+    p.add_argument("--llm-batch", type=int, default=8, metavar="N", help="batch size measured besides 1")
+    p.add_argument("--out", metavar="PATH", help="write the JSON report here instead of stdout")
+    p.add_argument("--compare", metavar="OLD.json", help="report ratios against an earlier run")
+    p.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown with --compare (default 0.2)")
+    return p
+
+def main(argv=None) -> int:
+    args = _build_parser().parse_args(argv)
+    if args.quick:
+        args.sizes = [n for n in args.sizes if n < 100000]
+    if args.list:
+        ctx = _Context(args)
+        try:
+            for group in GROUPS:
+                for case in group(ctx):
+                    print(case.name)
+        finally:
+            ctx.close()
+        return 0
+    # packs referencing unknown tokens would log once per load
+    logging.getLogger("phyrexian_engine").setLevel(logging.ERROR)
+
+    report = run_benchmarks(args)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.tolerance):
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,255 @@
+# cli.py
+"""
+Headless generator: python -m phyrexian_engine.cli --help
+
+Runs load -> plan -> generate + enrich (overlapped) -> export without tkinter and
+prints per-stage timings to stderr; "enrich" is the time enrichment needed beyond
+the end of rules-text generation.
+"""
+import argparse, json, os, sys, time
+from contextlib import contextmanager
+from dataclasses import fields
+
+from . import instrument
+from .models import SetSpec, CardSet, CardColumns
+from .generation.templates import load_packages
+from .generation.dedup import DuplicateIndex
+from .generation.manifest import PackageManifest, SORT_KEYS, filter_packs, sort_packs
+from .pipeline import PKG_DIR, list_packages, resolve_seed, plan_set, check_llm, run_pipeline
+from .llm.cache import ResponseCache
+from .llm.backends import BACKENDS, make_backend
+from .exporters.fanout import EXPORT_MODES, PROCESS_MIN_CARDS, export_all
+
+def _build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(prog="python -m phyrexian_engine.cli",
+                                description="Generate a card set without the desktop UI.")
+    p.add_argument("--spec", metavar="FILE", help="JSON file with SetSpec fields; flags below override it")
+    p.add_argument("--name")
+    p.add_argument("--code")
+    p.add_argument("--description")
+    p.add_argument("--total", type=int, dest="total_cards", help="number of cards")
+    p.add_argument("--colors", help="allowed colors, e.g. WUBRG")
+    p.add_argument("--no-artifacts", action="store_true")
+    p.add_argument("--no-lands", action="store_true")
+    p.add_argument("--commander", action="store_true", help="Commander Mode (legendary creatures only)")
+    p.add_argument("--seed", type=int)
+    p.add_argument("--exact-quotas", action="store_true",
+                   help="hit the type/rarity/curve weights as exactly as the card count allows instead of sampling")
+    p.add_argument("--no-dedup", action="store_true",
+                   help="keep cards whose rules text repeats an earlier card's (by default they are re-rolled)")
+    p.add_argument("--packages", action="append", default=[],
+                   help="package names, comma separated or repeated (with or without .json)")
+    p.add_argument("--all-packages", action="store_true", help="use every package in --pack-dir")
+    p.add_argument("--pack-dir", default=PKG_DIR)
+
+    packs = p.add_argument_group("package listing")
+    packs.add_argument("--list-packages", action="store_true",
+                       help="print what each package contributes and exit (no set is generated)")
+    packs.add_argument("--pack-filter", default="", metavar="TEXT", help="only packages whose name contains TEXT")
+    packs.add_argument("--pack-colors", default="", metavar="COLORS", help="only packages with templates in any of COLORS")
+    packs.add_argument("--pack-type", default="", metavar="TYPE", help="only packages with templates of TYPE")
+    packs.add_argument("--pack-sort", choices=SORT_KEYS, default="name", help="largest first for all keys but name")
+    p.add_argument("--workers", type=int, default=1,
+                   help="processes for rules-text generation (0 = one per CPU); output does not depend on it")
+    p.add_argument("--compact", action="store_true",
+                   help="keep cards column-wise with shared strings (much less memory for very large sets)")
+
+    llm = p.add_argument_group("LLM")
+    llm.add_argument("--no-llm", action="store_true", help="placeholder name/art/flavor, no Ollama calls")
+    llm.add_argument("--model", default="gemma3:4b")
+    llm.add_argument("--host", default="http://localhost:11434")
+    llm.add_argument("--llm-concurrency", type=int, default=4, metavar="N",
+                     help="LLM requests in flight at once (default 4)")
+    llm.add_argument("--llm-batch", type=int, default=1, metavar="N",
+                     help="cards per LLM request (default 1); larger batches mean fewer round trips but slower replies")
+    llm.add_argument("--llm-cache", metavar="PATH", help="SQLite cache of LLM replies (default: in the user cache dir)")
+    llm.add_argument("--no-llm-cache", action="store_true", help="always ask the model, store nothing")
+    llm.add_argument("--llm-backend", choices=BACKENDS, default="ollama",
+                     help="'mock' answers instantly and deterministically without a server (for profiling)")
+    rec = llm.add_mutually_exclusive_group()
+    rec.add_argument("--record", metavar="PATH", help="append every LLM reply to a JSON Lines recording")
+    rec.add_argument("--replay", metavar="PATH",
+                     help="answer from a recording made with the same --model and --llm-batch, offline")
+
+    out = p.add_argument_group("output")
+    out.add_argument("--json", metavar="PATH", help="a .gz or .xz suffix compresses the file")
+    out.add_argument("--csv", metavar="PATH", help="a .gz or .xz suffix compresses the file")
+    out.add_argument("--mse", metavar="PATH")
+    out.add_argument("--sqlite", metavar="PATH", help="cards, types, subtypes and rules lines in indexed tables")
+    out.add_argument("--sqlite-append", action="store_true",
+                     help="add the set to an existing --sqlite database instead of replacing it")
+    out.add_argument("--export-mode", choices=EXPORT_MODES, default="auto",
+                     help=f"how several formats are written side by side (auto: processes from {PROCESS_MIN_CARDS} "
+                          "cards on more than one CPU, threads otherwise)")
+
+    diag = p.add_argument_group("diagnostics")
+    diag.add_argument("--metrics", metavar="PATH",
+                      help="write per-stage times, counts, LLM latency percentiles and tokens/s as JSON")
+    diag.add_argument("--profile", metavar="PATH", help="cProfile the run into PATH (pstats format)")
+    diag.add_argument("--trace-memory", action="store_true",
+                      help="record peak memory and the top allocation sites with tracemalloc (slow)")
+    return p
+
+def spec_from_dict(d: dict) -> SetSpec:
+    """SetSpec from a JSON object; unknown keys are ignored, curve keys become ints."""
+    known = {f.name for f in fields(SetSpec)}
+    kwargs = {k: v for k, v in d.items() if k in known}
+    if "target_curve" in kwargs:
+        kwargs["target_curve"] = {int(k): float(v) for k, v in kwargs["target_curve"].items()}
+    kwargs.setdefault("name", "New Set")
+    kwargs.setdefault("code", "NEW")
+    kwargs.setdefault("description", "")
+    return SetSpec(**kwargs)
+
+def _gather_spec(args) -> SetSpec:
+    base = {}
+    if args.spec:
+        with open(args.spec, "r", encoding="utf-8") as f:
+            base = json.load(f)
+    for key in ("name", "code", "description", "total_cards", "seed"):
+        val = getattr(args, key)
+        if val is not None:
+            base[key] = val
+    if args.colors is not None:
+        base["colors"] = [c for c in args.colors.upper() if c in "WUBRG"]
+    if args.no_artifacts:
+        base["include_artifacts"] = False
+    if args.no_lands:
+        base["include_lands"] = False
+    if args.commander:
+        base["commander_mode"] = True
+    if args.all_packages:
+        base["selected_packages"] = list_packages(args.pack_dir)
+    elif args.packages:
+        base["selected_packages"] = [s.strip() for arg in args.packages for s in arg.split(",") if s.strip()]
+
+    spec = spec_from_dict(base)
+    spec.code = spec.code.strip().upper()[:5] or "NEW"
+    spec.selected_packages = [s[:-5] if s.endswith(".json") else s for s in spec.selected_packages]
+    return spec
+
+@contextmanager
+def _stage(timings: dict, name: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - t0
+
+def run(spec: SetSpec, args):
+    """Run every stage; returns (card_set, {stage: seconds})."""
+    timings = {}
+    cache = None
+    # mock replies are free, a recording needs every reply to reach it, and a replay
+    # should only ever see the recording
+    if (not args.no_llm and not args.no_llm_cache and args.llm_backend == "ollama"
+            and not (args.record or args.replay)):
+        cache = ResponseCache(args.llm_cache)
+    # keep the seed actually used with the set so the run can be repeated
+    spec.seed = set_seed = resolve_seed(spec)
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+
+    with _stage(timings, "load"):
+        packs = load_packages(args.pack_dir, spec.selected_packages)
+    with _stage(timings, "plan"):
+        plan = plan_set(spec, set_seed, exact=args.exact_quotas)
+    types = plan.types
+    breaker = backend = None
+    if not args.no_llm:
+        backend = make_backend(args.llm_backend, args.model, args.host, record=args.record, replay=args.replay)
+        with _stage(timings, "probe"):
+            breaker = check_llm(args.model, args.host, backend)
+        if breaker.is_open:
+            print(f"warning: {breaker.last_error}; cards get placeholder text until it recovers", file=sys.stderr)
+
+    dedup = None if args.no_dedup else DuplicateIndex()
+    t0 = time.perf_counter()
+    generated = [t0]
+    def _on_generated(i, card):
+        if i == len(types):
+            generated[0] = time.perf_counter()
+    cards = run_pipeline(spec, plan, packs, set_seed, workers=workers, pack_dir=args.pack_dir,
+                         use_llm=not args.no_llm, model=args.model, host=args.host,
+                         concurrency=args.llm_concurrency, batch_size=args.llm_batch, cache=cache, breaker=breaker,
+                         on_generated=_on_generated, store=CardColumns(len(types)) if args.compact else None,
+                         backend=backend, dedup=dedup)
+    t1 = time.perf_counter()
+    timings["generate"] = generated[0] - t0
+    timings["enrich"] = t1 - generated[0]
+    if breaker is not None and breaker.degraded:
+        reason = f" (last error: {breaker.last_error})" if breaker.last_error else ""
+        if getattr(backend, "misses", 0):
+            reason = f" ({backend.misses} requests not in the recording)"
+        print(f"warning: {breaker.degraded} of {len(cards)} cards got placeholder name/art/flavor{reason}",
+              file=sys.stderr)
+
+    if dedup is not None:
+        print(f"duplicates: {dedup.summary()}", file=sys.stderr)
+        metrics = instrument.active()
+        if metrics is not None:
+            metrics.extra["dedup"] = dict(dedup.stats)
+
+    card_set = CardSet(spec=spec, cards=cards, plan=plan, variants=dict(dedup.variants) if dedup is not None else {})
+    # one pass over the cards feeds every requested format
+    paths = {fmt: path for fmt, path in (("json", args.json), ("csv", args.csv), ("mse", args.mse),
+                                         ("sqlite", args.sqlite)) if path}
+    if paths:
+        with _stage(timings, "export"):
+            export_all(card_set, paths, processes=EXPORT_MODES[args.export_mode], sqlite_append=args.sqlite_append)
+    if cache is not None:
+        stats = cache.stats()
+        metrics = instrument.active()
+        if metrics is not None:
+            metrics.extra["llm_cache"] = stats
+        print("llm cache: {hits} hits, {misses} misses ({shared} shared in flight), "
+              "{entries} entries".format(**stats), file=sys.stderr)
+        cache.close()
+    return card_set, timings
+
+def list_package_info(args) -> int:
+    manifest = PackageManifest(args.pack_dir)
+    packs = filter_packs(manifest.refresh(), args.pack_filter, args.pack_colors, args.pack_type)
+    packs = sort_packs(packs, args.pack_sort, reverse=args.pack_sort != "name")
+    for info in packs:
+        print(info.summary())
+        print(f"    {info.details()}")
+    print(f"{len(packs)} of {len(manifest.packs)} packages ({manifest.described} re-read)", file=sys.stderr)
+    return 0
+
+def main(argv=None) -> int:
+    args = _build_parser().parse_args(argv)
+    if args.list_packages:
+        return list_package_info(args)
+    try:
+        spec = _gather_spec(args)
+    except (OSError, ValueError, TypeError) as e:
+        print(f"error: bad set spec: {e}", file=sys.stderr)
+        return 2
+    if not spec.selected_packages:
+        print("warning: no packages selected; only minimal defaults will be used", file=sys.stderr)
+
+    if not (args.metrics or args.profile or args.trace_memory):
+        card_set, timings = run(spec, args)
+    else:
+        metrics = instrument.enable()
+        try:
+            with instrument.profiling(metrics, args.profile, args.trace_memory):
+                card_set, timings = run(spec, args)
+        finally:
+            instrument.disable()
+        metrics.extra["timings"] = timings
+        print(metrics.summary(), file=sys.stderr)
+        if args.metrics:
+            metrics.write_json(args.metrics)
+        if args.trace_memory:
+            print(f"peak traced memory: {metrics.extra['tracemalloc']['peak_kib'] / 1024:.1f} MiB", file=sys.stderr)
+
+    total = sum(timings.values())
+    print(f"{len(card_set.cards)} cards for {spec.name} ({spec.code}), seed {spec.seed}", file=sys.stderr)
+    for name, secs in timings.items():
+        print(f"  {name:<12} {secs:9.3f}s", file=sys.stderr)
+    print(f"  {'total':<12} {total:9.3f}s", file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,15 +1,21 @@
-
-import csv, os
-from ..models import CardSet
+import csv
+from typing import Iterable, Optional
+from ..models import Card, CardSet
+from .streams import open_text
+from ..instrument import timed
 
 HEAD = ["Name","ManaCost","ManaValue","TypeLine","Rarity","Rules","P","T","Flavor","Art","Colors","Subtypes"]
 
-def export_csv(card_set:CardSet, out_path:str)->str:
-    os.makedirs(os.path.dirname(out_path), exist_ok=True)
-    with open(out_path, "w", encoding="utf-8", newline="") as f:
+@timed("export/csv")
+def write_csv(cards:Iterable[Card], out_path:str, compress:Optional[str]=None)->str:
+    """Write one row per card as it is read from cards; compress as in streams.open_text."""
+    with open_text(out_path, compress, newline="") as f:
         w = csv.writer(f); w.writerow(HEAD)
-        for c in card_set.cards:
+        for c in cards:
             w.writerow([c.name or "", c.mana_cost, c.mana_value, c.typeline(), c.rarity, c.rules_text.replace("\n"," / "),
                         c.power if c.power is not None else "", c.toughness if c.toughness is not None else "",
-                        c.flavor_text or "", c.art_description or "", "".join(c.color_identity) or "C", " ".join(c.subtypes)])
+                        c.flavor_text or "", c.art_description or "", "".join(c.color_identity or "") or "C", " ".join(c.subtypes)])
     return out_path
+
+def export_csv(card_set:CardSet, out_path:str, compress:Optional[str]=None)->str:
+    return write_csv(card_set.cards, out_path, compress)
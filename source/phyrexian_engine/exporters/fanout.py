@@ -0,0 +1,213 @@
+import multiprocessing, os, pickle, queue, threading
+from typing import Callable, Dict, Iterator, List, Optional
+from .. import instrument
+from ..models import Card, CardSet
+from .json_exporter import write_json
+from .csv_exporter import write_csv
+from .mse_exporter import write_mse
+from .sqlite_exporter import write_sqlite
+
+# format -> (default extension, writer(spec, cards, path, total, options))
+WRITERS = {
+    "json": (".json", lambda spec, cards, path, total, opts: write_json(spec, cards, path, total=total)),
+    "csv": (".csv", lambda spec, cards, path, total, opts: write_csv(cards, path)),
+    "mse": (".mse-set", lambda spec, cards, path, total, opts: write_mse(spec, cards, path)),
+    "sqlite": (".db", lambda spec, cards, path, total, opts: write_sqlite(spec, cards, path,
+                                                                          append=opts.get("sqlite_append", False))),
+}
+
+# below this many cards starting processes costs more than writing side by side saves:
+# spawning the writers takes close to a second, and threads cost about the sum of the
+# formats (bench: export/all/threads/20k 1.9 s against 1.75 s for the four formats alone)
+PROCESS_MIN_CARDS = 20000
+
+# --export-mode -> export_all(processes=...)
+EXPORT_MODES = {"auto": None, "threads": False, "processes": True}
+
+def _materialize(chunk)->List[Card]:
+    # CardColumns rows come back as views; build each Card once for every writer
+    return [c if isinstance(c, Card) else c.to_card() for c in chunk]
+
+def _drain(q)->None:
+    while q.get() is not None:
+        pass
+
+class _ThreadSink:
+    """A writer on a thread of this process, reading chunks from a bounded queue."""
+    def __init__(self, fmt:str, spec, path:str, total:int, options:dict, depth:int):
+        self.fmt = fmt
+        self.done = 0
+        self.error: Optional[BaseException] = None
+        self.snapshot = None   # metrics are recorded in this process already
+        self._queue: "queue.Queue[Optional[List[Card]]]" = queue.Queue(depth)
+        self._thread = threading.Thread(target=self._run, args=(spec, path, total, options),
+                                        name=f"export-{fmt}", daemon=True)
+        self._thread.start()
+
+    def _cards(self)->Iterator[Card]:
+        while True:
+            chunk = self._queue.get()
+            if chunk is None:
+                return
+            yield from chunk
+            self.done += len(chunk)
+
+    def _run(self, spec, path, total, options):
+        try:
+            WRITERS[self.fmt][1](spec, self._cards(), path, total, options)
+        except BaseException as e:
+            self.error = e
+            # keep reading so the producer never blocks on a dead writer
+            _drain(self._queue)
+
+    def put(self, chunk:List[Card], blob:Optional[bytes])->None:
+        self._queue.put(chunk)
+
+    def close(self)->None:
+        self._queue.put(None)
+
+    def alive(self)->bool:
+        return self._thread.is_alive()
+
+    def join(self, timeout:float)->None:
+        self._thread.join(timeout)
+
+def _process_writer(fmt, spec, path, total, options, feed, status, instrumented):
+    # runs in the child: chunks arrive pickled once by the parent for every writer
+    instrument.disable()
+    metrics = instrument.enable() if instrumented else None
+    done = 0
+    def cards():
+        nonlocal done
+        while True:
+            blob = feed.get()
+            if blob is None:
+                return
+            chunk = pickle.loads(blob)
+            yield from chunk
+            done += len(chunk)
+            status.put((fmt, "progress", done))
+    try:
+        WRITERS[fmt][1](spec, cards(), path, total, options)
+        status.put((fmt, "ok", metrics.snapshot() if metrics else None))
+    except BaseException as e:
+        _drain(feed)
+        try:
+            pickle.dumps(e)
+        except Exception:
+            e = RuntimeError(f"{fmt} export failed: {e!r}")
+        status.put((fmt, "error", e))
+
+class _ProcessSink:
+    """A writer in its own process, so formats are written in parallel despite the GIL."""
+    def __init__(self, fmt:str, spec, path:str, total:int, options:dict, depth:int, ctx, status):
+        self.fmt = fmt
+        self.done = 0
+        self.error: Optional[BaseException] = None
+        self.snapshot = None
+        self._queue = ctx.Queue(depth)
+        self._proc = ctx.Process(target=_process_writer, name=f"export-{fmt}", daemon=True,
+                                 args=(fmt, spec, path, total, options, self._queue, status,
+                                       instrument.active() is not None))
+        self._proc.start()
+
+    def put(self, chunk:List[Card], blob:Optional[bytes])->None:
+        while True:
+            try:
+                self._queue.put(blob, timeout=0.5)
+                return
+            except queue.Full:
+                if not self._proc.is_alive():
+                    raise RuntimeError(f"{self.fmt} export process exited with code {self._proc.exitcode}")
+
+    def close(self)->None:
+        if self._proc.is_alive():
+            self.put([], None)
+
+    def alive(self)->bool:
+        return self._proc.is_alive()
+
+    def join(self, timeout:float)->None:
+        self._proc.join(timeout)
+
+@instrument.timed("export/all")
+def export_all(card_set:CardSet, paths:Dict[str,str], on_progress:Optional[Callable[[int,int],None]]=None,
+               chunk_size:int=1000, depth:int=8, processes:Optional[bool]=None, **options)->Dict[str,str]:
+    """
+    Write card_set in every format of paths ({format: path}, formats from WRITERS) in one
+    pass over the cards. The cards are read (and CardColumns rows materialized) once, in
+    chunks, and every chunk goes to all the writers, which run side by side and may be
+    at most depth chunks behind. With processes (default: more than one format, at
+    least PROCESS_MIN_CARDS cards and more than one CPU) each writer gets its own
+    process and each chunk is pickled once for all of them, so the total time approaches
+    that of the slowest format; otherwise the writers are threads of this process, which
+    share the GIL and take about as long as the formats one after another.
+    on_progress(done, total) is called on the calling thread with the cards every writer
+    has finished.
+    options: sqlite_append. Returns paths; the first writer error is raised once the
+    other writers have finished.
+    """
+    unknown = set(paths) - set(WRITERS)
+    if unknown:
+        raise ValueError(f"unknown export format(s) {', '.join(sorted(unknown))}; expected {', '.join(WRITERS)}")
+    cards = card_set.cards
+    total = len(cards)
+    if processes is None:
+        processes = len(paths) > 1 and total >= PROCESS_MIN_CARDS and (os.cpu_count() or 1) > 1
+    status = ctx = None
+    if processes:
+        ctx = multiprocessing.get_context("spawn")   # never fork a process that runs Tk or other threads
+        status = ctx.Queue()
+    sinks: list = []
+    by_fmt = {}
+
+    def poll():
+        while status is not None:
+            try:
+                fmt, kind, value = status.get_nowait()
+            except queue.Empty:
+                break
+            sink = by_fmt[fmt]
+            if kind == "progress":
+                sink.done = value
+            elif kind == "error":
+                sink.error = value
+            else:
+                sink.done, sink.snapshot = total, value
+        if on_progress:
+            on_progress(min(s.done for s in sinks) if sinks else total, total)
+
+    try:
+        for fmt, path in paths.items():
+            sink = (_ProcessSink(fmt, card_set.spec, path, total, options, depth, ctx, status) if processes
+                    else _ThreadSink(fmt, card_set.spec, path, total, options, depth))
+            sinks.append(sink)
+            by_fmt[fmt] = sink
+        # a failed writer drains its queue; the others still get every card, so no file is
+        # left well-formed but short
+        for start in range(0, total, chunk_size):
+            chunk = _materialize(cards[start:start + chunk_size])
+            blob = pickle.dumps(chunk, pickle.HIGHEST_PROTOCOL) if processes else None
+            for sink in sinks:
+                sink.put(chunk, blob)
+            poll()
+    finally:
+        for sink in sinks:
+            sink.close()
+        for sink in sinks:
+            while sink.alive():
+                sink.join(0.1)
+                poll()
+        poll()
+    metrics = instrument.active()
+    for sink in sinks:
+        if sink.snapshot and metrics is not None:
+            metrics.merge(sink.snapshot)
+    for sink in sinks:
+        if sink.error is not None:
+            raise sink.error
+    if processes:
+        for sink in sinks:
+            if sink.snapshot is None and sink.done < total:
+                raise RuntimeError(f"{sink.fmt} export process stopped early")
+    return paths
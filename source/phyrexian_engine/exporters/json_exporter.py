@@ -1,17 +1,46 @@
+import json
+from typing import Iterable, Optional
+from ..models import Card, CardSet, SetSpec
+from .streams import open_text
+from ..instrument import timed
 
-import json, os
-from ..models import CardSet
-
-def export_json(card_set:CardSet, out_path:str)->str:
-    data = {
-        "set": {"name": card_set.spec.name, "code": card_set.spec.code, "description": card_set.spec.description, "total": len(card_set.cards)},
-        "cards": [{
-            "name": c.name, "mana_cost": c.mana_cost, "mana_value": c.mana_value, "types": c.types, "subtypes": c.subtypes,
-            "rarity": c.rarity, "rules_text": c.rules_text, "power": c.power, "toughness": c.toughness,
-            "flavor_text": c.flavor_text, "art_description": c.art_description, "color_identity": c.color_identity
-        } for c in card_set.cards]
+def card_record(c:Card)->dict:
+    return {
+        "name": c.name, "mana_cost": c.mana_cost, "mana_value": c.mana_value, "types": c.types, "subtypes": c.subtypes,
+        "rarity": c.rarity, "rules_text": c.rules_text, "power": c.power, "toughness": c.toughness,
+        "flavor_text": c.flavor_text, "art_description": c.art_description, "color_identity": c.color_identity
     }
-    os.makedirs(os.path.dirname(out_path), exist_ok=True)
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+
+def _indented(obj, pad:str)->str:
+    # same layout json.dump(indent=2) gives an element nested at this depth
+    return json.dumps(obj, indent=2, ensure_ascii=False).replace("\n", "\n" + pad)
+
+@timed("export/json")
+def write_json(spec:SetSpec, cards:Iterable[Card], out_path:str, total:Optional[int]=None,
+               compress:Optional[str]=None)->str:
+    """
+    Stream {"set": ..., "cards": [...]} to out_path one card at a time. The set block
+    carries the card count, so it comes first when total (or len(cards)) is known and
+    after the cards otherwise. compress: "gz", "xz" or None (inferred from the suffix).
+    """
+    if total is None and hasattr(cards, "__len__"):
+        total = len(cards)
+    head = {"name": spec.name, "code": spec.code, "description": spec.description}
+    with open_text(out_path, compress) as f:
+        f.write("{\n")
+        if total is not None:
+            f.write('  "set": ' + _indented(dict(head, total=total), "  ") + ",\n")
+        f.write('  "cards": [')
+        n = 0
+        for c in cards:
+            f.write(",\n    " if n else "\n    ")
+            f.write(_indented(card_record(c), "    "))
+            n += 1
+        f.write("\n  ]" if n else "]")
+        if total is None:
+            f.write(',\n  "set": ' + _indented(dict(head, total=n), "  "))
+        f.write("\n}")
     return out_path
+
+def export_json(card_set:CardSet, out_path:str, compress:Optional[str]=None)->str:
+    return write_json(card_set.spec, card_set.cards, out_path, compress=compress)
@@ -1,7 +1,9 @@
 
 import os, io, zipfile
 from datetime import datetime
-from ..models import CardSet
+from typing import Iterable
+from ..models import Card, CardSet, SetSpec
+from ..instrument import timed
 
 HEADER_TEMPLATE = (
     "mse version: 0.3.8\n"
@@ -66,17 +68,23 @@ def _render_card(card, idx:int, now_str:str)->str:
     out.append("\tcard_code_text_3: ")
     return "\n".join(out) + "\n"
 
-def export_mse(card_set:CardSet, out_path:str)->str:
-    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+@timed("export/mse")
+def write_mse(spec:SetSpec, cards:Iterable[Card], out_path:str)->str:
+    """
+    Write a .mse-set (a zip holding one "set" text entry), rendering each card straight
+    into the compressed member stream. The file is already deflated, so there is no
+    gzip/xz option here.
+    """
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
     now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    header = HEADER_TEMPLATE.format(code=_esc(card_set.spec.code), name=_esc(card_set.spec.name))
-    parts = [header]
-    for i,c in enumerate(card_set.cards, start=1):
-        parts.append(_render_card(c, i, now_str))
-    set_text = "\n".join(parts)
-    mem = io.BytesIO()
-    with zipfile.ZipFile(mem, "w", zipfile.ZIP_DEFLATED) as z:
-        z.writestr("set", set_text.encode("utf-8"))
-    with open(out_path, "wb") as f:
-        f.write(mem.getvalue())
+    header = HEADER_TEMPLATE.format(code=_esc(spec.code), name=_esc(spec.name))
+    with zipfile.ZipFile(out_path, "w", zipfile.ZIP_DEFLATED) as z:
+        with z.open("set", "w") as member, io.TextIOWrapper(member, encoding="utf-8", newline="") as f:
+            f.write(header)
+            for i,c in enumerate(cards, start=1):
+                f.write("\n")
+                f.write(_render_card(c, i, now_str))
     return out_path
+
+def export_mse(card_set:CardSet, out_path:str)->str:
+    return write_mse(card_set.spec, card_set.cards, out_path)
@@ -0,0 +1,133 @@
+import os, sqlite3
+from datetime import datetime
+from typing import Dict, Iterable
+from ..models import Card, CardSet, SetSpec
+from ..instrument import timed
+
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sets (
+    id INTEGER PRIMARY KEY, name TEXT, code TEXT, description TEXT, seed INTEGER,
+    total INTEGER, created TEXT);
+CREATE TABLE IF NOT EXISTS cards (
+    id INTEGER PRIMARY KEY, set_id INTEGER NOT NULL REFERENCES sets(id), number INTEGER NOT NULL,
+    name TEXT, mana_cost TEXT, mana_value INTEGER, rarity TEXT, color_identity TEXT,
+    power INTEGER, toughness INTEGER, rules_text TEXT, flavor_text TEXT, art_description TEXT);
+CREATE TABLE IF NOT EXISTS types (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS subtypes (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS card_types (
+    card_id INTEGER NOT NULL REFERENCES cards(id), type_id INTEGER NOT NULL REFERENCES types(id),
+    position INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS card_subtypes (
+    card_id INTEGER NOT NULL REFERENCES cards(id), subtype_id INTEGER NOT NULL REFERENCES subtypes(id),
+    position INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS rules_lines (
+    card_id INTEGER NOT NULL REFERENCES cards(id), line_no INTEGER NOT NULL, text TEXT NOT NULL);
+"""
+
+# built after the rows are in: one sort per index instead of a B-tree update per insert
+INDEXES = """
+CREATE INDEX IF NOT EXISTS cards_set ON cards(set_id, number);
+CREATE INDEX IF NOT EXISTS cards_color ON cards(color_identity);
+CREATE INDEX IF NOT EXISTS cards_rarity ON cards(rarity);
+CREATE INDEX IF NOT EXISTS cards_mana_value ON cards(mana_value);
+CREATE INDEX IF NOT EXISTS card_types_type ON card_types(type_id, card_id);
+CREATE INDEX IF NOT EXISTS card_types_card ON card_types(card_id);
+CREATE INDEX IF NOT EXISTS card_subtypes_subtype ON card_subtypes(subtype_id, card_id);
+CREATE INDEX IF NOT EXISTS card_subtypes_card ON card_subtypes(card_id);
+CREATE INDEX IF NOT EXISTS rules_lines_card ON rules_lines(card_id, line_no);
+"""
+
+def _ids(conn:sqlite3.Connection, table:str)->Dict[str,int]:
+    return {name: i for i, name in conn.execute(f"SELECT id, name FROM {table}")}
+
+def _intern(ids:Dict[str,int], new:list, name:str)->int:
+    i = ids.get(name)
+    if i is None:
+        i = ids[name] = max(ids.values(), default=0) + 1
+        new.append((i, name))
+    return i
+
+@timed("export/sqlite")
+def write_sqlite(spec:SetSpec, cards:Iterable[Card], out_path:str, append:bool=False, batch_size:int=5000)->int:
+    """
+    Write cards into a SQLite database as one more set: cards, their types, subtypes and
+    rules lines in normalized tables (see SCHEMA), indexed for queries by color identity,
+    rarity, mana value and type. Rows go in with executemany, batch_size cards at a time,
+    inside a single transaction, so a failed export leaves any existing file as it was
+    (and no partial copy beside it).
+    Without append the file is replaced; with it the set is added next to those already
+    there. Returns the new set's id.
+    """
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    # a fresh database is built beside the target and swapped in once complete
+    db_path = out_path if append else out_path + ".tmp"
+    if not append and os.path.exists(db_path):
+        os.remove(db_path)
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, SCHEMA_VERSION):
+            raise ValueError(f"{db_path} has schema version {version}, expected {SCHEMA_VERSION}")
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # executescript would commit; run the statements inside this transaction instead
+            for stmt in SCHEMA.split(";"):
+                if stmt.strip():
+                    conn.execute(stmt)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            set_id = conn.execute(
+                "INSERT INTO sets (name, code, description, seed, created) VALUES (?, ?, ?, ?, ?)",
+                (spec.name, spec.code, spec.description, spec.seed,
+                 datetime.now().isoformat(timespec="seconds"))).lastrowid
+            type_ids, subtype_ids = _ids(conn, "types"), _ids(conn, "subtypes")
+            card_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM cards").fetchone()[0]
+            rows, type_rows, subtype_rows, line_rows, new_types, new_subtypes = [], [], [], [], [], []
+
+            def flush():
+                conn.executemany("INSERT INTO types (id, name) VALUES (?, ?)", new_types)
+                conn.executemany("INSERT INTO subtypes (id, name) VALUES (?, ?)", new_subtypes)
+                conn.executemany("INSERT INTO cards VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                conn.executemany("INSERT INTO card_types VALUES (?, ?, ?)", type_rows)
+                conn.executemany("INSERT INTO card_subtypes VALUES (?, ?, ?)", subtype_rows)
+                conn.executemany("INSERT INTO rules_lines VALUES (?, ?, ?)", line_rows)
+                for buf in (rows, type_rows, subtype_rows, line_rows, new_types, new_subtypes):
+                    buf.clear()
+
+            n = 0
+            for n, c in enumerate(cards, start=1):
+                card_id += 1
+                rules = c.rules_text or ""
+                rows.append((card_id, set_id, n, c.name, c.mana_cost, c.mana_value, c.rarity,
+                             "".join(c.color_identity or "") or "C", c.power, c.toughness, rules,
+                             c.flavor_text, c.art_description))
+                type_rows.extend((card_id, _intern(type_ids, new_types, t), k) for k, t in enumerate(c.types))
+                subtype_rows.extend((card_id, _intern(subtype_ids, new_subtypes, s), k)
+                                    for k, s in enumerate(c.subtypes))
+                if rules:
+                    line_rows.extend((card_id, k, ln) for k, ln in enumerate(rules.split("\n"), start=1))
+                if len(rows) >= batch_size:
+                    flush()
+            flush()
+            conn.execute("UPDATE sets SET total = ? WHERE id = ?", (n, set_id))
+            for stmt in INDEXES.split(";"):
+                if stmt.strip():
+                    conn.execute(stmt)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    except BaseException:
+        conn.close()
+        if not append and os.path.exists(db_path):
+            # the half-built copy is of no use, and the target was never touched
+            os.remove(db_path)
+        raise
+    conn.close()
+    if not append:
+        os.replace(db_path, out_path)
+    return set_id
+
+def export_sqlite(card_set:CardSet, out_path:str, append:bool=False)->int:
+    return write_sqlite(card_set.spec, card_set.cards, out_path, append=append)
@@ -0,0 +1,22 @@
+import gzip, lzma, os
+from typing import Optional, TextIO
+
+# compression name -> opener; None writes a plain file
+COMPRESSORS = {"gz": gzip.open, "xz": lzma.open}
+
+def compression_for(path:str, compress:Optional[str]=None)->Optional[str]:
+    """compress if given, else inferred from a .gz / .xz suffix (None = uncompressed)."""
+    if compress:
+        if compress not in COMPRESSORS:
+            raise ValueError(f"unknown compression {compress!r}; expected one of {sorted(COMPRESSORS)}")
+        return compress
+    ext = os.path.splitext(path)[1].lower().lstrip(".")
+    return ext if ext in COMPRESSORS else None
+
+def open_text(path:str, compress:Optional[str]=None, newline:Optional[str]=None)->TextIO:
+    """A UTF-8 text file for writing, creating its folder, compressed on the fly when asked."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    kind = compression_for(path, compress)
+    if kind is None:
+        return open(path, "w", encoding="utf-8", newline=newline)
+    return COMPRESSORS[kind](path, "wt", encoding="utf-8", newline=newline)
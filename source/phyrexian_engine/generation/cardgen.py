@@ -3,7 +3,8 @@ from typing import List
 from .distribution import sample_mana_value, DEFAULT_CURVE, rarity_bucket
 from ..models import Card, SetSpec, RARITY_SLOTS
 from ..util import make_mana_cost
-from .templates import pick_effect
+from .. import instrument
+from .templates import sample_effects
 from .strings import finalize_effect_template
 
 # Default evergreen keywords by color; packages can add more via 'monster_keywords'
@@ -35,51 +36,56 @@ def _fallback_spell_effect(card_type: str, colors: List[str], mv: int) -> str:
         return f"Create {count} 1/1 {(' '.join(colors) + ' ' if colors else '')}creature token(s)."
     return "Draw a card."
 
-def _slots_for_rarity(rarity: str) -> int:
+def _slots_for_rarity(rarity: str, rng=random) -> int:
     key = (rarity or '').lower()
     lo, hi = RARITY_SLOTS.get(key, (1, 1))
-    return random.randint(lo, hi)
+    return rng.randint(lo, hi)
 
 def _append_unique_effects(rules_parts, *, type_key: str, slots: int, colors: List[str], mv: int,
-                           effects, string_pools, subtypes_pool, fallback_text: str = None,
-                           attempts_per_slot: int = 6):
-    """Pick up to `slots` effect lines without duplicates (post-finalization)."""
-    from .strings import finalize_effect_template
-    seen = set()
-    added = 0
-    for _ in range(max(0, slots)):
-        chosen_raw = None
-        for _try in range(max(1, attempts_per_slot)):
-            eff = pick_effect(effects, string_pools, subtypes_pool, type_key, colors, mv)
-            if not eff and fallback_text:
-                eff = fallback_text
-            if not eff:
-                continue
-            canon = finalize_effect_template(eff, colors, mv, string_pools, subtypes_pool).strip().lower()
+                           effects, string_pools, subtypes_pool, fallback_text: str = None, rng=random):
+    """
+    Append up to `slots` rendered effect lines that differ from each other and from the
+    lines already in rules_parts. Templates are drawn without replacement, so this
+    renders each eligible template at most once and stops when the pool runs dry.
+    """
+    seen = {p.strip().lower() for p in rules_parts}
+    added = drawn = 0
+    if slots > 0:
+        for tmpl in sample_effects(effects, type_key, colors, mv, rng):
+            drawn += 1
+            line = finalize_effect_template(tmpl, colors, mv, string_pools, subtypes_pool, rng)
+            canon = line.strip().lower()
             if canon and canon not in seen:
-                chosen_raw = eff
+                rules_parts.append(line)
                 seen.add(canon)
-                break
-        if chosen_raw:
-            rules_parts.append(chosen_raw)
-            added += 1
-    if added == 0 and fallback_text:
-        rules_parts.append(fallback_text)
+                added += 1
+                if added >= slots:
+                    break
+    fallback = added == 0 and fallback_text
+    if fallback:
+        rules_parts.append(finalize_effect_template(fallback_text, colors, mv, string_pools, subtypes_pool, rng))
+    metrics = instrument.active()
+    if metrics:
+        # samples: templates drawn; retries: drawn but rendered empty or as a duplicate line
+        metrics.count("template.samples", drawn)
+        metrics.count("template.retries", drawn - added)
+        if fallback:
+            metrics.count("template.fallbacks")
     return added
 
 
-def _maybe_keywords(colors: List[str], mv: int, monster_keywords) -> List[str]:
+def _maybe_keywords(colors: List[str], mv: int, monster_keywords, rng=random) -> List[str]:
     pool = []
     for c in colors or []:
         pool += CREATURE_KEYWORDS_BY_COLOR.get(c, [])
         if monster_keywords:
             pool += monster_keywords.get(c, [])
     k = 0
-    r = random.random()
+    r = rng.random()
     if r < 0.25: k = 1
     elif r < 0.35: k = 2
     choices = []
-    random.shuffle(pool)
+    rng.shuffle(pool)
     for kw in pool:
         if kw not in choices:
             x = max(1, min(6, mv))
@@ -95,17 +101,21 @@ def generate_card(code: str,
                   effects,
                   subtypes_pool,
                   string_pools,
-                  monster_keywords):
-    # pick mana value up front
-    mv = sample_mana_value(DEFAULT_CURVE)
-    rarity = rarity_bucket(spec)
+                  monster_keywords,
+                  rng=random,
+                  mana_value=None,
+                  rarity=None):
+    # mana value and rarity come from the set plan; draw them here only without one
+    mv = mana_value if mana_value is not None else sample_mana_value(spec.target_curve or DEFAULT_CURVE, rng)
+    if rarity is None:
+        rarity = rarity_bucket(spec, rng)
 
     # Lands should have no mana cost and mana value 0
     if card_type == 'Land':
         mv = 0
 
     color_id = "".join(colors) or None
-    mana_cost = make_mana_cost(mv, colors)
+    mana_cost = make_mana_cost(mv, colors, rng)
 
     card = Card(
         temp_id=code,
@@ -142,31 +152,32 @@ def generate_card(code: str,
 
             # Remove duplicates, randomize
             candidates = list(dict.fromkeys(candidates))
-            random.shuffle(candidates)
+            rng.shuffle(candidates)
 
             if candidates:
                 max_types = 4
                 min_types = 1
-                n_types = random.randint(min_types, min(max_types, len(candidates)))
+                n_types = rng.randint(min_types, min(max_types, len(candidates)))
                 card.subtypes = candidates[:n_types]
         else:
             # Existing behavior for non-commander sets
             for ccol in colors or []:
                 if subtypes_pool.get(ccol):
-                    card.subtypes.append(random.choice(subtypes_pool[ccol]))
+                    card.subtypes.append(rng.choice(subtypes_pool[ccol]))
 
 
         # Keyword abilities (first line, comma-separated)
-        kw = _maybe_keywords(colors, mv, monster_keywords)
+        kw = _maybe_keywords(colors, mv, monster_keywords, rng)
         if kw:
             seen_kw = set()
             kw = [k for k in kw if not (k in seen_kw or seen_kw.add(k))]
             if kw:
                 kw_line = ", ".join(kw)
-                rules_parts.append(kw_line[:1].upper() + kw_line[1:])
+                rules_parts.append(finalize_effect_template(kw_line[:1].upper() + kw_line[1:],
+                                                            colors, mv, string_pools, subtypes_pool, rng))
 
         # Ability lines scaled by rarity (one per line), deduped
-        slots = _slots_for_rarity(rarity)
+        slots = _slots_for_rarity(rarity, rng)
         _append_unique_effects(
             rules_parts,
             type_key="Creature",
@@ -176,12 +187,13 @@ def generate_card(code: str,
             effects=effects,
             string_pools=string_pools,
             subtypes_pool=subtypes_pool,
+            rng=rng,
             fallback_text="When this creature enters the battlefield, {ACTIVATED_EFFECT}",
         )
 
     elif card_type in ('Instant', 'Sorcery'):
         card.types = [card_type]
-        slots = _slots_for_rarity(rarity)
+        slots = _slots_for_rarity(rarity, rng)
         _append_unique_effects(
             rules_parts,
             type_key=card_type,
@@ -191,12 +203,13 @@ def generate_card(code: str,
             effects=effects,
             string_pools=string_pools,
             subtypes_pool=subtypes_pool,
+            rng=rng,
             fallback_text=_fallback_spell_effect(card_type, colors, mv),
         )
 
     elif card_type == 'Enchantment':
         card.types = ['Enchantment']
-        slots = max(1, _slots_for_rarity(rarity))
+        slots = max(1, _slots_for_rarity(rarity, rng))
         _append_unique_effects(
             rules_parts,
             type_key="Enchantment",
@@ -206,12 +219,13 @@ def generate_card(code: str,
             effects=effects,
             string_pools=string_pools,
             subtypes_pool=subtypes_pool,
-            fallback_text=random.choice(DEFAULT_ENCHANTMENT_EFFECTS),
+            rng=rng,
+            fallback_text=rng.choice(DEFAULT_ENCHANTMENT_EFFECTS),
         )
 
     elif card_type == 'Artifact':
         card.types = ['Artifact']
-        slots = _slots_for_rarity(rarity)
+        slots = _slots_for_rarity(rarity, rng)
         _append_unique_effects(
             rules_parts,
             type_key="Artifact",
@@ -221,13 +235,14 @@ def generate_card(code: str,
             effects=effects,
             string_pools=string_pools,
             subtypes_pool=subtypes_pool,
+            rng=rng,
             fallback_text="{T}: Add one mana of any color.",
         )
 
     elif card_type == 'AuraCreature':
         card.types = ['Enchantment']; card.subtypes = ['Aura']
         rules_parts.append("Enchant creature")
-        slots = _slots_for_rarity(rarity)
+        slots = _slots_for_rarity(rarity, rng)
         _append_unique_effects(
             rules_parts,
             type_key="AuraCreature",
@@ -237,13 +252,14 @@ def generate_card(code: str,
             effects=effects,
             string_pools=string_pools,
             subtypes_pool=subtypes_pool,
+            rng=rng,
             fallback_text=DEFAULT_AURA_CREATURE,
         )
 
     elif card_type == 'AuraLand':
         card.types = ['Enchantment']; card.subtypes = ['Aura']
         rules_parts.append("Enchant land")
-        slots = _slots_for_rarity(rarity)
+        slots = _slots_for_rarity(rarity, rng)
         _append_unique_effects(
             rules_parts,
             type_key="AuraLand",
@@ -253,12 +269,13 @@ def generate_card(code: str,
             effects=effects,
             string_pools=string_pools,
             subtypes_pool=subtypes_pool,
+            rng=rng,
             fallback_text=DEFAULT_AURA_LAND,
         )
 
     elif card_type == 'Equipment':
         card.types = ['Artifact']; card.subtypes = ['Equipment']
-        slots = _slots_for_rarity(rarity)
+        slots = _slots_for_rarity(rarity, rng)
         _append_unique_effects(
             rules_parts,
             type_key="Equipment",
@@ -268,9 +285,10 @@ def generate_card(code: str,
             effects=effects,
             string_pools=string_pools,
             subtypes_pool=subtypes_pool,
+            rng=rng,
             fallback_text=DEFAULT_EQUIPMENT,
         )
-        rules_parts.append("Equip {EQUIP_COST}")
+        rules_parts.append(finalize_effect_template("Equip {EQUIP_COST}", colors, mv, string_pools, subtypes_pool, rng))
 
     else:
         card.types = ['Land']
@@ -286,15 +304,15 @@ def generate_card(code: str,
         # Decide how many colors this land can produce based on rarity
         def _colors_span_for_rarity(rk: str, avail_n: int) -> int:
             # common: 1-2; uncommon: 1-3; rare: 2-4; mythic: 3-5 (clamped by available colors)
-            rng = {
+            span = {
                 'common': (1, 2),
                 'uncommon': (1, 3),
                 'rare': (2, 4),
                 'mythic': (3, 5),
             }.get(rk, (1, 2))
-            hi = max(rng[0], min(rng[1], avail_n))
-            lo = min(rng[0], hi)
-            return random.randint(lo, hi)
+            hi = max(span[0], min(span[1], avail_n))
+            lo = min(span[0], hi)
+            return rng.randint(lo, hi)
 
         ncols = _colors_span_for_rarity(rarity_key, len(available))
 
@@ -302,7 +320,7 @@ def generate_card(code: str,
             # Either strictly "any one color" or effectively five colors
             rules_parts.append("{T}: Add one mana of any color.")
         else:
-            chosen = sorted(random.sample(available, k=ncols), key=lambda c: "WUBRG".index(c))
+            chosen = sorted(rng.sample(available, k=ncols), key=lambda c: "WUBRG".index(c))
             mana_syms = [f"{{{c}}}" for c in chosen]
             if len(mana_syms) == 2:
                 mana_text = f"{mana_syms[0]} or {mana_syms[1]}"
@@ -326,9 +344,9 @@ def generate_card(code: str,
             'mythic': (0, 1),
         }
         plo, phi = penalty_counts.get(rarity_key, (1,1))
-        num_penalties = random.randint(plo, phi)
+        num_penalties = rng.randint(plo, phi)
         if num_penalties > 0:
-            rules_parts.extend(random.sample(LAND_PENALTIES, k=min(num_penalties, len(LAND_PENALTIES))))
+            rules_parts.extend(rng.sample(LAND_PENALTIES, k=min(num_penalties, len(LAND_PENALTIES))))
 
         # 3) Extra abilities pulled from Enchantment/Artifact pools
         # common: 1, uncommon: 1-2, rare: 2-3, mythic: 3-4
@@ -338,11 +356,11 @@ def generate_card(code: str,
             'rare': (2, 3),
             'mythic': (3, 4),
         }.get(rarity_key, (1,1))
-        extra_slots = random.randint(*extra_slots_rng)
+        extra_slots = rng.randint(*extra_slots_rng)
 
         # Fill each slot by sampling either Enchantment or Artifact effect templates
         for _ in range(extra_slots):
-            type_choice = random.choice(['Enchantment', 'Artifact'])
+            type_choice = rng.choice(['Enchantment', 'Artifact'])
             # Use one slot at a time to force diversity and respect uniqueness
             _append_unique_effects(
                 rules_parts,
@@ -353,10 +371,10 @@ def generate_card(code: str,
                 effects=effects,
                 string_pools=string_pools,
                 subtypes_pool=subtypes_pool,
+                rng=rng,
             )
 
-    # Final pass so all placeholders (including late-added lines) are substituted
-    raw_text = "\n".join([p for p in rules_parts if p])
-    card.rules_text = finalize_effect_template(raw_text, colors, mv, string_pools, subtypes_pool)
+    # Every line is rendered as it is added; effect lines are kept exactly as deduped
+    card.rules_text = "\n".join([p for p in rules_parts if p])
 
     return card
@@ -0,0 +1,171 @@
+# generation/dedup.py
+import hashlib, re, struct
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .. import instrument
+from ..models import Card
+
+_WORD_RE = re.compile(r"[a-z0-9+/{}\-]+")
+
+# MinHash: one 64-byte blake2b digest per shingle gives it 16 independent 32-bit hashes,
+# and slot k of a signature is the smallest k-th hash over the text's shingles
+MAX_PERM = 16
+
+def normalize(text: str) -> str:
+    """Lowercase, one space between words, no trailing periods: what makes two texts 'the same'."""
+    return " ".join(text.lower().replace(".", " ").split())
+
+def _shingles(text: str) -> Set[str]:
+    words = _WORD_RE.findall(text)
+    return {" ".join(words[k:k + 2]) for k in range(len(words) - 1)} or set(words)
+
+_ROMAN = ("", "", " II", " III", " IV", " V", " VI", " VII", " VIII", " IX", " X")
+_NUMERAL_RE = re.compile(r" (?:I{2,3}|IV|VI{0,3}|IX|X|\d+)$", re.IGNORECASE)
+
+class DuplicateIndex:
+    """
+    Set-wide index of generated cards for re-rolling duplicates as they are made.
+
+    A card duplicates an earlier one when its type line and rules text match after
+    normalize() (one dict lookup on a hash), and nearly duplicates one when, with the
+    same type line, the word-pair MinHash signatures of the rules texts agree on at
+    least near_threshold of their slots. Near matches are found by LSH: signatures are
+    cut into bands and only cards sharing a band are compared, at most max_candidates
+    each, so a check costs the same whether the set has a hundred cards or a million.
+    variants records which cards were re-rolled (see pipeline.reroll_card) and stats
+    what was found.
+    """
+    def __init__(self, near_threshold: float = 0.8, num_perm: int = 16, bands: int = 4,
+                 max_rerolls: int = 3, max_candidates: int = 16):
+        if not 0 < num_perm <= MAX_PERM or num_perm % bands:
+            raise ValueError(f"num_perm must be a multiple of bands and at most {MAX_PERM}")
+        self.near_threshold = near_threshold
+        self.max_rerolls = max_rerolls
+        self.max_candidates = max_candidates
+        self._rows = num_perm // bands
+        self._unpack = struct.Struct(f"<{num_perm}I").unpack
+        self._digest = 4 * num_perm
+        self._exact: Dict[bytes, int] = {}
+        self._buckets: Dict[Tuple[int, str, Tuple[int, ...]], List[int]] = {}
+        self._signatures: Dict[int, Tuple[int, ...]] = {}
+        self.variants: Dict[int, int] = {}
+        self.stats = {"exact": 0, "near": 0, "rerolls": 0, "unresolved": 0}
+
+    @staticmethod
+    def _exact_key(typeline: str, rules: str) -> bytes:
+        return hashlib.blake2b(f"{typeline}\0{rules}".encode("utf-8"), digest_size=16).digest()
+
+    def _signature(self, rules: str) -> Optional[Tuple[int, ...]]:
+        shingles = _shingles(rules)
+        if not shingles:
+            return None
+        unpack, size = self._unpack, self._digest
+        rows = [unpack(hashlib.blake2b(g.encode("utf-8"), digest_size=size).digest()) for g in shingles]
+        return tuple(map(min, zip(*rows)))
+
+    def _bands(self, typeline: str, sig: Tuple[int, ...]):
+        r = self._rows
+        return [(k, typeline, sig[k * r:(k + 1) * r]) for k in range(len(sig) // r)]
+
+    def _prepare(self, card: Card):
+        typeline = normalize(card.typeline())
+        rules = normalize(card.rules_text or "")
+        return typeline, rules, self._exact_key(typeline, rules), self._signature(rules)
+
+    def check(self, card: Card) -> Optional[str]:
+        """'exact', 'near' or None: how card relates to the cards added so far."""
+        return self._check(*self._prepare(card))
+
+    def _check(self, typeline, rules, key, sig) -> Optional[str]:
+        if not rules:
+            return None  # vanilla cards differ by cost and P/T alone
+        if key in self._exact:
+            return "exact"
+        if sig is None:
+            return None
+        need = self.near_threshold * len(sig)
+        seen = set()
+        for band in self._bands(typeline, sig):
+            for j in self._buckets.get(band, ())[-self.max_candidates:]:
+                if j in seen:
+                    continue
+                seen.add(j)
+                other = self._signatures[j]
+                if sum(1 for x, y in zip(sig, other) if x == y) >= need:
+                    return "near"
+        return None
+
+    def add(self, i: int, card: Card) -> None:
+        self._add(i, *self._prepare(card))
+
+    def _add(self, i, typeline, rules, key, sig) -> None:
+        if not rules:
+            return
+        self._exact.setdefault(key, i)
+        if sig is not None:
+            self._signatures[i] = sig
+            for band in self._bands(typeline, sig):
+                self._buckets.setdefault(band, []).append(i)
+
+    def admit(self, i: int, card: Card, reroll) -> Card:
+        """
+        Card i, or a re-roll of it (reroll(variant) -> Card) that is not a duplicate,
+        trying at most max_rerolls variants; the last try is kept if all collide.
+        """
+        prepared = self._prepare(card)
+        found = self._check(*prepared)
+        variant = 0
+        while found is not None and variant < self.max_rerolls:
+            self.stats[found] += 1
+            variant += 1
+            card = reroll(variant)
+            prepared = self._prepare(card)
+            found = self._check(*prepared)
+        if variant:
+            self.variants[i] = variant
+            self.stats["rerolls"] += variant
+            if found is not None:
+                self.stats[found] += 1
+                self.stats["unresolved"] += 1
+            metrics = instrument.active()
+            if metrics is not None:
+                metrics.count("dedup.rerolls", variant)
+                if found is not None:
+                    metrics.count("dedup.unresolved")
+        self._add(i, *prepared)
+        return card
+
+    def summary(self) -> str:
+        s = self.stats
+        return (f"{s['exact']} exact and {s['near']} near duplicates, {s['rerolls']} re-rolls, "
+                f"{s['unresolved']} kept after {self.max_rerolls} tries")
+
+def dedupe_names(cards: Iterable[Card]) -> int:
+    """
+    Give repeated names a numeral (" II", " III", ...) in card order, skipping any name
+    already taken; returns how many were renamed. Names come from the LLM after
+    generation, so this runs once at the end.
+    """
+    used: Set[str] = set()
+    last: Dict[str, int] = {}  # highest numeral handed out per base name
+    renamed = 0
+    for card in cards:
+        name = card.name
+        if not name:
+            continue
+        if name.lower() not in used:
+            used.add(name.lower())
+            continue
+        # a repeat of "Name II" is numbered as another "Name"
+        base = _NUMERAL_RE.sub("", name)
+        n = last.get(base.lower(), 1)
+        while True:
+            n += 1
+            candidate = f"{base}{_ROMAN[n] if n < len(_ROMAN) else f' {n}'}"
+            if candidate.lower() not in used:
+                break
+        last[base.lower()] = n
+        card.name = candidate
+        used.add(candidate.lower())
+        renamed += 1
+    return renamed
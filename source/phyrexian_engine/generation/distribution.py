@@ -1,56 +1,164 @@
 import random
-from typing import List
-from ..models import SetSpec
+from itertools import accumulate, chain, repeat
+from typing import Dict, List, Sequence, Tuple
+from ..models import COLORS, SetSpec, Skeleton
+from ..instrument import timed
 
 # Default mana curve weights (favoring 2–4 MV)
 DEFAULT_CURVE = {1: 10, 2: 18, 3: 20, 4: 16, 5: 10, 6: 6}
 
-def sample_mana_value(curve:dict)->int:
-    vals = []
-    for mv, w in curve.items():
-        vals += [mv]*w
-    return random.choice(vals)
-
-def rarity_bucket(spec:SetSpec)->str:
-    # Weighted rarities
-    weights = {'Common': 100, 'Uncommon': 35, 'Rare': 15, 'Mythic': 5}
-    pool = []
-    for k, w in weights.items():
-        pool += [k]*w
-    return random.choice(pool)
-
-def plan_types(spec:SetSpec)->List[str]:
-    """Returns a planned list of card types matching set size and toggles.
-    Added new supported pseudo-types:
-      - AuraCreature
-      - AuraLand
-      - Equipment
-    These behave as Enchantments/Artifacts but get generated distinctly."""
-    # Commander Mode: only creatures (these will become Legendary in cardgen)
-    if getattr(spec, "commander_mode", False):
-        total = max(1, spec.total_cards)
-        return ["Creature"] * total    
-    base_types = ['Creature','Instant','Sorcery','Enchantment','Artifact']
-    if spec.include_lands:
-        base_types.append('Land')
-    # Add the new subtypes with smaller weights
-    extended_types = base_types + ['AuraCreature','AuraLand','Equipment']
-
-    weights = {
-        'Creature': 45,
-        'Instant': 15,
-        'Sorcery': 15,
-        'Enchantment': 10,
-        'Artifact': 8,
-        'Land': 5,
-        'AuraCreature': 6,
-        'AuraLand': 4,
-        'Equipment': 6,
-    }
-    pool = []
-    for t, w in weights.items():
-        pool += [t]*w
-    random.shuffle(pool)
-    total = max(1, spec.total_cards)
-    chosen = [random.choice(pool) for _ in range(total)]
-    return chosen
+# Planned types: the real card types plus pseudo-types that behave as
+# Enchantments/Artifacts but get generated distinctly
+PLAN_TYPES = ['Creature', 'Instant', 'Sorcery', 'Enchantment', 'Artifact', 'Land', 'AuraCreature', 'AuraLand', 'Equipment']
+RARITY_NAMES = ['Common', 'Uncommon', 'Rare', 'Mythic']
+
+# Commander color count (0-5) weights: mostly 2–3 colors, some mono, some 4–5, rare colorless
+_COMMANDER_COLOR_COUNTS = [0, 1, 2, 3, 4, 5]
+_COMMANDER_COLOR_WEIGHTS = [1, 3, 6, 6, 3, 2]
+
+Table = Tuple[List, List[float]]
+
+def _table(weights:Dict, keep=None)->Table:
+    """(values, cumulative weights) of the positive entries, optionally filtered by keep(value)."""
+    items = [(k, float(w)) for k, w in weights.items() if w and w > 0 and (keep is None or keep(k))]
+    return [k for k, _ in items], list(accumulate(w for _, w in items))
+
+def _curve_table(spec:SetSpec)->Table:
+    if not spec.target_curve:
+        return _DEFAULT_CURVE_TABLE
+    values, cum = _table({int(k): w for k, w in spec.target_curve.items()})
+    return (values, cum) if values else _DEFAULT_CURVE_TABLE
+
+def _rarity_table(spec:SetSpec)->Table:
+    weights = {}
+    for k, w in (spec.rarity_weights or {}).items():
+        name = str(k).strip().capitalize()
+        weights[name] = weights.get(name, 0) + (w or 0)
+    values, cum = _table(weights, lambda k: k in RARITY_NAMES)
+    return (values, cum) if values else (['Common'], [1.0])
+
+def _type_table(spec:SetSpec)->Table:
+    if spec.commander_mode:
+        # Commander Mode: only creatures (these will become Legendary in cardgen)
+        return ['Creature'], [1.0]
+    skip = set()
+    if not spec.include_lands:
+        skip.add('Land')
+    if not spec.include_artifacts:
+        skip.update(('Artifact', 'Equipment'))
+    values, cum = _table(spec.type_weights or {}, lambda k: k in PLAN_TYPES and k not in skip)
+    return (values, cum) if values else (['Creature'], [1.0])
+
+_DEFAULT_CURVE_TABLE = _table(DEFAULT_CURVE)
+
+def _apportion(cum:Sequence[float], n:int)->List[int]:
+    """Largest-remainder split of n into counts proportional to the weights behind cum."""
+    weights = [b - a for a, b in zip(chain((0.0,), cum), cum)]
+    total = cum[-1]
+    raw = [w * n / total for w in weights]
+    counts = [int(r) for r in raw]
+    order = sorted(range(len(raw)), key=lambda k: counts[k] - raw[k])
+    for k in order[:n - sum(counts)]:
+        counts[k] += 1
+    return counts
+
+def _draw(table:Table, n:int, rng, exact:bool)->List:
+    """n values: independent weighted draws, or with exact the apportioned counts shuffled."""
+    values, cum = table
+    if not exact:
+        return rng.choices(values, cum_weights=cum, k=n)
+    out = list(chain.from_iterable(repeat(v, c) for v, c in zip(values, _apportion(cum, n))))
+    rng.shuffle(out)
+    return out
+
+def sample_mana_value(curve:dict, rng=random)->int:
+    values, cum = _DEFAULT_CURVE_TABLE if curve is DEFAULT_CURVE else _table(curve)
+    return rng.choices(values, cum_weights=cum)[0]
+
+def rarity_bucket(spec:SetSpec, rng=random)->str:
+    values, cum = _rarity_table(spec)
+    return rng.choices(values, cum_weights=cum)[0]
+
+def plan_colors(spec:SetSpec, types:Sequence[str], rng=random)->List[List[str]]:
+    """Color identity of every planned card; same rules as pick_colors, drawn as whole columns."""
+    n = len(types)
+    if spec.commander_mode:
+        all_cols = spec.colors or COLORS
+        ks = rng.choices(_COMMANDER_COLOR_COUNTS, weights=_COMMANDER_COLOR_WEIGHTS, k=n)
+        return [rng.sample(all_cols, k=min(k, len(all_cols))) if k else [] for k in ks]
+    colors = list(spec.colors)
+    # each card's three draws: artifact-colorless test, multicolor test, mono pick
+    artifact_roll = [rng.random() for _ in range(n)]
+    multi_roll = [rng.random() for _ in range(n)]
+    mono = rng.choices(colors + [None], k=n)
+    can_multicolor = len(colors) >= 2
+    out = []
+    for t, a, m, c in zip(types, artifact_roll, multi_roll, mono):
+        if t == 'Land':
+            out.append([])
+        elif t in ('Artifact', 'Equipment') and spec.include_artifacts and a < 0.80:
+            out.append([])
+        elif can_multicolor and m < 0.15:
+            out.append(rng.sample(colors, k=2))
+        else:
+            out.append([c] if c else [])
+    return out
+
+@timed("plan")
+def plan_skeleton(spec:SetSpec, rng=random, exact:bool=False)->Skeleton:
+    """
+    Plan every card of the set at once: type, rarity, mana value and colors, each drawn
+    as a whole column from spec.type_weights, spec.rarity_weights and spec.target_curve
+    (DEFAULT_CURVE if empty). Lands get mana value 0. With exact, types, rarities and
+    the nonland curve follow the weights as closely as whole numbers allow (largest
+    remainder) and are then shuffled, instead of being sampled independently.
+    """
+    n = max(1, spec.total_cards)
+    types = _draw(_type_table(spec), n, rng, exact)
+    rarities = _draw(_rarity_table(spec), n, rng, exact)
+    nonland = [k for k, t in enumerate(types) if t != 'Land']
+    mana_values = [0] * n
+    for k, mv in zip(nonland, _draw(_curve_table(spec), len(nonland), rng, exact)):
+        mana_values[k] = mv
+    return Skeleton(types, rarities, mana_values, plan_colors(spec, types, rng))
+
+def plan_types(spec:SetSpec, rng=random)->List[str]:
+    """Returns a planned list of card types matching set size and toggles (see plan_skeleton)."""
+    return _draw(_type_table(spec), max(1, spec.total_cards), rng, False)
+
+def pick_colors(spec:SetSpec, card_type:str, rng=random)->List[str]:
+    """Color identity for one card of the given planned type (plan_colors does a whole set)."""
+    if spec.commander_mode:
+        # Commander Mode: 0–5 colors, biased towards multicolor
+        all_cols = spec.colors or ['W','U','B','R','G']
+
+        # weights: mostly 2–3 colors, some mono, some 4–5, rare colorless
+        choices = [0, 1, 2, 3, 4, 5]          # # of colors
+        weights = [1, 3, 6, 6, 3, 2]          # tweak as desired
+
+        k = rng.choices(choices, weights=weights, k=1)[0]
+        k = min(k, len(all_cols))            # don't exceed allowed colors
+
+        if k <= 0:
+            return []                        # colorless commander (weird but allowed)
+        return rng.sample(all_cols, k=k)
+
+    # Determine color identity for this card with proper distribution.
+    if card_type == 'Land':
+        # Lands are colorless identity for cost purposes (no cost anyway)
+        return []
+    # Artifacts / Equipment: 80% chance to be colorless
+    if card_type in ('Artifact', 'Equipment') and spec.include_artifacts and rng.random() < 0.80:
+        return []
+    # 15% chance to be multicolor (only if at least 2 colors available)
+    can_multicolor = len(spec.colors) >= 2
+    if can_multicolor and rng.random() < 0.15:
+        pick_n = min(2, len(spec.colors))
+        return rng.sample(spec.colors, k=pick_n)
+    # Otherwise pick ONE mono color or colorless with equal weight
+    # Build options = each allowed color + 'colorless'
+    opts = list(spec.colors) + ['colorless']
+    choice = rng.choice(opts) if opts else 'colorless'
+    if choice == 'colorless':
+        return []
+    return [choice]
@@ -0,0 +1,182 @@
+# generation/library.py
+import logging, os, threading
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from .strings import unknown_tokens
+from .templates import EffectTable, load_package
+
+log = logging.getLogger(__name__)
+
+@dataclass
+class Fragment:
+    """One parsed package as load_package returns it, plus the file stat it was read at."""
+    path: str
+    mtime_ns: int
+    size: int
+    effects: dict
+    subtypes: dict
+    pools: dict
+    keywords: dict
+    tokens: FrozenSet[str]
+
+    def effect_keys(self) -> Set[Tuple[str, str]]:
+        return {(color, typ) for color, by_type in self.effects.items() for typ in by_type}
+
+def _dedupe_concat(lists: Iterable[List[str]]) -> List[str]:
+    # the same extend + dedupe load_packages does, in selection order
+    out: List[str] = []
+    seen = set()
+    for vals in lists:
+        for v in vals:
+            if v not in seen:
+                out.append(v)
+                seen.add(v)
+    return out
+
+class PackageLibrary:
+    """
+    Parsed packages of one folder kept as independent fragments, and the merged view of
+    a selection composed from them.
+
+    select() only (re)reads packages that are new or whose file changed since they were
+    read, and rebuilds only the effect buckets, subtype/pool/keyword lists and pick-index
+    entries those packages touch; everything else is shared with the previous view. The
+    result equals load_packages(pack_dir, selected) for the same selection, so seeded
+    output does not depend on the order packs were toggled in. poll() re-checks the
+    selected files so edits can be swapped in without restarting. Thread-safe.
+
+    Each view is a fresh set of dicts: a set generated from an earlier view keeps it.
+    """
+    def __init__(self, pack_dir: str, use_cache: bool = True, cache_dir: Optional[str] = None):
+        self.pack_dir = pack_dir
+        self.use_cache = use_cache
+        self.cache_dir = cache_dir
+        self.fragments: Dict[str, Fragment] = {}
+        self.selected: Tuple[str, ...] = ()
+        self.reads = 0  # package files read so far, for diagnostics
+        self._lock = threading.RLock()
+        self._reported: Set[Tuple[str, int, int]] = set()  # fragments already checked for unknown tokens
+        self._packs = None
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.pack_dir, name + ".json")
+
+    def select(self, names: Iterable[str]):
+        """The merged (effects, subtypes, pools, keywords) for names, in the order given."""
+        names = tuple(dict.fromkeys(n[:-5] if n.endswith(".json") else n for n in names))
+        with self._lock:
+            stale = self._refresh(names)
+            if self._packs is not None and names == self.selected and not stale:
+                return self._packs
+            self._compose(names, stale)
+            return self._packs
+
+    def poll(self) -> List[str]:
+        """Reload selected packages whose file changed or vanished; returns their names."""
+        with self._lock:
+            stale = self._refresh(self.selected)
+            if stale:
+                self._compose(self.selected, stale)
+            return sorted(stale)
+
+    def packs(self):
+        """The current merged view (select() must have been called)."""
+        return self._packs
+
+    # --- callers hold self._lock ---
+    def _refresh(self, names: Tuple[str, ...]) -> Dict[str, Optional[Fragment]]:
+        """Read new or changed packages; returns {name: fragment it replaced (None if new)}."""
+        stale: Dict[str, Optional[Fragment]] = {}
+        for name in names:
+            old = self.fragments.get(name)
+            path = self.path(name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                if old is not None:
+                    stale[name] = self.fragments.pop(name)
+                continue
+            if old is not None and old.mtime_ns == st.st_mtime_ns and old.size == st.st_size:
+                continue
+            try:
+                payload = load_package(path, self.use_cache, self.cache_dir)
+            except ValueError as e:
+                # keep serving the last good version while an edit is half-saved
+                log.warning("Could not read package %s: %s", name, e)
+                continue
+            self.reads += 1
+            self.fragments[name] = Fragment(path, st.st_mtime_ns, st.st_size, *payload)
+            stale[name] = old
+        return stale
+
+    def _compose(self, names: Tuple[str, ...], stale: Dict[str, Optional[Fragment]]) -> None:
+        frags = [self.fragments[n] for n in names if n in self.fragments]
+        prev = self._packs
+        old_sel = [n for n in self.selected if n in self.fragments or n in stale]
+        new_sel = [n for n in names if n in self.fragments]
+        if prev is None or [n for n in old_sel if n in new_sel] != [n for n in new_sel if n in old_sel]:
+            # first view, or packs changed relative order: everything is rebuilt from fragments
+            dirty = None
+        else:
+            dirty = set(old_sel) ^ set(new_sel) | set(stale)
+
+        def touched(attr) -> Optional[Set]:
+            if dirty is None:
+                return None
+            keys = set()
+            for n in dirty:
+                for frag in (self.fragments.get(n), stale.get(n)):
+                    if frag is not None:
+                        keys |= frag.effect_keys() if attr == "effects" else set(getattr(frag, attr))
+            return keys
+
+        p_effects, p_subtypes, p_pools, p_keywords = prev if prev is not None else (EffectTable(), {}, {}, {})
+
+        effects = EffectTable()
+        keys = touched("effects")
+        if keys is None:
+            keys = {k for f in frags for k in f.effect_keys()}
+        else:
+            for color, by_type in p_effects.items():
+                effects[color] = dict(by_type)
+            # pick-index entries for untouched card types stay valid
+            types = {typ for _, typ in keys}
+            effects._index.update((k, v) for k, v in p_effects._index.items() if k[0] not in types)
+        for color, typ in keys:
+            present = [f.effects[color][typ] for f in frags if typ in f.effects.get(color, ())]
+            if present:
+                effects.setdefault(color, {})[typ] = [e for entries in present for e in entries]
+            elif color in effects:
+                effects[color].pop(typ, None)
+        colors = {color for f in frags for color in f.effects}
+        for color in [c for c in effects if c not in colors]:
+            del effects[color]
+        for color in colors:
+            effects.setdefault(color, {})
+
+        merged = [effects]
+        for attr, prev_map in (("subtypes", p_subtypes), ("pools", p_pools), ("keywords", p_keywords)):
+            keys = touched(attr)
+            out = dict(prev_map) if keys is not None else {}
+            if keys is None:
+                keys = {k for f in frags for k in getattr(f, attr)}
+            for k in keys:
+                present = [getattr(f, attr)[k] for f in frags if k in getattr(f, attr)]
+                if present:
+                    out[k] = _dedupe_concat(present)
+                else:
+                    out.pop(k, None)
+            merged.append(out)
+
+        self.selected = names
+        self._packs = tuple(merged)
+        # each read of a package is checked once, not on every selection change
+        for frag in frags:
+            if (frag.path, frag.mtime_ns, frag.size) in self._reported:
+                continue
+            self._reported.add((frag.path, frag.mtime_ns, frag.size))
+            missing = unknown_tokens(frag.tokens, self._packs[2])
+            if missing:
+                log.warning("Templates in %s reference tokens with no string pool: %s",
+                            os.path.basename(frag.path), ", ".join(sorted(missing)))
@@ -0,0 +1,192 @@
+# generation/manifest.py
+import hashlib, json, os, tempfile, threading
+from dataclasses import asdict, dataclass, field, fields
+from typing import Dict, Iterable, List, Optional
+
+from ..util import cache_root
+from .templates import load_package
+
+# Bump whenever PackInfo gains or changes a field
+MANIFEST_VERSION = 1
+
+SORT_KEYS = ("name", "templates", "colors", "size", "modified")
+
+@dataclass
+class PackInfo:
+    """What one package contributes, without the templates themselves."""
+    name: str                # file name without .json
+    mtime_ns: int = 0
+    size: int = 0
+    colors: str = ""         # colors with at least one template, WUBRG then C / any
+    templates: int = 0
+    types: Dict[str, int] = field(default_factory=dict)  # templates per card type
+    subtypes: int = 0        # distinct creature subtypes
+    pools: List[str] = field(default_factory=list)       # string pool tokens defined
+    tokens: List[str] = field(default_factory=list)      # pool tokens the templates use
+    keywords: int = 0        # distinct monster keywords
+    error: str = ""          # set when the file could not be parsed
+
+    def summary(self) -> str:
+        if self.error:
+            return f"{self.name} - unreadable ({self.error})"
+        return f"{self.name} - {self.colors or 'no colors'}, {self.templates} templates, {_kib(self.size)}"
+
+    def details(self) -> str:
+        if self.error:
+            return self.error
+        types = ", ".join(f"{t} {n}" for t, n in sorted(self.types.items())) or "none"
+        return (f"templates: {types}; {self.subtypes} subtypes, {self.keywords} keywords, "
+                f"{len(self.pools)} string pools, uses {len(self.tokens)} tokens")
+
+def _kib(size: int) -> str:
+    return f"{size / 1024:.0f} KiB" if size >= 1024 else f"{size} B"
+
+_COLOR_ORDER = "WUBRGC"
+
+def _color_key(c: str):
+    return (_COLOR_ORDER.index(c), c) if c in _COLOR_ORDER else (len(_COLOR_ORDER), c)
+
+def describe_package(path: str, use_cache: bool = True, cache_dir: Optional[str] = None) -> PackInfo:
+    """PackInfo for one package file (served from the compiled package cache when possible)."""
+    st = os.stat(path)
+    info = PackInfo(name=os.path.splitext(os.path.basename(path))[0], mtime_ns=st.st_mtime_ns, size=st.st_size)
+    try:
+        effects, subtypes_pool, string_pools, monster_keywords, tokens = load_package(path, use_cache, cache_dir)
+    except (ValueError, TypeError, AttributeError) as e:
+        info.error = str(e) or type(e).__name__
+        return info
+    colors = []
+    for color, by_type in effects.items():
+        for typ, entries in by_type.items():
+            if entries:
+                info.types[typ] = info.types.get(typ, 0) + len(entries)
+                info.templates += len(entries)
+                if color not in colors:
+                    colors.append(color)
+    info.colors = "".join(c for c in sorted(colors, key=_color_key) if len(c) == 1)
+    if "any" in colors:
+        info.colors += " any" if info.colors else "any"
+    info.subtypes = len({s for subs in subtypes_pool.values() for s in subs})
+    info.pools = sorted(string_pools)
+    info.tokens = sorted(tokens)
+    info.keywords = len({k for kws in monster_keywords.values() for k in kws})
+    return info
+
+def default_manifest_path(pack_dir: str) -> str:
+    ap = os.path.abspath(pack_dir)
+    tag = hashlib.sha1(ap.encode("utf-8")).hexdigest()[:10]
+    return os.path.join(cache_root(), "manifests", f"{os.path.basename(ap) or 'packages'}-{tag}.json")
+
+class PackageManifest:
+    """
+    Per-package metadata for one packages folder, kept in a small JSON file.
+
+    refresh() only stats the folder; packages whose (mtime, size) changed are described
+    again, new ones added and deleted ones dropped. Listing, filtering and sorting never
+    load a full package, so the UI and CLI can show what every pack contributes at once.
+    """
+    def __init__(self, pack_dir: str, path: Optional[str] = None):
+        self.pack_dir = pack_dir
+        self.path = path or default_manifest_path(pack_dir)
+        self.packs: Dict[str, PackInfo] = self._read()
+        self.described = 0  # packages (re)described by the last refresh
+        self._lock = threading.Lock()
+
+    def refresh(self) -> List[PackInfo]:
+        """
+        Bring the index up to date with the folder; returns every PackInfo by name. May run
+        on a worker thread: packs is swapped whole, so readers see the old or the new index.
+        """
+        with self._lock:
+            return self._refresh()
+
+    def _refresh(self) -> List[PackInfo]:
+        try:
+            files = [f for f in os.listdir(self.pack_dir) if f.lower().endswith(".json")]
+        except FileNotFoundError:
+            files = []
+        current: Dict[str, PackInfo] = {}
+        self.described = 0
+        for f in files:
+            path = os.path.join(self.pack_dir, f)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            name = os.path.splitext(f)[0]
+            info = self.packs.get(name)
+            if info is None or info.mtime_ns != st.st_mtime_ns or info.size != st.st_size:
+                info = describe_package(path)
+                self.described += 1
+            current[name] = info
+        changed = self.described or current.keys() != self.packs.keys()
+        self.packs = current
+        if changed:
+            self._write()
+        return self.list()
+
+    def list(self) -> List[PackInfo]:
+        packs = self.packs
+        return [packs[k] for k in sorted(packs)]
+
+    def get(self, name: str) -> Optional[PackInfo]:
+        return self.packs.get(name[:-5] if name.endswith(".json") else name)
+
+    def _read(self) -> Dict[str, PackInfo]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION:
+            return {}
+        known = {f.name for f in fields(PackInfo)}
+        try:
+            return {d["name"]: PackInfo(**{k: v for k, v in d.items() if k in known}) for d in data["packs"]}
+        except (KeyError, TypeError):
+            return {}
+
+    def _write(self) -> None:
+        data = {"version": MANIFEST_VERSION, "packs": [asdict(i) for i in self.list()]}
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(data, f)
+                os.replace(tmp, self.path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        except OSError:
+            # like the package cache, the manifest is an optimization, never an error
+            pass
+
+def filter_packs(packs: Iterable[PackInfo], text: str = "", colors: str = "", card_type: str = "") -> List[PackInfo]:
+    """
+    Packs whose name contains text (case-insensitive), that have templates in any of
+    colors (e.g. "UB") and, if card_type is given, templates of that type.
+    """
+    text = text.strip().lower()
+    colors = colors.upper()
+    out = []
+    for p in packs:
+        if text and text not in p.name.lower():
+            continue
+        if colors and not any(c in p.colors for c in colors):
+            continue
+        if card_type and not any(t.lower() == card_type.lower() for t in p.types):
+            continue
+        out.append(p)
+    return out
+
+def sort_packs(packs: Iterable[PackInfo], key: str = "name", reverse: bool = False) -> List[PackInfo]:
+    """Sort by one of SORT_KEYS; ties and the name key sort by name."""
+    if key not in SORT_KEYS:
+        raise ValueError(f"unknown sort key {key!r} (expected one of {', '.join(SORT_KEYS)})")
+    packs = sorted(packs, key=lambda p: p.name.lower())
+    if key == "name":
+        return packs[::-1] if reverse else packs
+    attr = {"templates": lambda p: p.templates, "colors": lambda p: len(p.colors.replace(" any", "")),
+            "size": lambda p: p.size, "modified": lambda p: p.mtime_ns}[key]
+    return sorted(packs, key=attr, reverse=reverse)
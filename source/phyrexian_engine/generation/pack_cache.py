@@ -0,0 +1,87 @@
+# generation/pack_cache.py
+import hashlib, os, pickle, sys, tempfile
+from typing import Any, Callable, Optional
+from ..util import cache_root
+
+# Bump whenever the shape of the cached payload changes
+CACHE_VERSION = 2
+
+def default_cache_dir() -> str:
+    """Where compiled packages live: <cache root>/packages (see util.cache_root)."""
+    return os.path.join(cache_root(), "packages")
+
+def _cache_path(cache_dir: str, path: str) -> str:
+    # One file per package; the hash keeps same-named packs from different folders apart
+    ap = os.path.abspath(path)
+    tag = hashlib.sha1(ap.encode("utf-8")).hexdigest()[:10]
+    base = os.path.splitext(os.path.basename(ap))[0]
+    return os.path.join(cache_dir, f"{base}-{tag}.pickle")
+
+def _read_entry(cpath: str) -> Optional[dict]:
+    try:
+        with open(cpath, "rb") as f:
+            entry = pickle.load(f)
+    except Exception:
+        # missing, truncated or written by an incompatible version
+        return None
+    if not isinstance(entry, dict) or entry.get("version") != CACHE_VERSION:
+        return None
+    return entry
+
+def _write_entry(cpath: str, entry: dict) -> None:
+    try:
+        os.makedirs(os.path.dirname(cpath), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(cpath), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, cpath)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    except OSError:
+        # read-only or full disk: the cache is an optimization, never an error
+        pass
+
+def intern_strings(obj: Any) -> Any:
+    """Recursively intern every str inside lists/tuples/dicts so repeats share one object."""
+    if isinstance(obj, str):
+        return sys.intern(obj)
+    if isinstance(obj, dict):
+        return {intern_strings(k): intern_strings(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [intern_strings(v) for v in obj]
+    if isinstance(obj, tuple):
+        return tuple(intern_strings(v) for v in obj)
+    return obj
+
+def load_compiled(path: str, compile_fn: Callable[[bytes], Any], cache_dir: Optional[str] = None) -> Any:
+    """
+    Return compile_fn(raw_bytes) for the file at `path`, served from the on-disk cache
+    when possible.
+
+    An entry is reused when (mtime, size) match; if only the stat changed (touch, checkout)
+    the content hash decides. Anything else is recompiled and the entry rewritten.
+    """
+    cache_dir = cache_dir or default_cache_dir()
+    st = os.stat(path)
+    cpath = _cache_path(cache_dir, path)
+    entry = _read_entry(cpath)
+    if entry is not None and entry.get("mtime_ns") == st.st_mtime_ns and entry.get("size") == st.st_size:
+        return entry["payload"]
+
+    with open(path, "rb") as f:
+        raw = f.read()
+    digest = hashlib.sha256(raw).hexdigest()
+    if entry is not None and entry.get("sha256") == digest:
+        payload = entry["payload"]
+    else:
+        payload = intern_strings(compile_fn(raw))
+    _write_entry(cpath, {
+        "version": CACHE_VERSION,
+        "mtime_ns": st.st_mtime_ns,
+        "size": st.st_size,
+        "sha256": digest,
+        "payload": payload,
+    })
+    return payload
@@ -1,5 +1,7 @@
 # generation/strings.py
 import random, re
+from functools import lru_cache
+from typing import FrozenSet, Iterable, List, NamedTuple, Set, Tuple
 
 # Tokens we should never replace (MTG symbols etc.)
 SKIP_TOKENS = {"T", "W", "U", "B", "R", "G"}
@@ -9,7 +11,7 @@ DEFAULT_POOLS = {
     "TRIGGER_INTRO": ["When", "Whenever"],
     "CREATURE_CONTROLLER": ["you control", "an opponent controls"],
     "CREATURE_TRIGGER": ["enters the battlefield", "dies", "attacks", "blocks"],
-    "TOKEN_COLOR": ["{C}"],  # will be converted to a color word in the numeric/color pass
+    "TOKEN_COLOR": ["{C}"],  # rendered as a color word, like {C}
     "ACTIVATED_COST": ["{2}:"],
     "ACTIVATED_EFFECT": ["Draw a card."],
     "EQUIP_COST": ["{2}"],
@@ -26,99 +28,135 @@ def _pick_color_word(colors):
             return word
     return "colorless"
 
-def _pick_token_subtype(colors, string_pools, subtypes_pool):
+def _pick_token_subtype(colors, string_pools, subtypes_pool, rng=random):
     merged = []
     merged += string_pools.get("TOKEN_SUBTYPE", [])
     for c in colors or []:
         merged += subtypes_pool.get(c, [])
     if not merged:
         merged = ["Soldier", "Spirit", "Zombie", "Wolf"]
-    return random.choice(merged)
-
-def _sub_token_any(text: str, token: str, value: str) -> str:
-    """
-    Replace either {TOKEN} or [TOKEN] with value (case-insensitive).
-    """
-    pattern = re.compile(rf"(\{{{token}\}}|\[{token}\])", re.IGNORECASE)
-    return pattern.sub(value, text)
-
-def _find_all_tokens(text: str):
+    return rng.choice(merged)
+
+# Segment kinds of a compiled template
+_LIT, _POOL, _NUM_N, _NUM_X, _NUM_XX, _COLOR = range(6)
+_TOKEN_KINDS = {"N": _NUM_N, "X": _NUM_X, "C": _COLOR}
+
+# {X}/{X} is matched as a unit so the spaces around the slash disappear, as before
+_TOKEN_RE = re.compile(
+    r"(?P<xx>(?:\{X\}|\[X\])\s*/\s*(?:\{X\}|\[X\]))|\{(?P<b>[A-Za-z0-9_/]+)\}|\[(?P<s>[A-Za-z0-9_/]+)\]",
+    re.IGNORECASE,
+)
+
+# Mana/tap symbols and the like: expected to stay literal, so never reported as missing.
+# Generic and colored runs ({2G}, {CC}, {EEE}), X with a count ({X2}), hybrid and
+# Phyrexian ({2/W}, {G/P}) and named symbols ({TAP})
+_SYMBOL_RE = re.compile(
+    r"\d+|\d*[WUBRGCSXE]+|X\d+|[WUBRGC0-9]/[WUBRGCP]|[PQTYZ]|TAP|UNTAP|CHAOS", re.IGNORECASE)
+
+class CompiledTemplate(NamedTuple):
+    # (kind, text, token): text is the literal, or the raw token as written
+    segments: Tuple[Tuple[int, str, str], ...]
+    # UPPERCASE pool tokens referenced by the template
+    tokens: FrozenSet[str]
+
+@lru_cache(maxsize=1 << 16)
+def compile_template(template: str) -> CompiledTemplate:
     """
-    Return a set of raw token names found inside {...} or [...] (without braces/brackets).
-    Case-insensitive: returned in UPPERCASE.
+    Split a template once into literal text, pool tokens, numeric tokens ({N}, {X},
+    {X}/{X}) and the color token {C}. Tokens match {TOKEN} or [TOKEN], case-insensitively.
     """
+    segments: List[Tuple[int, str, str]] = []
     tokens = set()
-    for m in re.finditer(r"\{([A-Za-z0-9_/]+)\}|\[([A-Za-z0-9_/]+)\]", text):
-        tok = m.group(1) or m.group(2)
-        if tok:
-            tokens.add(tok.upper())
-    return tokens
-
-def _fill_categories_generic(text, colors, string_pools, subtypes_pool):
-    """
-    Generic pass: replace any tokens that have a pool (string_pools or DEFAULT_POOLS),
-    plus special handling for TOKEN_SUBTYPE and TOKEN_COLOR.
-    """
-    tokens = _find_all_tokens(text)
-
+    lit: List[str] = []
+    pos = 0
+    for m in _TOKEN_RE.finditer(template):
+        lit.append(template[pos:m.start()])
+        pos = m.end()
+        if m.group("xx"):
+            kind, tok = _NUM_XX, "X/X"
+        else:
+            tok = (m.group("b") or m.group("s")).upper()
+            if tok in SKIP_TOKENS or tok == "X/X":
+                # left as written
+                lit.append(m.group(0))
+                continue
+            kind = _TOKEN_KINDS.get(tok, _POOL)
+            if kind == _POOL:
+                tokens.add(tok)
+        if lit:
+            segments.append((_LIT, "".join(lit), ""))
+            lit = []
+        segments.append((kind, m.group(0), tok))
+    lit.append(template[pos:])
+    tail = "".join(lit)
+    if tail:
+        segments.append((_LIT, tail, ""))
+    return CompiledTemplate(tuple(segments), frozenset(tokens))
+
+def unknown_tokens(tokens: Iterable[str], string_pools) -> Set[str]:
+    """Pool tokens that neither string_pools nor DEFAULT_POOLS can fill (symbols excluded)."""
+    out = set()
     for tok in tokens:
-        if tok in SKIP_TOKENS:
+        if tok in {"TOKEN_SUBTYPE", "TOKEN_COLOR", "COLOR_WORD"}:
             continue
-        # Skip numeric/color handled later
-        if tok in {"N", "X", "X/X", "C"}:
+        if string_pools.get(tok) or DEFAULT_POOLS.get(tok) or _SYMBOL_RE.fullmatch(tok):
             continue
-
-        value = None
-
-        if tok == "TOKEN_SUBTYPE":
-            value = _pick_token_subtype(colors, string_pools, subtypes_pool)
-        elif tok in {"TOKEN_COLOR", "COLOR_WORD"}:
-            # Put a placeholder that the numeric/color pass will convert
-            # to a language color word; if a pool exists, we can sample it first
-            pool = string_pools.get(tok, DEFAULT_POOLS.get(tok, []))
-            if pool:
-                value = random.choice(pool)
-            else:
-                value = "{C}"
+        out.add(tok)
+    return out
+
+def _choose_value(tok, colors, string_pools, subtypes_pool, rng):
+    """One value for a pool token, or None to leave the token as written."""
+    if tok == "TOKEN_SUBTYPE":
+        return _pick_token_subtype(colors, string_pools, subtypes_pool, rng)
+    if tok in {"TOKEN_COLOR", "COLOR_WORD"}:
+        # A "{C}" placeholder renders as a color word; if a pool exists, sample it first
+        pool = string_pools.get(tok, DEFAULT_POOLS.get(tok, []))
+        return rng.choice(pool) if pool else "{C}"
+    # Any other token: look up in user pools or default pools
+    pool = string_pools.get(tok, None)
+    if not pool or not isinstance(pool, list):
+        pool = DEFAULT_POOLS.get(tok, None)
+    return rng.choice(pool) if pool else None
+
+def _emit(out, segments, allowed, chosen, ctx):
+    n, x, color_word, colors, string_pools, subtypes_pool, rng = ctx
+    for kind, text, tok in segments:
+        if kind == _LIT:
+            out.append(text)
+        elif kind == _NUM_N:
+            out.append(n)
+        elif kind == _NUM_X:
+            out.append(x)
+        elif kind == _NUM_XX:
+            out.append(f"{x}/{x}")
+        elif kind == _COLOR:
+            out.append(color_word)
+        elif tok not in allowed:
+            out.append(text)
         else:
-            # Any other token: look up in user pools or default pools
-            pool = string_pools.get(tok, None)
-            if not pool or not isinstance(pool, list) or not pool:
-                pool = DEFAULT_POOLS.get(tok, None)
-            if pool:
-                value = random.choice(pool)
-
-        if value is not None:
-            text = _sub_token_any(text, tok, value)
-
-    return text
-
-def _finalize_numbers_and_colors(text, colors, mv):
-    # {N} or [N]
-    n = max(1, min(5, mv))
-    text = _sub_token_any(text, "N", str(n))
-
-    # {X}/{X} or [X]/[X] first
-    xval = max(1, min(6, mv))
-    pattern_xx = re.compile(r"(\{X\}|\[X\])\s*/\s*(\{X\}|\[X\])", re.IGNORECASE)
-    text = pattern_xx.sub(f"{xval}/{xval}", text)
-    # then any single X
-    text = re.sub(r"(\{X\}|\[X\])", str(xval), text, flags=re.IGNORECASE)
-
-    # {C} or [C] -> color word (white/blue/...)
-    color_word = _pick_color_word(colors)
-    text = _sub_token_any(text, "C", color_word)
-
-    return text
-
-def finalize_effect_template(template, colors, mv, string_pools, subtypes_pool):
-    # First, a generic fill for any token present in pools or defaults
-    step1 = _fill_categories_generic(template, colors, string_pools, subtypes_pool)
-    # Then do numbers and color conversions
-    step2 = _finalize_numbers_and_colors(step1, colors, mv)
+            # every occurrence of a token in one render gets the same value
+            if tok not in chosen:
+                chosen[tok] = _choose_value(tok, colors, string_pools, subtypes_pool, rng)
+            value = chosen[tok]
+            if value is None:
+                out.append(text)
+            else:
+                # values may carry {N}/{X}/{C} and other tokens of this template,
+                # but never the token being expanded
+                _emit(out, compile_template(value).segments, allowed - {tok}, chosen, ctx)
+
+def render_template(compiled: CompiledTemplate, colors, mv, string_pools, subtypes_pool, rng=random) -> str:
+    """Fill a compiled template in a single pass over its segments."""
+    ctx = (str(max(1, min(5, mv))), str(max(1, min(6, mv))), _pick_color_word(colors),
+           colors, string_pools, subtypes_pool, rng)
+    out: List[str] = []
+    _emit(out, compiled.segments, compiled.tokens, {}, ctx)
     # Normalize whitespace PER LINE, but keep intended line breaks
-    import re as _re
-    lines = [_re.sub(r"\s+", " ", ln).strip() for ln in step2.splitlines()]
+    lines = [" ".join(ln.split()) for ln in "".join(out).splitlines()]
     while lines and lines[-1] == "":
         lines.pop()
     return "\n".join(lines)
+
+# per rules line: kept free of @timed, whose bookkeeping would cost more than the render
+def finalize_effect_template(template, colors, mv, string_pools, subtypes_pool, rng=random):
+    return render_template(compile_template(template), colors, mv, string_pools, subtypes_pool, rng)
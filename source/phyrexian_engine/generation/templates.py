@@ -1,21 +1,52 @@
 # generation/templates.py
-import json, os, random
-from typing import Dict, List, Tuple, Any, Optional
+import json, logging, os, random
+from bisect import bisect_left
+from typing import Dict, Iterator, List, Tuple, Any, Optional
+from .pack_cache import load_compiled, intern_strings
+from ..instrument import timed
+from .strings import compile_template, unknown_tokens
+
+log = logging.getLogger(__name__)
 
 # Effects store type
 # effects_by_color[color][type] = List[ (template:str, weight:int, min_mv:int, max_mv:int) ]
 EffectsByColor = Dict[str, Dict[str, List[Tuple[str, int, int, int]]]]
 
+# One pick bucket: (templates, cumulative clamped weights, total weight)
+Candidates = Tuple[Tuple[str, ...], Tuple[int, ...], int]
+
+# Redraws sample_effects tries before listing the remaining candidates explicitly
+_REJECTION_TRIES = 8
+
+class EffectTable(dict):
+    """
+    effects_by_color as returned by load_packages, plus a pick index.
+
+    The index maps (type_key, color search order, mv) to the candidate templates and
+    their cumulative weights, so pick_effect is a bisect instead of a scan. Buckets are
+    filled on first use and kept for the lifetime of the loaded packages; call
+    invalidate() after mutating the table in place.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._index: Dict[Tuple[str, Tuple[str, ...], int], Candidates] = {}
+
+    def invalidate(self) -> None:
+        self._index.clear()
+
+    def candidates(self, type_key: str, order: Tuple[str, ...], mv: int) -> Candidates:
+        key = (type_key, order, mv)
+        hit = self._index.get(key)
+        if hit is None:
+            hit = self._index[key] = _build_candidates(self, type_key, order, mv)
+        return hit
+
 def _merge_effects(dst: EffectsByColor, src: EffectsByColor) -> None:
     for color, by_type in src.items():
         dst.setdefault(color, {})
         for typ, entries in by_type.items():
-            dst[color].setdefault(typ, [])
-            # trust entries format [tmpl, weight, min, max]
-            for e in entries:
-                if isinstance(e, (list, tuple)) and len(e) >= 4:
-                    tmpl, w, mn, mx = e[0], int(e[1]), int(e[2]), int(e[3])
-                    dst[color][typ].append((tmpl, w, mn, mx))
+            # entries are already normalized (template, weight, min, max) tuples
+            dst[color].setdefault(typ, []).extend(entries)
 
 def _merge_lists(dst: Dict[str, List[str]], src: Dict[str, List[str]]) -> None:
     for k, vals in src.items():
@@ -40,75 +71,154 @@ def _merge_keywords(dst: Dict[str, List[str]], src: Dict[str, List[str]]) -> Non
                 dst[color].append(v)
                 seen.add(v)
 
-def load_packages(pack_dir: str, selected: List[str]):
+def _compile_package(raw: bytes):
+    """
+    Parse one package file and normalize it into the same shapes load_packages returns,
+    already merged (deduped) on its own so it can be cached as-is.
+    """
+    data = json.loads(raw.decode("utf-8"))
+
+    effects: EffectsByColor = {}
+    subtypes_pool: Dict[str, List[str]] = {}
+    string_pools: Dict[str, List[str]] = {}
+    monster_keywords: Dict[str, List[str]] = {}
+
+    # effects_by_color
+    eff_raw = data.get("effects_by_color", {})
+    eff_norm: EffectsByColor = {}
+    for color, by_type in eff_raw.items():
+        eff_norm.setdefault(color, {})
+        for typ, entries in by_type.items():
+            eff_norm[color].setdefault(typ, [])
+            for e in entries or []:
+                if isinstance(e, (list, tuple)) and len(e) >= 4:
+                    tmpl, w, mn, mx = e[0], int(e[1]), int(e[2]), int(e[3])
+                    eff_norm[color][typ].append((tmpl, w, mn, mx))
+    _merge_effects(effects, eff_norm)
+
+    # creature_subtypes
+    subs = data.get("creature_subtypes", {})
+    _merge_lists(subtypes_pool, subs)
+
+    # string_pools
+    pools = data.get("string_pools", {})
+    # normalize keys to UPPER so templates may reference tokens case-insensitively
+    pools_upper = {k.upper(): v for (k, v) in pools.items() if isinstance(v, list)}
+    _merge_lists(string_pools, pools_upper)
+
+    # monster_keywords
+    kws = data.get("monster_keywords", {})
+    _merge_keywords(monster_keywords, kws)
+
+    # pool tokens the templates reference; compiling here also warms the render cache
+    tokens = set()
+    for by_type in effects.values():
+        for entries in by_type.values():
+            for tmpl, _, _, _ in entries:
+                tokens |= compile_template(tmpl).tokens
+
+    return effects, subtypes_pool, string_pools, monster_keywords, frozenset(tokens)
+
+def load_package(path: str, use_cache: bool = True, cache_dir: Optional[str] = None):
+    """
+    Load a single package file, via the compiled on-disk cache unless use_cache is False.
+    Returns (effects_by_color, creature_subtypes, string_pools, monster_keywords, tokens).
+    """
+    if use_cache:
+        return load_compiled(path, _compile_package, cache_dir)
+    with open(path, "rb") as f:
+        return intern_strings(_compile_package(f.read()))
+
+@timed("load_packages")
+def load_packages(pack_dir: str, selected: List[str], use_cache: bool = True, cache_dir: Optional[str] = None,
+                  report_tokens: bool = True):
     """
     Returns: (effects_by_color, creature_subtypes, string_pools, monster_keywords)
     - effects_by_color[color][type] = [(template, weight, min_mv, max_mv), ...]
     - creature_subtypes[color] = [subtype, ...]
     - string_pools[TOKEN] = [variants...]
     - monster_keywords[color] = [kw...]
+    Each package is compiled once and cached on disk (see pack_cache); only edited
+    packages are re-parsed. Template tokens without a pool are logged unless
+    report_tokens is False.
     """
-    effects: EffectsByColor = {}
+    effects = EffectTable()
     subtypes_pool: Dict[str, List[str]] = {}
     string_pools: Dict[str, List[str]] = {}
     monster_keywords: Dict[str, List[str]] = {}
+    tokens = set()
 
     for base in selected:
         path = os.path.join(pack_dir, base if base.endswith(".json") else base + ".json")
         if not os.path.isfile(path):
             continue
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-
-        # effects_by_color
-        eff_raw = data.get("effects_by_color", {})
-        eff_norm: EffectsByColor = {}
-        for color, by_type in eff_raw.items():
-            eff_norm.setdefault(color, {})
-            for typ, entries in by_type.items():
-                eff_norm[color].setdefault(typ, [])
-                for e in entries or []:
-                    if isinstance(e, (list, tuple)) and len(e) >= 4:
-                        tmpl, w, mn, mx = e[0], int(e[1]), int(e[2]), int(e[3])
-                        eff_norm[color][typ].append((tmpl, w, mn, mx))
-        _merge_effects(effects, eff_norm)
-
-        # creature_subtypes
-        subs = data.get("creature_subtypes", {})
-        _merge_lists(subtypes_pool, subs)
-
-        # string_pools
-        pools = data.get("string_pools", {})
-        # normalize keys to UPPER so templates may reference tokens case-insensitively
-        pools_upper = {k.upper(): v for (k, v) in pools.items() if isinstance(v, list)}
-        _merge_lists(string_pools, pools_upper)
-
-        # monster_keywords
-        kws = data.get("monster_keywords", {})
-        _merge_keywords(monster_keywords, kws)
+        p_effects, p_subtypes, p_pools, p_keywords, p_tokens = load_package(path, use_cache, cache_dir)
+        _merge_effects(effects, p_effects)
+        _merge_lists(subtypes_pool, p_subtypes)
+        _merge_lists(string_pools, p_pools)
+        _merge_keywords(monster_keywords, p_keywords)
+        tokens |= p_tokens
+
+    # Reported once per load instead of silently left in the rendered text
+    missing = unknown_tokens(tokens, string_pools) if report_tokens else None
+    if missing:
+        log.warning("Templates reference tokens with no string pool: %s", ", ".join(sorted(missing)))
 
     return effects, subtypes_pool, string_pools, monster_keywords
 
-def _weighted_choice(candidates: List[Tuple[str, int, int, int]]) -> Optional[str]:
-    # candidates: list of (template, weight, min_mv, max_mv)
-    total = sum(max(0, w) for _, w, _, _ in candidates)
+def _search_order(colors: List[str]) -> Tuple[str, ...]:
+    """Each color in colors (first occurrence wins) -> 'any' -> 'C'."""
+    order: List[str] = []
+    # card colors (in order provided)
+    for c in colors or []:
+        if c not in order:
+            order.append(c)
+    # then generic pools
+    for fallback in ("any", "C"):
+        if fallback not in order:
+            order.append(fallback)
+    return tuple(order)
+
+def _build_candidates(effects_by_color: EffectsByColor, type_key: str,
+                      order: Tuple[str, ...], mv: int) -> Candidates:
+    # Collect all candidates from color buckets, in search order
+    templates: List[str] = []
+    cum: List[int] = []
+    acc = 0
+    for col in order:
+        by_type = effects_by_color.get(col, {})
+        for tmpl, w, mn, mx in by_type.get(type_key, []):
+            if mn <= mv <= mx:
+                acc += max(0, w)
+                templates.append(tmpl)
+                cum.append(acc)
+    return tuple(templates), tuple(cum), acc
+
+def effect_candidates(effects_by_color: EffectsByColor, type_key: str,
+                      colors: List[str], mv: int) -> Candidates:
+    """Eligible templates for (type_key, colors, mv) with their cumulative weights."""
+    order = _search_order(colors)
+    if isinstance(effects_by_color, EffectTable):
+        return effects_by_color.candidates(type_key, order, mv)
+    return _build_candidates(effects_by_color, type_key, order, mv)
+
+def _weighted_pick(templates: Tuple[str, ...], cum: Tuple[int, ...], total: int, rng=random) -> Optional[str]:
+    if not templates:
+        return None
     if total <= 0:
         # uniform if all weights are zero/negative
-        return random.choice(candidates)[0] if candidates else None
-    r = random.randint(1, total)
-    acc = 0
-    for tmpl, w, _, _ in candidates:
-        acc += max(0, w)
-        if r <= acc:
-            return tmpl
-    return candidates[-1][0] if candidates else None
+        return rng.choice(templates)
+    # first template whose cumulative weight reaches r, same as a linear walk
+    r = rng.randint(1, total)
+    return templates[bisect_left(cum, r)]
 
 def pick_effect(effects_by_color: EffectsByColor,
                 string_pools,  # kept for signature compatibility; not used here
                 subtypes_pool, # kept for signature compatibility; not used here
                 type_key: str,
                 colors: List[str],
-                mv: int) -> str:
+                mv: int,
+                rng=random) -> str:
     """
     Choose one template for the given (type_key, colors, mv) with:
       - search order: each color in colors -> 'any' -> 'C'
@@ -116,27 +226,54 @@ def pick_effect(effects_by_color: EffectsByColor,
       - weighted random by 'weight'
     Returns "" if nothing applicable.
     """
-    # Build search order
-    order: List[str] = []
-    # card colors (in order provided)
-    for c in colors or []:
-        if c not in order:
-            order.append(c)
-    # then generic pools
-    for fallback in ("any", "C"):
-        if fallback not in order:
-            order.append(fallback)
+    templates, cum, total = effect_candidates(effects_by_color, type_key, colors, mv)
+    return _weighted_pick(templates, cum, total, rng) or ""
 
-    # Collect all candidates from color buckets
-    candidates: List[Tuple[str, int, int, int]] = []
-    for col in order:
-        by_type = effects_by_color.get(col, {})
-        for tmpl, w, mn, mx in by_type.get(type_key, []):
-            if mn <= mv <= mx:
-                candidates.append((tmpl, w, mn, mx))
+def sample_effects(effects_by_color: EffectsByColor,
+                   type_key: str,
+                   colors: List[str],
+                   mv: int,
+                   rng=random) -> Iterator[str]:
+    """
+    Yield the eligible templates for (type_key, colors, mv) in weighted random order,
+    without replacement: each distinct template at most once. The first draw is
+    distributed exactly like pick_effect; zero-weight templates only show up when
+    every candidate has zero weight (uniform order then).
+    """
+    templates, cum, total = effect_candidates(effects_by_color, type_key, colors, mv)
+    if not templates:
+        return
+    if total <= 0:
+        pool = list(dict.fromkeys(templates))
+        while pool:
+            yield pool.pop(rng.randrange(len(pool)))
+        return
 
-    if not candidates:
-        return ""
+    drawn = set()
+    # Redrawing from the full index until an unseen template comes up is exactly
+    # sampling from what is left; only when that keeps missing do we pay for an
+    # explicit list of the remaining candidates.
+    while True:
+        for _ in range(_REJECTION_TRIES):
+            tmpl = templates[bisect_left(cum, rng.randint(1, total))]
+            if tmpl not in drawn:
+                break
+        else:
+            break
+        drawn.add(tmpl)
+        yield tmpl
 
-    tmpl = _weighted_choice(candidates)
-    return tmpl or ""
+    weights = [c - p for c, p in zip(cum, (0,) + cum[:-1])]
+    left = [j for j, w in enumerate(weights) if w > 0 and templates[j] not in drawn]
+    remaining = sum(weights[j] for j in left)
+    while remaining > 0:
+        r = rng.randint(1, remaining)
+        acc = 0
+        for j in left:
+            acc += weights[j]
+            if r <= acc:
+                break
+        tmpl = templates[j]
+        yield tmpl
+        left = [i for i in left if templates[i] != tmpl]
+        remaining = sum(weights[i] for i in left)
@@ -0,0 +1,217 @@
+# instrument.py
+"""
+Lightweight run metrics: stage wall time and call counts, counters, LLM latencies and
+Ollama's reported decode speed, plus opt-in cProfile / tracemalloc captures.
+
+Nothing is recorded unless a Metrics is installed with enable(); instrumented code
+asks active() and skips the bookkeeping when it returns None, so the hooks cost one
+global lookup in normal runs.
+"""
+import cProfile, io, json, math, pstats, sys, threading, time, tracemalloc
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, List, Optional
+
+_current: Optional["Metrics"] = None
+
+def active() -> Optional["Metrics"]:
+    return _current
+
+def enable(metrics: Optional["Metrics"] = None) -> "Metrics":
+    """Install metrics (a fresh Metrics by default) for everything recorded from now on."""
+    global _current
+    _current = metrics if metrics is not None else Metrics()
+    return _current
+
+def disable() -> Optional["Metrics"]:
+    """Stop recording; returns what was installed, its wall clock stopped."""
+    global _current
+    metrics, _current = _current, None
+    if metrics is not None and metrics.ended is None:
+        metrics.ended = time.perf_counter()
+    return metrics
+
+def _percentile(ordered: List[float], q: float) -> float:
+    # nearest rank
+    return ordered[max(0, math.ceil(q / 100.0 * len(ordered)) - 1)]
+
+class Metrics:
+    """
+    Thread-safe totals for one run. stage() / add() time named stages, count() bumps
+    counters, observe() keeps raw samples (e.g. LLM latency) for percentiles, and
+    tokens() accumulates Ollama's eval_count / eval_duration.
+    """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.ended: Optional[float] = None
+        self.stages: Dict[str, List[float]] = {}   # name -> [seconds, calls]
+        self.counters: Dict[str, int] = {}
+        self.samples: Dict[str, List[float]] = {}
+        self.eval_tokens = 0
+        self.eval_seconds = 0.0
+        self.extra: Dict[str, object] = {}        # profiles and the like, copied into report()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - t0)
+
+    def add(self, name: str, seconds: float, calls: int = 1) -> None:
+        with self._lock:
+            st = self.stages.get(name)
+            if st is None:
+                self.stages[name] = [seconds, calls]
+            else:
+                st[0] += seconds
+                st[1] += calls
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name: str, value: float) -> None:
+        with self._lock:
+            self.samples.setdefault(name, []).append(value)
+
+    def tokens(self, eval_count: int, eval_duration_ns: int) -> None:
+        with self._lock:
+            self.eval_tokens += eval_count
+            self.eval_seconds += eval_duration_ns / 1e9
+
+    def snapshot(self) -> dict:
+        """Plain data for merge(), e.g. from a worker process."""
+        with self._lock:
+            return {"stages": {k: list(v) for k, v in self.stages.items()}, "counters": dict(self.counters),
+                    "samples": {k: list(v) for k, v in self.samples.items()},
+                    "eval": (self.eval_tokens, self.eval_seconds)}
+
+    def merge(self, snap: dict) -> None:
+        for name, (seconds, calls) in snap["stages"].items():
+            self.add(name, seconds, calls)
+        with self._lock:
+            for name, n in snap["counters"].items():
+                self.counters[name] = self.counters.get(name, 0) + n
+            for name, values in snap["samples"].items():
+                self.samples.setdefault(name, []).extend(values)
+            self.eval_tokens += snap["eval"][0]
+            self.eval_seconds += snap["eval"][1]
+
+    def report(self) -> dict:
+        with self._lock:
+            out = {
+                "wall_s": (self.ended or time.perf_counter()) - self.started,
+                "stages": {name: {"seconds": s, "calls": int(c), "mean_ms": s / c * 1000 if c else 0.0}
+                           for name, (s, c) in sorted(self.stages.items())},
+                "counters": dict(sorted(self.counters.items())),
+                "latency_ms": {},
+                "llm_tokens": {"eval_count": self.eval_tokens, "eval_seconds": self.eval_seconds,
+                               "tokens_per_s": self.eval_tokens / self.eval_seconds if self.eval_seconds else None},
+            }
+            for name, values in sorted(self.samples.items()):
+                ordered = sorted(values)
+                if ordered:
+                    out["latency_ms"][name] = {
+                        "count": len(ordered), "mean": sum(ordered) / len(ordered) * 1000,
+                        "p50": _percentile(ordered, 50) * 1000, "p90": _percentile(ordered, 90) * 1000,
+                        "p99": _percentile(ordered, 99) * 1000, "max": ordered[-1] * 1000,
+                    }
+            out.update(self.extra)
+        return out
+
+    def summary(self) -> str:
+        """One line for a status bar: the biggest stages, LLM p50/p90 and tokens/s."""
+        rep = self.report()
+        top = sorted(((s["seconds"], n) for n, s in rep["stages"].items()
+                      if "/" not in n and not n.startswith("llm.")), reverse=True)[:4]
+        parts = [f"{n} {s:.2f}s" for s, n in top]
+        lat = rep["latency_ms"].get("llm.request")
+        if lat:
+            parts.append(f"LLM p50 {lat['p50']:.0f}ms p90 {lat['p90']:.0f}ms")
+        tps = rep["llm_tokens"]["tokens_per_s"]
+        if tps:
+            parts.append(f"{tps:.0f} tok/s")
+        return " | ".join(parts)
+
+    def write_json(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2)
+            f.write("\n")
+
+def timed(name: str):
+    """Decorator: time every call as stage name while metrics are enabled."""
+    def deco(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            metrics = _current
+            if metrics is None:
+                return fn(*args, **kwargs)
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                metrics.add(name, time.perf_counter() - t0)
+        return wrapper
+    return deco
+
+@contextmanager
+def profiling(metrics: Metrics, cprofile_path: Optional[str] = None, trace_memory: bool = False, top: int = 25):
+    """
+    Deep-dive capture around a block. cprofile_path gets a pstats file (open it with
+    python -m pstats or snakeviz) covering this thread and every thread started inside
+    the block (a profiler per thread before Python 3.12, one for the process since);
+    the top functions by cumulative time also land in metrics.extra. With trace_memory,
+    the peak and the biggest allocation sites go there too.
+    """
+    profilers: List[cProfile.Profile] = []
+    lock = threading.Lock()
+    # from 3.12 cProfile sits on sys.monitoring: one profiler sees every thread, and a
+    # second one raises "Another profiling tool is already active"
+    per_thread = sys.version_info < (3, 12)
+
+    def _start_thread_profiler(*_):
+        # runs once as the first profile event of each new thread, then replaces itself
+        prof = cProfile.Profile()
+        try:
+            prof.enable()
+        except ValueError:
+            # never let profiling kill the thread it was meant to watch
+            sys.setprofile(None)
+            return
+        with lock:
+            profilers.append(prof)
+
+    if cprofile_path:
+        if per_thread:
+            threading.setprofile(_start_thread_profiler)
+        main_prof = cProfile.Profile()
+        profilers.append(main_prof)
+        main_prof.enable()
+    if trace_memory:
+        tracemalloc.start(10)
+    try:
+        yield
+    finally:
+        if trace_memory:
+            snap = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            stats = snap.statistics("lineno")[:top]
+            metrics.extra["tracemalloc"] = {
+                "peak_kib": peak / 1024,
+                "top": [{"where": str(s.traceback[0]), "kib": s.size / 1024, "blocks": s.count} for s in stats],
+            }
+        if cprofile_path:
+            main_prof.disable()
+            if per_thread:
+                threading.setprofile(None)
+            with lock:
+                stats = pstats.Stats(*profilers)
+            stats.dump_stats(cprofile_path)
+            buf = io.StringIO()
+            stats.stream = buf
+            stats.sort_stats("cumulative").print_stats(top)
+            metrics.extra["cprofile"] = {"path": cprofile_path, "top": buf.getvalue().splitlines()}
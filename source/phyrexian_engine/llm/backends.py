@@ -0,0 +1,183 @@
+# llm/backends.py
+import hashlib, json, os, threading, time
+from typing import Dict, List, Optional
+
+from ..util import cache_root
+from .cache import ResponseCache
+from .ollama_client import _tidy, generate, generate_batch, probe
+
+BACKENDS = ("ollama", "mock")
+
+def default_recording_path() -> str:
+    return os.path.join(cache_root(), "llm_recording.jsonl")
+
+class OllamaBackend:
+    """
+    The default: name/art/flavor from a model served by Ollama (see ollama_client).
+
+    Every backend has this shape: model (part of cache keys), probe() -> problem or
+    None, generate(prompt) -> dict and generate_batch(prompt, count, singles=None) ->
+    list of dicts, raising on failure; singles are the one-card prompts of the cards in
+    the batch. Pass one as backend= to pipeline.run_pipeline, enrich_cards, enrich_card
+    or check_llm.
+    """
+    def __init__(self, model: str = 'llama3', host: str = 'http://localhost:11434'):
+        self.model = model
+        self.host = host
+
+    def probe(self, timeout: float = 3.0) -> Optional[str]:
+        return probe(self.host, self.model, timeout)
+
+    def generate(self, prompt: str) -> dict:
+        return generate(prompt, self.model, self.host)
+
+    def generate_batch(self, prompt: str, count: int, singles: Optional[List[str]] = None) -> List[dict]:
+        return generate_batch(prompt, count, self.model, self.host)
+
+_ADJECTIVES = ("Ashen", "Gilded", "Hollow", "Silent", "Sunken", "Verdant", "Iron", "Pale", "Storm", "Thorned")
+_NOUNS = ("Warden", "Spire", "Oracle", "Drake", "Covenant", "Blade", "Harbinger", "Grove", "Reliquary", "Tide")
+_SCENES = ("a ruined cathedral at dusk", "a storm over black cliffs", "a lantern-lit market",
+           "a frozen battlefield", "an overgrown observatory", "a tide pool glowing with runes")
+
+class MockBackend:
+    """
+    Instant, deterministic answers made from a hash of the prompt: the same card always
+    gets the same name/art/flavor, with no server, model or network. For profiling the
+    rest of the pipeline and for load tests; latency (seconds per request) can be added.
+    """
+    model = "mock"
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()   # the enrich pool calls from several threads
+
+    def _request(self) -> None:
+        with self._lock:
+            self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def probe(self, timeout: float = 3.0) -> Optional[str]:
+        return None
+
+    def _answer(self, prompt: str, k: int) -> dict:
+        h = hashlib.blake2b(f"{k}\0{prompt}".encode("utf-8"), digest_size=8).digest()
+        name = f"{_ADJECTIVES[h[0] % len(_ADJECTIVES)]} {_NOUNS[h[1] % len(_NOUNS)]}"
+        scene = _SCENES[h[2] % len(_SCENES)]
+        return _tidy({"name": name, "art": f"{name} in {scene}, painted in muted oils.",
+                      "flavor": f"\"Every {_NOUNS[h[3] % len(_NOUNS)].lower()} remembers.\""})
+
+    def generate(self, prompt: str) -> dict:
+        self._request()
+        return self._answer(prompt, 0)
+
+    def generate_batch(self, prompt: str, count: int, singles: Optional[List[str]] = None) -> List[dict]:
+        self._request()
+        # answer each card as if asked alone, so batching never changes the result
+        if singles is not None and len(singles) == count:
+            return [self._answer(p, 0) for p in singles]
+        return [self._answer(prompt, k) for k in range(count)]
+
+class ReplayMiss(LookupError):
+    """A replayed run asked for a prompt that was never recorded."""
+
+class RecordReplayBackend:
+    """
+    Records what another backend answers to a JSON Lines file, or replays such a file
+    offline. Entries are keyed by (model, prompt) like the response cache, one object
+    per line, so recordings can be appended to, diffed and shared. Batch answers are
+    also stored per card, so a replay need not batch cards the same way. In replay
+    mode a prompt that was never recorded raises ReplayMiss and that card gets
+    placeholder text, so a replayed run never touches the network.
+    """
+    def __init__(self, path: str, inner=None, model: Optional[str] = None):
+        if inner is None and model is None:
+            raise ValueError("replay needs the model the recording was made with")
+        self.path = path
+        self.inner = inner
+        self.model = inner.model if inner is not None else model
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: Dict[str, object] = {} if inner is not None else self._load(path)
+
+    @property
+    def recording(self) -> bool:
+        return self.inner is not None
+
+    @staticmethod
+    def _load(path: str) -> Dict[str, object]:
+        entries = {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                        entries[rec["key"]] = rec["result"]
+                    except (ValueError, KeyError, TypeError):
+                        continue  # a line cut short by an interrupted recording
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def probe(self, timeout: float = 3.0) -> Optional[str]:
+        if self.recording:
+            return self.inner.probe(timeout)
+        return None if self._entries else f"no recorded LLM replies in {self.path}"
+
+    def _key(self, prompt: str, count: Optional[int]) -> str:
+        return ResponseCache.key(self.model, prompt if count is None else f"{count}\0{prompt}")
+
+    def _replay(self, keys: List[str]):
+        with self._lock:
+            found = [self._entries.get(k) for k in keys]
+            if any(r is None for r in found):
+                self.misses += 1
+                raise ReplayMiss(f"prompt not in {self.path}")
+            self.hits += 1
+        return json.loads(json.dumps(found))  # callers may mutate what they get
+
+    def _record(self, entries) -> None:
+        lines = "".join(json.dumps({"key": k, "model": self.model, "count": n, "result": r}, ensure_ascii=False) + "\n"
+                        for k, n, r in entries)
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+
+    def generate(self, prompt: str) -> dict:
+        key = self._key(prompt, None)
+        if not self.recording:
+            return self._replay([key])[0]
+        result = self.inner.generate(prompt)
+        self._record([(key, None, result)])
+        return result
+
+    def generate_batch(self, prompt: str, count: int, singles: Optional[List[str]] = None) -> List[dict]:
+        key = self._key(prompt, count)
+        if not self.recording:
+            if key in self._entries:
+                return self._replay([key])[0]
+            if singles is None or len(singles) != count:
+                return self._replay([key])[0]
+            return self._replay([self._key(p, None) for p in singles])
+        results = self.inner.generate_batch(prompt, count, singles)
+        entries = [(key, count, results)]
+        if singles is not None and len(singles) == len(results):
+            entries += [(self._key(p, None), None, r) for p, r in zip(singles, results)]
+        self._record(entries)
+        return results
+
+def make_backend(kind: str = "ollama", model: str = 'llama3', host: str = 'http://localhost:11434',
+                 record: Optional[str] = None, replay: Optional[str] = None):
+    """A backend by name (BACKENDS), optionally recording to or replaying from a file."""
+    if replay:
+        return RecordReplayBackend(replay, model=model)
+    if kind == "mock":
+        backend = MockBackend()
+    elif kind == "ollama":
+        backend = OllamaBackend(model, host)
+    else:
+        raise ValueError(f"unknown LLM backend {kind!r} (expected one of {', '.join(BACKENDS)})")
+    return RecordReplayBackend(record, inner=backend) if record else backend
@@ -0,0 +1,146 @@
+# llm/cache.py
+import hashlib, json, os, sqlite3, threading, time
+from typing import Callable, Dict, Optional
+
+from ..util import cache_root
+
+def default_cache_path() -> str:
+    return os.path.join(cache_root(), "llm_cache.sqlite3")
+
+class _Flight:
+    """One in-progress computation that other callers of the same key wait on."""
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+class ResponseCache:
+    """
+    SQLite-backed cache of LLM results keyed by a hash of (model, prompt).
+
+    The prompt already carries the set description, rules text, mana value, P/T and
+    subtypes; the host is left out so the same model answers count wherever it runs.
+    Entries older than max_age_days are dropped, and beyond max_entries the least
+    recently used go first. Concurrent misses on one key share a single request.
+    Safe to use from several threads.
+    """
+
+    # re-check limits after this many writes
+    EVICT_EVERY = 256
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 50000, max_age_days: float = 30.0):
+        self.path = path or default_cache_path()
+        self.max_entries = max_entries
+        self.max_age = max_age_days * 86400.0
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.evicted = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, _Flight] = {}
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._db = sqlite3.connect(self.path, timeout=10.0, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses(last_used)")
+        with self._lock:
+            self._evict()
+
+    @staticmethod
+    def key(model: str, prompt: str) -> str:
+        return hashlib.sha256(json.dumps([model, prompt], ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            return self._get(key)
+
+    def put(self, key: str, value: dict) -> None:
+        with self._lock:
+            self._put(key, value)
+
+    def get_or_compute(self, key: str, compute: Callable[[], dict], counted: bool = True) -> dict:
+        """
+        Cached value for key, or compute() once for all concurrent callers and store it.
+        counted=False leaves the lookup out of hits/misses, for a caller whose own get()
+        already counted it.
+        """
+        with self._lock:
+            value = self._get(key, counted)
+            if value is not None:
+                return value
+            flight = self._inflight.get(key)
+            owner = flight is None
+            if owner:
+                flight = self._inflight[key] = _Flight()
+            else:
+                self.shared += 1
+        if not owner:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return dict(flight.value)
+
+        try:
+            value = compute()
+        except BaseException as e:
+            flight.error = e
+            raise
+        else:
+            flight.value = value
+            with self._lock:
+                self._put(key, value)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "shared": self.shared,
+                "evicted": self.evicted, "entries": entries}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    # --- callers hold self._lock ---
+    def _get(self, key: str, count: bool = True) -> Optional[dict]:
+        row = self._db.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+        now = time.time()
+        if row is None or now - row[1] > self.max_age:
+            self.misses += count
+            return None
+        self._db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+        self.hits += count
+        return json.loads(row[0])
+
+    def _put(self, key: str, value: dict) -> None:
+        now = time.time()
+        self._db.execute(
+            "INSERT OR REPLACE INTO responses (key, value, created, last_used) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value, ensure_ascii=False), now, now),
+        )
+        self._writes += 1
+        if self._writes % self.EVICT_EVERY == 0:
+            self._evict()
+
+    def _evict(self) -> None:
+        cur = self._db.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.max_age,))
+        self.evicted += max(0, cur.rowcount)
+        over = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_entries
+        if over > 0:
+            cur = self._db.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_used LIMIT ?)", (over,)
+            )
+            self.evicted += max(0, cur.rowcount)
@@ -0,0 +1,96 @@
+# llm/fake_server.py
+import json, re, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+# build_batch_prompt states how many objects a batch reply must hold
+_BATCH_RE = re.compile(r"holds exactly (\d+) objects")
+
+def _reply(k) -> dict:
+    return {"name": f"Quiet Spire {k}", "art": "A lone spire at dusk, painted in oils.",
+            "flavor": "It was old when the world was young."}
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "FakeOllama"
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, obj: dict) -> None:
+        out = json.dumps(obj).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def do_GET(self):
+        self._send_json({"models": [{"name": m} for m in self.server.models]})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        srv = self.server
+        with srv.lock:
+            srv.requests += 1
+        m = _BATCH_RE.search(body.get("prompt", ""))
+        text = json.dumps({"cards": [_reply(j) for j in range(int(m.group(1)))]} if m else _reply(srv.requests))
+        # ~4 characters per token, as with real models
+        tokens = [text[i:i + 4] for i in range(0, len(text), 4)]
+        time.sleep(srv.latency + len(tokens) / srv.tokens_per_s if srv.tokens_per_s else srv.latency)
+        final = {"response": "", "done": True, "eval_count": len(tokens),
+                 "eval_duration": int(len(tokens) / (srv.tokens_per_s or 1e6) * 1e9)}
+        if body.get("stream", True) is False:
+            self._send_json(dict(final, response=text))
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for msg in [{"response": t, "done": False} for t in tokens] + [final]:
+                line = (json.dumps(msg) + "\n").encode("utf-8")
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # the client stops reading once the JSON is complete
+            self.close_connection = True
+
+class FakeOllama(ThreadingHTTPServer):
+    """
+    A local stand-in for the Ollama HTTP API (/api/tags and /api/generate) for benchmarks.
+
+    Every generate call waits latency seconds plus its reply length at tokens_per_s
+    (0 = instant), then answers with a well-formed name/art/flavor object, or a
+    {"cards": [...]} list for batch prompts. Use as a context manager; host is the URL.
+    """
+    daemon_threads = True
+
+    def __init__(self, latency: float = 0.05, tokens_per_s: float = 0.0, models=("gemma3:4b",), port: int = 0):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.latency = latency
+        self.tokens_per_s = tokens_per_s
+        self.models = list(models)
+        self.requests = 0
+        self.lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def host(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self) -> "FakeOllama":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> "FakeOllama":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -1,5 +1,9 @@
 
-import json, re, urllib.request
+import http.client, json, re, threading, time
+from typing import Callable, Optional
+from urllib.parse import urlsplit
+
+from .. import instrument
 
 MECHANIC_WORDS = {
  'flying','first strike','double strike','menace','deathtouch','lifelink','trample','reach','vigilance','haste',
@@ -17,14 +21,269 @@ def _clean_name(n:str)->str:
         n = 'Nameless'
     return n
 
-def _req(url, body, timeout=60.0):
-    data = json.dumps(body).encode('utf-8')
-    req = urllib.request.Request(url, data=data, headers={'Content-Type':'application/json'})
-    with urllib.request.urlopen(req, timeout=timeout) as resp:
-        return json.loads(resp.read().decode('utf-8'))
+class _ConnectionPool:
+    """
+    Idle keep-alive connections per (scheme, host, port), shared by all threads.
+    A connection is used by one request at a time and handed back afterwards, so
+    concurrent callers each get their own socket and nobody reconnects per card.
+    """
+    def __init__(self, max_idle: int = 16):
+        self.max_idle = max_idle
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, scheme: str, netloc: str, timeout: float):
+        with self._lock:
+            conns = self._idle.get((scheme, netloc))
+            if conns:
+                conn = conns.pop()
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                return conn, True
+        cls = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        return cls(netloc, timeout=timeout), False
+
+    def release(self, scheme: str, netloc: str, conn) -> None:
+        with self._lock:
+            conns = self._idle.setdefault((scheme, netloc), [])
+            if len(conns) < self.max_idle:
+                conns.append(conn)
+                return
+        conn.close()
+
+    def clear(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+_pool = _ConnectionPool()
+
+def _send(url, body, timeout, method='POST'):
+    """Send body as JSON (none if None) on a pooled connection; returns (parts, conn, response) with only the headers read."""
+    parts = urlsplit(url)
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+    headers = {'Connection': 'keep-alive'}
+    data = None
+    if body is not None:
+        data = json.dumps(body).encode('utf-8')
+        headers['Content-Type'] = 'application/json'
+    while True:
+        conn, reused = _pool.acquire(parts.scheme, parts.netloc, timeout)
+        try:
+            conn.request(method, path, body=data, headers=headers)
+            return parts, conn, conn.getresponse()
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            conn.close()
+            # the server dropped an idle keep-alive socket; retry once on a fresh one
+            if reused:
+                continue
+            raise
+        except Exception:
+            conn.close()
+            raise
+
+def _finish(parts, conn, resp, url):
+    """Hand a fully read connection back to the pool and raise on HTTP errors."""
+    if resp.will_close:
+        conn.close()
+    else:
+        _pool.release(parts.scheme, parts.netloc, conn)
+    if resp.status >= 400:
+        raise http.client.HTTPException(f"{resp.status} {resp.reason} from {url}")
 
-def name_art_flavor(set_context:str, card_text:str, mv:int, pt:str=None, subtypes:str="", model:str='llama3', host:str='http://localhost:11434'):
-    sys = """You generate flavorful elements for a custom Magic-style card.
+def _req(url, body, timeout=60.0, method='POST'):
+    parts, conn, resp = _send(url, body, timeout, method)
+    try:
+        raw = resp.read()
+    except Exception:
+        conn.close()
+        raise
+    _finish(parts, conn, resp, url)
+    return json.loads(raw.decode('utf-8'))
+
+class _JsonEnd:
+    """Finds where the first top-level JSON object or array in a stream of text closes."""
+    def __init__(self):
+        self.depth = 0
+        self.in_str = False
+        self.esc = False
+
+    def feed(self, chunk:str)->int:
+        """Offset just past the closing bracket within chunk, or -1 if it is still open."""
+        for k, ch in enumerate(chunk):
+            if self.in_str:
+                if self.esc: self.esc = False
+                elif ch == '\\': self.esc = True
+                elif ch == '"': self.in_str = False
+            elif ch in '{[':
+                self.depth += 1
+            elif self.depth:
+                if ch == '"': self.in_str = True
+                elif ch in '}]':
+                    self.depth -= 1
+                    if not self.depth:
+                        return k + 1
+        return -1
+
+def _stream(url, body, timeout=60.0):
+    """
+    POST a streaming /api/generate request and collect the completion until the first
+    top-level JSON value is complete. One more message is read after that: if it is the
+    final status line the connection goes back to the pool, otherwise the model is still
+    talking and the connection is closed, which stops generation.
+    Returns (text, final status line or {}).
+    """
+    parts, conn, resp = _send(url, dict(body, stream=True), timeout)
+    if resp.status >= 400:
+        try:
+            resp.read()
+        except Exception:
+            conn.close()
+            raise
+        _finish(parts, conn, resp, url)
+    out, scan, complete = [], _JsonEnd(), False
+    try:
+        for line in resp:
+            if not line.strip():
+                continue
+            msg = json.loads(line)
+            if msg.get("error"):
+                raise RuntimeError(msg["error"])
+            if complete and not msg.get("done"):
+                conn.close()
+                return "".join(out), {}
+            if not complete:
+                piece = msg.get("response", "")
+                end = scan.feed(piece)
+                complete = end >= 0
+                out.append(piece[:end] if complete else piece)
+            if msg.get("done"):
+                resp.read()
+                _finish(parts, conn, resp, url)
+                return "".join(out), msg
+    except Exception:
+        conn.close()
+        raise
+    # body ended without a done line
+    conn.close()
+    return "".join(out), {}
+
+def probe(host:str, model:str, timeout:float=3.0)->Optional[str]:
+    """Quick check that host answers and has model pulled: None if fine, else what is wrong."""
+    try:
+        js = _req(host.rstrip('/') + '/api/tags', None, timeout=timeout, method='GET')
+    except Exception as e:
+        return f"{host} unreachable ({e.__class__.__name__}: {e})"
+    names = {m.get('name') for m in js.get('models', [])}
+    if model in names or (':' not in model and model + ':latest' in names):
+        return None
+    return f"model {model!r} is not available on {host}"
+
+class CircuitOpen(Exception):
+    """Raised instead of calling an endpoint the breaker has given up on for now."""
+
+class CircuitBreaker:
+    """
+    Stops calling a failing endpoint. After failure_threshold consecutive network
+    failures or timeouts the circuit opens and calls fail fast (cards get FALLBACK)
+    for cooldown seconds. Then a single caller runs check() (e.g. probe); if that
+    passes the circuit closes, otherwise it stays open for another cooldown. Without
+    check the next real request is the trial. degraded counts fallback results.
+    """
+    def __init__(self, failure_threshold:int=3, cooldown:float=30.0, check:Optional[Callable[[], Optional[str]]]=None):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.check = check
+        self.failures = 0
+        self.trips = 0
+        self.degraded = 0
+        self.last_error = None
+        self._open_until = None
+        self._checking = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self)->bool:
+        return self._open_until is not None
+
+    def allow(self)->bool:
+        with self._lock:
+            if self._open_until is None:
+                return True
+            if self._checking or time.monotonic() < self._open_until:
+                return False
+            if self.check is None:
+                # half-open: this request is the trial, everyone else keeps failing fast
+                self._open_until = time.monotonic() + self.cooldown
+                return True
+            self._checking = True
+        problem = self.check()
+        with self._lock:
+            self._checking = False
+            if problem is None:
+                self._open_until = None
+                self.failures = 0
+                return True
+            self.last_error = problem
+            self._open_until = time.monotonic() + self.cooldown
+            return False
+
+    def trip(self, reason:str)->None:
+        """Open the circuit now, e.g. because the pre-run probe failed."""
+        with self._lock:
+            self.last_error = reason
+            self.trips += 1
+            self._open_until = time.monotonic() + self.cooldown
+
+    def record_success(self)->None:
+        with self._lock:
+            self.failures = 0
+            self._open_until = None
+
+    def record_failure(self, error)->None:
+        with self._lock:
+            self.failures += 1
+            self.last_error = f"{error.__class__.__name__}: {error}"
+            if self.failures >= self.failure_threshold or self._open_until is not None:
+                if self._open_until is None:
+                    self.trips += 1
+                self._open_until = time.monotonic() + self.cooldown
+
+    def note_degraded(self, count:int=1)->None:
+        with self._lock:
+            self.degraded += count
+
+def _guarded(call, breaker):
+    """Run call() through breaker: fail fast while open; network trouble counts against it."""
+    if breaker is None:
+        return call()
+    if not breaker.allow():
+        raise CircuitOpen(breaker.last_error)
+    try:
+        res = call()
+    except (OSError, http.client.HTTPException, RuntimeError) as e:
+        # unreachable, timed out, HTTP error or an error line from Ollama
+        breaker.record_failure(e)
+        raise
+    except Exception:
+        # the endpoint answered, just not with usable JSON
+        breaker.record_success()
+        raise
+    breaker.record_success()
+    return res
+
+# Token cap per card; a name, two sentences of art and a quote fit well inside it
+NUM_PREDICT = 256
+
+# What a card gets when the model is unreachable or answers garbage
+FALLBACK = {"name":"Nameless","art":"A mood-rich fantasy scene matching the set themes.","flavor":"\"A whisper from the set's heart.\""}
+
+_SYSTEM = """You generate flavorful elements for a custom Magic-style card.
 - OUTPUT: JSON only with keys exactly: name, art, flavor.
 - Do NOT repeat rules text, mana, or keywords in the name.
 - NAME: 1–4 words, Title Case, evocative, no punctuation like ';' or ':'.
@@ -34,6 +293,8 @@ If unsure, return empty strings but keep valid JSON.
 If card is a LEGENDARY CREATURE "commander".
 - The NAME MUST be a proper name for a single unique character (e.g. "Arash, Soulfire Tactician").
 - The FLAVOR line MUST be a quote spoken by that character in first person or closely tied to them."""
+
+def build_prompt(set_context:str, card_text:str, mv:int, pt:str=None, subtypes:str="")->str:
     user = f"""Set description:
 {set_context}
 
@@ -45,22 +306,151 @@ Rules Text:
 {card_text}
 
 Return JSON ONLY: {{\"name\":\"...\",\"art\":\"...\",\"flavor\":\"...\"}}"""
+    return _SYSTEM + "\n\n" + user
+
+def build_batch_prompt(set_context:str, items)->str:
+    """
+    One prompt for several cards; items are (card_text, mv, pt, subtypes) tuples.
+    The system text is sent (and prefilled) once instead of once per card.
+    """
+    blocks = []
+    for n, (card_text, mv, pt, subtypes) in enumerate(items, start=1):
+        blocks.append(f"""Card {n}:
+Mana Value: {mv}
+{('Power/Toughness: '+pt) if pt else ''}
+Subtype: {subtypes}
+Rules Text:
+{card_text}""")
+    cards = "\n\n".join(blocks)
+    user = f"""Set description:
+{set_context}
+
+There are {len(items)} cards below. Treat each one on its own, following the rules above.
+Mechanical context (do not quote these in output):
+
+{cards}
+
+Return JSON ONLY: {{\"cards\": [...]}} where the array holds exactly {len(items)} objects in card order, each {{\"name\":\"...\",\"art\":\"...\",\"flavor\":\"...\"}}"""
+    return _SYSTEM + "\n\n" + user
+
+def _tidy(o:dict)->dict:
+    name = _clean_name((o.get("name","") or "").strip())
+    art = (o.get("art","") or "").replace('\n',' ').strip()
+    flavor = (o.get("flavor","") or "").replace('\n',' ').strip()
+    if not flavor.startswith('"'): flavor = '"'+flavor
+    if not flavor.endswith('"'): flavor = flavor + '"'
+    if not name: name = "Nameless"
+    if not art: art = "A mood-rich fantasy scene matching the set themes."
+    if not flavor or flavor == '""': flavor = "\"A whisper from the set's heart.\""
+    return {"name": name, "art": art, "flavor": flavor}
+
+def _parse_response(resp:str)->dict:
+    """Pull the JSON object out of a completion and tidy it; raises if there is none."""
+    start = resp.find('{'); end = resp.rfind('}')+1
+    return _tidy(json.loads(resp[start:end]))
+
+def _parse_batch_response(resp:str, count:int)->list:
+    """The card list of a batch completion, tidied; raises unless it holds exactly count objects."""
+    start = resp.find('{'); end = resp.rfind('}')+1
+    arr = json.loads(resp[start:end])
+    if isinstance(arr, dict):
+        arr = arr.get("cards")
+    if not isinstance(arr, list) or len(arr) != count or not all(isinstance(o, dict) for o in arr):
+        raise ValueError(f"expected a JSON array of {count} objects")
+    return [_tidy(o) for o in arr]
+
+def _complete(prompt:str, model:str, host:str, num_predict:int)->str:
+    # JSON mode keeps the model from wrapping the object in prose; the stream is cut
+    # as soon as the object closes, and num_predict bounds a reply that never does
     url = host.rstrip('/') + '/api/generate'
-    body = {"model": model, "prompt": sys + "\n\n" + user, "stream": False}
+    body = {"model": model, "prompt": prompt, "format": "json", "options": {"num_predict": num_predict}}
+    metrics = instrument.active()
+    if metrics is None:
+        return _stream(url, body)[0]
+    t0 = time.perf_counter()
     try:
-        js = _req(url, body)
-        resp = js.get("response",""
-        )
-        start = resp.find('{'); end = resp.rfind('}')+1
-        o = json.loads(resp[start:end])
-        name = _clean_name((o.get("name","") or "").strip())
-        art = (o.get("art","") or "").replace('\n',' ').strip()
-        flavor = (o.get("flavor","") or "").replace('\n',' ').strip()
-        if not flavor.startswith('"'): flavor = '"'+flavor
-        if not flavor.endswith('"'): flavor = flavor + '"'
-        if not name: name = "Nameless"
-        if not art: art = "A mood-rich fantasy scene matching the set themes."
-        if not flavor or flavor == '""': flavor = "\"A whisper from the set's heart.\""
-        return {"name": name, "art": art, "flavor": flavor}
+        text, final = _stream(url, body)
     except Exception:
-        return {"name":"Nameless","art":"A mood-rich fantasy scene matching the set themes.","flavor":"\"A whisper from the set's heart.\""}
+        metrics.count("llm.errors")
+        raise
+    elapsed = time.perf_counter() - t0
+    metrics.add("llm.request", elapsed)
+    metrics.observe("llm.request", elapsed)
+    # only a reply that ended cleanly carries Ollama's decode stats
+    if final.get("eval_count") and final.get("eval_duration"):
+        metrics.tokens(int(final["eval_count"]), int(final["eval_duration"]))
+    return text
+
+def generate(prompt:str, model:str='llama3', host:str='http://localhost:11434')->dict:
+    """One request for a built prompt; raises on network or parse errors."""
+    return _parse_response(_complete(prompt, model, host, NUM_PREDICT))
+
+def generate_batch(prompt:str, count:int, model:str='llama3', host:str='http://localhost:11434')->list:
+    """One request for a batch prompt of count cards; raises on network or parse errors."""
+    return _parse_batch_response(_complete(prompt, model, host, NUM_PREDICT * count), count)
+
+def name_art_flavor(set_context:str, card_text:str, mv:int, pt:str=None, subtypes:str="", model:str='llama3', host:str='http://localhost:11434', cache=None, breaker=None, backend=None):
+    """
+    name/art/flavor for one card. With a cache (llm.cache.ResponseCache) identical
+    prompts are answered locally; failures return FALLBACK and are never cached.
+    With a breaker (CircuitBreaker) a dead endpoint is skipped instead of waited on.
+    A backend (llm.backends) answers instead of Ollama at model/host.
+    """
+    return _one_card(set_context, (card_text, mv, pt, subtypes), model, host, cache, breaker, backend)
+
+def _one_card(set_context, item, model, host, cache, breaker, backend, counted=True):
+    # counted=False: the batch path already counted this card's cache lookup
+    prompt = build_prompt(set_context, *item)
+    if backend is not None:
+        model = backend.model
+        call = lambda: _guarded(lambda: backend.generate(prompt), breaker)
+    else:
+        call = lambda: _guarded(lambda: generate(prompt, model, host), breaker)
+    try:
+        if cache is None:
+            return call()
+        return cache.get_or_compute(cache.key(model, prompt), call, counted)
+    except Exception:
+        if breaker is not None:
+            breaker.note_degraded()
+        return dict(FALLBACK)
+
+def name_art_flavor_batch(set_context:str, items, model:str='llama3', host:str='http://localhost:11434', cache=None, breaker=None, backend=None):
+    """
+    name/art/flavor for several cards (items as in build_batch_prompt) with one request.
+    Cards already in the cache are skipped; answers are stored under each card's
+    single-card key, so batched and unbatched runs share the cache. A malformed or
+    failed batch falls back to one request per card.
+    """
+    items = list(items)
+    if backend is not None:
+        model = backend.model
+    results = [None] * len(items)
+    keys = [None] * len(items)
+    if cache is not None:
+        for n, it in enumerate(items):
+            keys[n] = cache.key(model, build_prompt(set_context, *it))
+            results[n] = cache.get(keys[n])
+    todo = [n for n, r in enumerate(results) if r is None]
+    if len(todo) == 1:
+        n = todo[0]
+        results[n] = _one_card(set_context, items[n], model, host, cache, breaker, backend, counted=False)
+    elif todo:
+        prompt = build_batch_prompt(set_context, [items[n] for n in todo])
+        if backend is not None:
+            # the single-card prompts let a recording answer the same cards however they were batched
+            singles = [build_prompt(set_context, *items[n]) for n in todo]
+            batch = lambda: backend.generate_batch(prompt, len(todo), singles)
+        else:
+            batch = lambda: generate_batch(prompt, len(todo), model, host)
+        try:
+            answers = _guarded(batch, breaker)
+        except Exception:
+            for n in todo:
+                results[n] = _one_card(set_context, items[n], model, host, cache, breaker, backend, counted=False)
+        else:
+            for n, res in zip(todo, answers):
+                results[n] = res
+                if cache is not None:
+                    cache.put(keys[n], res)
+    return results
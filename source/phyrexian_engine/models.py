@@ -1,6 +1,7 @@
 
-from dataclasses import dataclass, field
-from typing import List, Dict, Optional
+from array import array
+from dataclasses import dataclass, field, fields
+from typing import Any, List, Dict, Iterable, Iterator, Optional, Sequence, Union
 
 COLORS = ['W','U','B','R','G']
 RARITIES = ['common','uncommon','rare','mythic']
@@ -22,25 +23,29 @@ class SetSpec:
     colors: List[str] = field(default_factory=lambda: ['W','U','B','R','G'])
     include_artifacts: bool = True
     include_lands: bool = True
-    rarity_weights: Dict[str, int] = field(default_factory=lambda: {'common': 60, 'uncommon': 25, 'rare': 12, 'mythic': 3})
-    type_weights: Dict[str, int] = field(default_factory=lambda: {'Creature': 55, 'Instant': 10, 'Sorcery': 10, 'Enchantment': 10, 'Artifact': 10, 'Land': 5})
+    # relative weights used by the planner (distribution.plan_skeleton); rarity keys are case-insensitive,
+    # type keys may include the pseudo-types AuraCreature, AuraLand and Equipment
+    rarity_weights: Dict[str, float] = field(default_factory=lambda: {'common': 100, 'uncommon': 35, 'rare': 15, 'mythic': 5})
+    type_weights: Dict[str, float] = field(default_factory=lambda: {'Creature': 45, 'Instant': 15, 'Sorcery': 15, 'Enchantment': 10, 'Artifact': 8, 'Land': 5, 'AuraCreature': 6, 'AuraLand': 4, 'Equipment': 6})
     seed: Optional[int] = None
+    # mana value -> weight for nonland cards; empty = distribution.DEFAULT_CURVE
     target_curve: Dict[int, float] = field(default_factory=dict)
     selected_packages: List[str] = field(default_factory=list)
     commander_mode: bool = False
 
-@dataclass
+@dataclass(slots=True)
 class Card:
     temp_id: str
-    color_identity: List[str]
-    types: List[str]
+    color_identity: Optional[str]
+    # lists while a card is built; shared tuples once a StringTable has interned it
+    types: Sequence[str]
     mana_value: int
     mana_cost: str
     rules_text: str
     rarity: str
     power: Optional[int] = None
     toughness: Optional[int] = None
-    subtypes: List[str] = field(default_factory=list)
+    subtypes: Sequence[str] = field(default_factory=list)
     name: Optional[str] = None
     art_description: Optional[str] = None
     flavor_text: Optional[str] = None
@@ -50,7 +55,206 @@ class Card:
         sub = " ".join(dict.fromkeys(self.subtypes)).strip()  # de-dup subtypes
         return main if not sub else f"{main} — {sub}"
 
+class StringTable:
+    """
+    One canonical copy of every string (and tuple of strings) used across a set, each
+    with a small integer id; id 0 is None. Cards from the same packs repeat rarities,
+    costs, type words, subtype lists and whole rules lines, so a large set keeps each
+    of them once.
+    """
+    __slots__ = ("_ids", "_values")
+
+    def __init__(self):
+        self._ids: Dict[Any, int] = {None: 0}
+        self._values: List[Any] = [None]
+
+    def __len__(self) -> int:
+        return len(self._values) - 1
+
+    def id(self, value) -> int:
+        """Id of a str, None, or a list/tuple of str (stored as an interned tuple)."""
+        if isinstance(value, list):
+            value = tuple(value)
+        if isinstance(value, tuple):
+            value = tuple(self.intern(v) for v in value)
+        i = self._ids.get(value)
+        if i is None:
+            i = self._ids[value] = len(self._values)
+            self._values.append(value)
+        return i
+
+    def value(self, i: int):
+        return self._values[i]
+
+    def intern(self, value):
+        """The canonical copy of value (lists come back as tuples)."""
+        return self._values[self.id(value)]
+
+    def intern_card(self, card: Card) -> Card:
+        """Point card's repeated strings and type lists at the shared copies, in place."""
+        for name in _INTERNED:
+            setattr(card, name, self.intern(getattr(card, name)))
+        card.rules_text = "\n".join(self.intern(card.rules_text.split("\n")))
+        return card
+
+# Card fields held as table values (str, tuple or None)
+_INTERNED = ("color_identity", "types", "mana_cost", "rarity", "subtypes")
+# nearly unique per card: interning would only add table entries
+_UNIQUE = ("temp_id", "name", "art_description", "flavor_text")
+_INT_FIELDS = ("mana_value", "power", "toughness")
+# stands in for power/toughness None in the int columns
+_NO_INT = -(1 << 31)
+
+class CardView:
+    """
+    One card of a CardColumns, read and written through the columns. It has the Card
+    attributes and typeline(); list fields come back as tuples, so change them by
+    assigning a new value rather than appending.
+    """
+    __slots__ = ("_cols", "_i")
+
+    def __init__(self, cols: "CardColumns", i: int):
+        object.__setattr__(self, "_cols", cols)
+        object.__setattr__(self, "_i", i)
+
+    def __getattr__(self, name):
+        return self._cols.get(self._i, name)
+
+    def __setattr__(self, name, value):
+        self._cols.set(self._i, name, value)
+
+    typeline = Card.typeline
+
+    def to_card(self) -> Card:
+        return Card(**{f.name: getattr(self, f.name) for f in fields(Card)})
+
+    def __repr__(self) -> str:
+        return f"CardView({self._i}, {self.to_card()!r})"
+
+class CardColumns:
+    """
+    Column-wise card storage for very large sets: one array per field instead of one
+    object per card. Repeated strings live once in a StringTable and the columns hold
+    their ids; rules text is stored as an interned tuple of interned lines, and the
+    per-card strings (id, name, art, flavor) as plain references. Indexing gives a
+    CardView, so exporters, typeline() and re-rolls (cards[i] = card) work unchanged.
+    size pre-allocates empty slots to be filled by index.
+    """
+    def __init__(self, size: int = 0, strings: Optional[StringTable] = None):
+        self.strings = strings or StringTable()
+        self._ids = {name: array('I', [0]) * size for name in _INTERNED + ("rules_text",)}
+        self._refs = {name: [None] * size for name in _UNIQUE}
+        self._ints = {name: array('i', [0 if name == "mana_value" else _NO_INT]) * size for name in _INT_FIELDS}
+
+    @classmethod
+    def from_cards(cls, cards: Iterable[Card], strings: Optional[StringTable] = None) -> "CardColumns":
+        cols = cls(strings=strings)
+        for c in cards:
+            cols.append(c)
+        return cols
+
+    def __len__(self) -> int:
+        return len(self._ids["types"])
+
+    def __getitem__(self, i: Union[int, slice]):
+        if isinstance(i, slice):
+            return [CardView(self, k) for k in range(len(self))[i]]
+        return CardView(self, self._index(i))
+
+    def __setitem__(self, i: int, card) -> None:
+        i = self._index(i)
+        for f in fields(Card):
+            self.set(i, f.name, getattr(card, f.name))
+
+    def __iter__(self) -> Iterator[CardView]:
+        for i in range(len(self)):
+            yield CardView(self, i)
+
+    def append(self, card) -> None:
+        for col in self._ids.values():
+            col.append(0)
+        for col in self._refs.values():
+            col.append(None)
+        for name, col in self._ints.items():
+            col.append(0 if name == "mana_value" else _NO_INT)
+        self[len(self) - 1] = card
+
+    def get(self, i: int, name: str):
+        col = self._ids.get(name)
+        if col is not None:
+            value = self.strings.value(col[i])
+            if name == "rules_text" and value is not None:
+                return "\n".join(value)
+            return value
+        col = self._refs.get(name)
+        if col is not None:
+            return col[i]
+        col = self._ints.get(name)
+        if col is None:
+            raise AttributeError(name)
+        value = col[i]
+        return None if value == _NO_INT else value
+
+    def set(self, i: int, name: str, value) -> None:
+        col = self._ids.get(name)
+        if col is not None:
+            if name == "rules_text" and value is not None:
+                value = value.split("\n")
+            col[i] = self.strings.id(value)
+            return
+        col = self._refs.get(name)
+        if col is not None:
+            col[i] = value
+            return
+        col = self._ints.get(name)
+        if col is None:
+            raise AttributeError(name)
+        col[i] = _NO_INT if value is None else value
+
+    def _index(self, i: int) -> int:
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("card index out of range")
+        return i
+
+@dataclass
+class Skeleton:
+    """The planned slot of every card as parallel lists; card i is index i - 1."""
+    types: List[str] = field(default_factory=list)
+    rarities: List[str] = field(default_factory=list)
+    mana_values: List[int] = field(default_factory=list)
+    colors: List[List[str]] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def slice(self, start: int, stop: int) -> "Skeleton":
+        return Skeleton(self.types[start:stop], self.rarities[start:stop], self.mana_values[start:stop],
+                        self.colors[start:stop])
+
 @dataclass
 class CardSet:
     spec: SetSpec
-    cards: List[Card] = field(default_factory=list)
+    # a list of Card, or CardColumns for very large sets (see compact)
+    cards: Union[List[Card], CardColumns] = field(default_factory=list)
+    # planned slot of each card (type incl. pseudo-types like AuraCreature, rarity, MV, colors), for re-rolls
+    plan: Skeleton = field(default_factory=Skeleton)
+    # card index (1-based) -> how many times it was re-rolled; 0/absent = original roll
+    variants: Dict[int, int] = field(default_factory=dict)
+
+    def compact(self, columnar: bool = False) -> "CardSet":
+        """
+        Share repeated strings across the set through one StringTable; with columnar the
+        cards also move into CardColumns. Returns self.
+        """
+        if isinstance(self.cards, CardColumns):
+            return self
+        if columnar:
+            self.cards = CardColumns.from_cards(self.cards)
+        else:
+            table = StringTable()
+            for card in self.cards:
+                table.intern_card(card)
+        return self
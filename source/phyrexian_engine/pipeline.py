@@ -0,0 +1,360 @@
+# pipeline.py
+"""Generation steps shared by the Tk app and the command line (no tkinter here)."""
+import hashlib, os, queue, random, threading, time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from typing import Callable, Iterator, List, Optional
+
+from . import instrument
+from .models import Card, CardSet, SetSpec, Skeleton
+from .generation.cardgen import generate_card
+from .generation.dedup import dedupe_names
+from .generation.distribution import pick_colors, plan_skeleton
+from .generation.templates import load_packages
+from .llm.ollama_client import CircuitBreaker, name_art_flavor, name_art_flavor_batch, probe
+
+PKG_DIR = os.path.join(os.path.dirname(__file__), "packages")
+
+def list_packages(pack_dir: str = PKG_DIR) -> List[str]:
+    """Sorted .json file names in the packages folder ([] if it does not exist)."""
+    try:
+        files = [f for f in os.listdir(pack_dir) if f.lower().endswith('.json')]
+    except FileNotFoundError:
+        files = []
+    return sorted(files)
+
+def build_card(i: int, card_type: str, spec: SetSpec, effects, subtypes_pool, string_pools, monster_keywords,
+               rng=random, colors=None, mana_value=None, rarity=None) -> Card:
+    """Generate card number i (1-based) for its planned slot; colors, MV and rarity are drawn if not planned."""
+    if colors is None:
+        colors = pick_colors(spec, card_type, rng)
+    metrics = instrument.active()
+    t0 = time.perf_counter() if metrics else 0.0
+    card = generate_card(f"C{i}", colors, card_type, spec, effects, subtypes_pool, string_pools, monster_keywords,
+                         rng=rng, mana_value=mana_value, rarity=rarity)
+    if metrics:
+        elapsed = time.perf_counter() - t0
+        metrics.add("generate_card", elapsed)
+        metrics.add(f"generate_card/{card_type}", elapsed)
+    return card
+
+def build_planned(i: int, plan: Skeleton, k: int, spec: SetSpec, packs, rng) -> Card:
+    """Card i from slot k of plan."""
+    effects, subtypes_pool, string_pools, monster_keywords = packs
+    return build_card(i, plan.types[k], spec, effects, subtypes_pool, string_pools, monster_keywords, rng=rng,
+                      colors=plan.colors[k], mana_value=plan.mana_values[k], rarity=plan.rarities[k])
+
+def resolve_seed(spec: SetSpec) -> int:
+    """The set seed: spec.seed, or a fresh random one when it is unset."""
+    if spec.seed is not None:
+        return spec.seed
+    return random.SystemRandom().randrange(1 << 63)
+
+def card_seed(set_seed: int, i: int, variant: int = 0) -> int:
+    """
+    Seed of card i's own random stream; depends only on the set seed, the index and
+    the re-roll count, so any card can be rebuilt without touching the others.
+    """
+    key = f"{set_seed}:{i}" if not variant else f"{set_seed}:{i}:{variant}"
+    digest = hashlib.blake2b(key.encode("ascii"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+def card_rng(set_seed: int, i: int, variant: int = 0) -> random.Random:
+    """A private generator for card i; nothing else draws from it."""
+    return random.Random(card_seed(set_seed, i, variant))
+
+def plan_set(spec: SetSpec, set_seed: int, exact: bool = False) -> Skeleton:
+    """The set plan (type, rarity, MV, colors per card), drawn from the set seed's own stream."""
+    return plan_skeleton(spec, random.Random(set_seed), exact=exact)
+
+def generate_range(spec: SetSpec, set_seed: int, start: int, plan: Skeleton, packs) -> List[Card]:
+    """Cards start, start+1, ... for the planned slots, each from its own random stream."""
+    return [build_planned(start + k, plan, k, spec, packs, card_rng(set_seed, start + k)) for k in range(len(plan))]
+
+# Per-process state of generate_cards workers, set once by _init_worker
+_worker_state = None
+
+def _init_worker(pack_dir: str, spec: SetSpec, set_seed: int, instrumented: bool = False) -> None:
+    global _worker_state
+    # a forked worker must not keep recording into its copy of the parent's metrics
+    instrument.disable()
+    packs = load_packages(pack_dir, spec.selected_packages, report_tokens=False)
+    _worker_state = (spec, set_seed, packs, instrumented)
+
+def _generate_chunk(task):
+    """(cards, metrics snapshot or None) for one chunk."""
+    start, plan = task
+    spec, set_seed, packs, instrumented = _worker_state
+    if not instrumented:
+        return generate_range(spec, set_seed, start, plan, packs), None
+    metrics = instrument.enable()
+    try:
+        return generate_range(spec, set_seed, start, plan, packs), metrics.snapshot()
+    finally:
+        instrument.disable()
+
+def iter_generated(spec: SetSpec, plan: Skeleton, packs, set_seed: int, workers: int = 1,
+                   pack_dir: str = PKG_DIR, chunk_size: Optional[int] = None, dedup=None) -> Iterator[Card]:
+    """Every planned card in order, yielded as soon as it (or its chunk) is ready; see generate_cards."""
+    cards = _iter_raw(spec, plan, packs, set_seed, workers, pack_dir, chunk_size)
+    if dedup is None:
+        yield from cards
+        return
+    # re-rolls happen here, in card order, so they do not depend on the worker count
+    for i, card in enumerate(cards, start=1):
+        yield dedup.admit(i, card, lambda variant: build_planned(i, plan, i - 1, spec, packs,
+                                                                 card_rng(set_seed, i, variant)))
+
+def _iter_raw(spec, plan, packs, set_seed, workers, pack_dir, chunk_size):
+    if workers <= 1 or len(plan) < 2:
+        for k in range(len(plan)):
+            yield build_planned(k + 1, plan, k, spec, packs, card_rng(set_seed, k + 1))
+        return
+    if not chunk_size:
+        # a few chunks per worker keeps them all busy without much pickling overhead
+        chunk_size = max(1, min(2000, len(plan) // (workers * 4) or 1))
+    tasks = [(start + 1, plan.slice(start, start + chunk_size)) for start in range(0, len(plan), chunk_size)]
+    metrics = instrument.active()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(pack_dir, spec, set_seed, metrics is not None)) as pool:
+        for chunk, snap in pool.map(_generate_chunk, tasks):
+            if snap and metrics:
+                metrics.merge(snap)
+            yield from chunk
+
+def generate_cards(spec: SetSpec, plan: Skeleton, packs, set_seed: int, workers: int = 1,
+                   pack_dir: str = PKG_DIR, chunk_size: Optional[int] = None, dedup=None) -> List[Card]:
+    """
+    Generate every planned card, in order. With workers > 1 the indices are split into
+    chunks across a process pool (each worker loads the packages once); because every
+    card has its own seeded stream the result is identical for any worker count.
+    dedup (generation.dedup.DuplicateIndex) re-rolls cards that repeat an earlier
+    one's rules text; the re-roll counts end up in dedup.variants.
+    """
+    return list(iter_generated(spec, plan, packs, set_seed, workers, pack_dir, chunk_size, dedup))
+
+def reroll_card(card_set: CardSet, i: int, packs, new_roll: bool = True) -> Card:
+    """
+    Rebuild card i (1-based) of a generated set in place and return it (not enriched).
+    The card keeps its planned type, rarity, MV and colors. new_roll=True draws a
+    fresh variant; False regenerates the current one, e.g. after editing a package.
+    Every other card is left exactly as it was.
+    """
+    if new_roll:
+        card_set.variants[i] = card_set.variants.get(i, 0) + 1
+    variant = card_set.variants.get(i, 0)
+    card = build_planned(i, card_set.plan, i - 1, card_set.spec, packs, card_rng(card_set.spec.seed, i, variant))
+    card_set.cards[i - 1] = card
+    return card
+
+def _prompt_fields(card: Card):
+    """(rules text, mana value, P/T, subtypes) as the LLM prompt shows them."""
+    pt = f"{card.power}/{card.toughness}" if (card.power is not None and card.toughness is not None) else None
+    subline = " ".join(card.subtypes) if card.subtypes else ""
+    return card.rules_text, card.mana_value, pt, subline
+
+def _apply_llm(card: Card, res: dict) -> None:
+    card.name = res.get('name'); card.art_description = res.get('art'); card.flavor_text = res.get('flavor')
+
+def check_llm(model: str, host: str, backend=None) -> CircuitBreaker:
+    """
+    A circuit breaker for one run that re-probes the endpoint after each cool-down.
+    The endpoint (or backend) is probed once up front; if it is down, or lacks the
+    model, the breaker starts open (reason in breaker.last_error) so no card waits on it.
+    """
+    check = backend.probe if backend is not None else (lambda: probe(host, model))
+    breaker = CircuitBreaker(check=check)
+    problem = check()
+    if problem:
+        breaker.trip(problem)
+    return breaker
+
+def enrich_card(card: Card, i: int, card_type: str, spec: SetSpec, use_llm: bool = True,
+                model: str = 'llama3', host: str = 'http://localhost:11434', cache=None, breaker=None,
+                backend=None) -> Card:
+    """
+    Fill name/art/flavor, from the LLM (through cache and breaker, if given) or with placeholders.
+    backend (llm.backends) replaces Ollama at model/host, e.g. with a mock or a recording.
+    """
+    if use_llm:
+        _apply_llm(card, name_art_flavor(spec.description, *_prompt_fields(card), model=model, host=host, cache=cache,
+                                         breaker=breaker, backend=backend))
+    else:
+        card.name = f"{card_type} {i}"
+        card.art_description = "A scene matching the card's color and effect."
+    return card
+
+def enrich_cards(cards: List[Card], types: List[str], spec: SetSpec, use_llm: bool = True,
+                 model: str = 'llama3', host: str = 'http://localhost:11434', concurrency: int = 4,
+                 on_card: Optional[Callable[[int, Card], None]] = None, cache=None,
+                 batch_size: int = 1, breaker=None, backend=None) -> List[Card]:
+    """
+    Enrich every card in place with up to `concurrency` LLM requests in flight.
+    cards keeps its order; on_card(i, card) runs in the calling thread as each card
+    finishes, in completion order, so one slow card never holds up the rest.
+    batch_size > 1 asks for that many cards per request: fewer round trips and one
+    system-prompt prefill per batch, but each answer waits for its whole batch.
+    With a breaker (llm.ollama_client.CircuitBreaker) cards skip a dead endpoint and
+    breaker.degraded counts those left with placeholder text.
+    """
+    if use_llm and batch_size > 1:
+        return _enrich_batched(cards, spec, model, host, max(1, concurrency), on_card, cache, batch_size, breaker,
+                               backend)
+    if not use_llm or concurrency <= 1:
+        for i, (card, ctype) in enumerate(zip(cards, types), start=1):
+            enrich_card(card, i, ctype, spec, use_llm=use_llm, model=model, host=host, cache=cache, breaker=breaker,
+                        backend=backend)
+            if on_card:
+                on_card(i, card)
+        return cards
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="enrich") as pool:
+        futures = {pool.submit(enrich_card, card, i, ctype, spec, use_llm, model, host, cache, breaker, backend): i
+                   for i, (card, ctype) in enumerate(zip(cards, types), start=1)}
+        for fut in as_completed(futures):
+            card = fut.result()
+            if on_card:
+                on_card(futures[fut], card)
+    return cards
+
+def enrich_batch(cards: List[Card], spec: SetSpec, model: str = 'llama3', host: str = 'http://localhost:11434',
+                 cache=None, breaker=None, backend=None) -> List[Card]:
+    """Fill name/art/flavor of several cards from one LLM request (per-card if the reply is unusable)."""
+    results = name_art_flavor_batch(spec.description, [_prompt_fields(c) for c in cards], model=model, host=host,
+                                    cache=cache, breaker=breaker, backend=backend)
+    for card, res in zip(cards, results):
+        _apply_llm(card, res)
+    return cards
+
+def _enrich_batched(cards, spec, model, host, concurrency, on_card, cache, batch_size, breaker, backend=None):
+    starts = range(0, len(cards), batch_size)
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="enrich") as pool:
+        futures = {pool.submit(enrich_batch, cards[s:s + batch_size], spec, model, host, cache, breaker, backend): s
+                   for s in starts}
+        for fut in as_completed(futures):
+            for i, card in enumerate(fut.result(), start=futures[fut] + 1):
+                if on_card:
+                    on_card(i, card)
+    return cards
+
+def run_pipeline(spec: SetSpec, plan: Skeleton, packs, set_seed: int, *, workers: int = 1,
+                 pack_dir: str = PKG_DIR, use_llm: bool = True, model: str = 'llama3',
+                 host: str = 'http://localhost:11434', concurrency: int = 4, batch_size: int = 1, cache=None,
+                 breaker=None, on_generated: Optional[Callable[[int, Card], None]] = None,
+                 on_card: Optional[Callable[[int, Card], None]] = None, queue_size: int = 4096, store=None,
+                 backend=None, dedup=None):
+    """
+    Generate and enrich the planned cards as overlapping stages:
+
+        plan (Skeleton) -> generate (own thread, or a process pool) -> bounded queue
+          -> enrich (up to `concurrency` LLM requests) -> publish (calling thread)
+
+    Rules text keeps being produced while earlier cards wait on the network, so the
+    wall time tends towards the slower stage instead of the sum. Generation runs at
+    most queue_size cards ahead of enrichment, and no more than 2 * concurrency
+    requests are queued on the pool at a time. on_generated(i, card) fires in card
+    order on the generating thread once a card has rules text; on_card(i, card) fires
+    in the calling thread once it is enriched, in completion order. Returns the cards
+    in order: a list, or `store` when one is given. store (e.g. models.CardColumns
+    pre-sized to len(plan)) receives store[i - 1] = card as each card is finished,
+    after which the pipeline drops its own reference. backend (llm.backends) answers
+    instead of Ollama at model/host. dedup (generation.dedup.DuplicateIndex) re-rolls
+    duplicate rules text as cards are generated and, once all are named, numbers
+    repeated names in card order.
+    """
+    types = plan.types
+    n = len(types)
+    cards: List[Optional[Card]] = [None] * n
+    handoff = queue.Queue(max(1, queue_size))
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for i, card in enumerate(iter_generated(spec, plan, packs, set_seed, workers, pack_dir, dedup=dedup),
+                                     start=1):
+                if not use_llm:
+                    enrich_card(card, i, types[i - 1], spec, use_llm=False)
+                if on_generated:
+                    on_generated(i, card)
+                # blocks once enrichment is queue_size cards behind
+                handoff.put((True, card))
+                if stop.is_set():
+                    return
+            handoff.put((False, None))
+        except BaseException as e:
+            handoff.put((False, e))
+
+    producer = threading.Thread(target=produce, name="generate", daemon=True)
+    producer.start()
+    batch_size = max(1, batch_size) if use_llm else 1
+    pool = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="enrich") if use_llm else None
+    pending = {}
+    batch: List[int] = []
+
+    def submit():
+        picked = [cards[i - 1] for i in batch]
+        if batch_size > 1:
+            fut = pool.submit(enrich_batch, picked, spec, model, host, cache, breaker, backend)
+        else:
+            fut = pool.submit(enrich_card, picked[0], batch[0], types[batch[0] - 1], spec, True, model, host, cache,
+                              breaker, backend)
+        pending[fut] = list(batch)
+        batch.clear()
+
+    def finished(i):
+        if on_card:
+            on_card(i, cards[i - 1])
+        if store is not None:
+            store[i - 1] = cards[i - 1]
+            cards[i - 1] = None
+
+    def publish(done):
+        for fut in done:
+            fut.result()
+            for i in pending.pop(fut):
+                finished(i)
+
+    try:
+        i = 0
+        while True:
+            try:
+                # poll while requests are out so finished cards are published promptly
+                ok, item = handoff.get(timeout=0.05 if pending else 0.5)
+            except queue.Empty:
+                publish([f for f in pending if f.done()])
+                if not producer.is_alive() and handoff.empty():
+                    # died outside produce()'s handler (e.g. in its thread's bootstrap)
+                    raise RuntimeError("card generation stopped without finishing")
+                continue
+            if not ok:
+                if item is not None:
+                    raise item
+                break
+            i += 1
+            cards[i - 1] = item
+            if not use_llm:
+                finished(i)
+                continue
+            batch.append(i)
+            if len(batch) >= batch_size:
+                submit()
+            publish([f for f in pending if f.done()])
+            while len(pending) >= 2 * max(1, concurrency):
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                publish(done)
+        if batch:
+            submit()
+        for fut in as_completed(list(pending)):
+            publish([fut])
+    finally:
+        stop.set()
+        # free a producer blocked on a full queue so it can see stop
+        while producer.is_alive():
+            try:
+                handoff.get(timeout=0.05)
+            except queue.Empty:
+                pass
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+    out = cards if store is None else store
+    if dedup is not None:
+        dedupe_names(out)
+    return out
@@ -0,0 +1,152 @@
+# table_view.py
+import tkinter as tk
+from tkinter import ttk
+from typing import Callable, Iterable, List, Sequence
+
+# event.state bits
+_SHIFT = 0x0001
+_CONTROL = 0x0004
+
+class VirtualTable(ttk.Frame):
+    """
+    A Treeview that only materializes the rows on screen.
+
+    Rows are positions 0..count-1; their values come from row_values(pos) when they
+    scroll into view, so a 50k-card set costs one screenful of Tk items instead of
+    50k. The visible items are recycled while scrolling, so the selection is kept
+    here by position (click, Ctrl-click, Shift-click, arrows and paging work as usual).
+    """
+    def __init__(self, master, columns: Sequence[str], row_values: Callable[[int], Sequence], **kw):
+        super().__init__(master, **kw)
+        self.row_values = row_values
+        self.count = 0
+        self.top = 0
+        self._selected = set()
+        self._anchor = None  # where Shift ranges start
+        self._cursor = None  # where the arrow keys move from
+        self.tree = ttk.Treeview(self, columns=columns, show='headings', selectmode='extended')
+        self.tree.pack(side='left', fill='both', expand=True)
+        self.vbar = ttk.Scrollbar(self, orient='vertical', command=self._on_scrollbar)
+        self.vbar.pack(side='right', fill='y')
+        try:
+            self._row_h = int(ttk.Style(self).lookup('Treeview', 'rowheight') or 20)
+        except (tk.TclError, ValueError):
+            self._row_h = 20
+
+        self.tree.bind('<Configure>', lambda e: self.refresh())
+        self.tree.bind('<Button-1>', self._on_click)
+        for seq in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            self.tree.bind(seq, self._on_wheel)
+        self.tree.bind('<Up>', lambda e: self._on_arrow(-1, e))
+        self.tree.bind('<Down>', lambda e: self._on_arrow(1, e))
+        self.tree.bind('<Prior>', lambda e: self._scroll_by(-self.page_size()))
+        self.tree.bind('<Next>', lambda e: self._scroll_by(self.page_size()))
+        self.tree.bind('<Home>', lambda e: self._scroll_by(-self.count))
+        self.tree.bind('<End>', lambda e: self._scroll_by(self.count))
+
+    # --- public ---
+    def page_size(self) -> int:
+        """Rows that fit on screen (the heading takes about one row)."""
+        return max(1, (self.tree.winfo_height() - self._row_h - 4) // self._row_h)
+
+    def set_count(self, count: int) -> None:
+        self.count = count
+        self._selected = {p for p in self._selected if p < count}
+        self.refresh()
+
+    def clear(self) -> None:
+        self._selected.clear()
+        self._anchor = self._cursor = None
+        self.top = 0
+        self.set_count(0)
+
+    def selection(self) -> List[int]:
+        """Selected positions, ascending."""
+        return sorted(self._selected)
+
+    def refresh_rows(self, positions: Iterable[int]) -> None:
+        """Re-read rows whose data changed; a no-op unless one of them is on screen."""
+        end = self.top + self.page_size()
+        if any(self.top <= p < end for p in positions):
+            self.refresh()
+
+    def see(self, pos: int) -> None:
+        n = self.page_size()
+        if pos < self.top:
+            self.top = pos
+        elif pos >= self.top + n:
+            self.top = pos - n + 1
+        self.refresh()
+
+    def refresh(self) -> None:
+        n = self.page_size()
+        self.top = max(0, min(self.top, self.count - n))
+        want = min(n, self.count - self.top)
+        items = self.tree.get_children()
+        for k in range(len(items), want):
+            self.tree.insert('', 'end', iid=f"r{k}")
+        if len(items) > want:
+            self.tree.delete(*items[want:])
+        for k in range(want):
+            self.tree.item(f"r{k}", values=self.row_values(self.top + k))
+        self.tree.selection_set([f"r{k}" for k in range(want) if self.top + k in self._selected])
+        self.tree.yview_moveto(0)
+        if self.count:
+            self.vbar.set(self.top / self.count, min(1.0, (self.top + n) / self.count))
+        else:
+            self.vbar.set(0.0, 1.0)
+
+    # --- events ---
+    def _on_scrollbar(self, *args):
+        if args[0] == 'moveto':
+            self.top = int(float(args[1]) * self.count)
+        elif args[0] == 'scroll':
+            step = int(args[1])
+            self.top += step * (self.page_size() if args[2] == 'pages' else 1)
+        self.refresh()
+
+    def _scroll_by(self, rows: int):
+        self.top += rows
+        self.refresh()
+        return "break"
+
+    def _on_wheel(self, event):
+        if event.num == 4 or getattr(event, 'delta', 0) > 0:
+            return self._scroll_by(-3)
+        return self._scroll_by(3)
+
+    def _on_click(self, event):
+        iid = self.tree.identify_row(event.y)
+        if not iid:
+            return None  # headings and empty space keep their default bindings
+        pos = self.top + int(iid[1:])
+        if event.state & _SHIFT and self._anchor is not None:
+            lo, hi = sorted((self._anchor, pos))
+            if not event.state & _CONTROL:
+                self._selected.clear()
+            self._selected.update(range(lo, hi + 1))
+        elif event.state & _CONTROL:
+            self._selected ^= {pos}
+            self._anchor = pos
+        else:
+            self._selected = {pos}
+            self._anchor = pos
+        self._cursor = pos
+        self.tree.focus_set()
+        self.refresh()
+        return "break"
+
+    def _on_arrow(self, delta: int, event):
+        if not self.count:
+            return "break"
+        start = self._cursor if self._cursor is not None else self.top - delta
+        pos = max(0, min(self.count - 1, start + delta))
+        if event.state & _SHIFT and self._anchor is not None:
+            lo, hi = sorted((self._anchor, pos))
+            self._selected = set(range(lo, hi + 1))
+        else:
+            self._selected = {pos}
+            self._anchor = pos
+        self._cursor = pos
+        self.see(pos)
+        return "break"
@@ -1,11 +1,11 @@
-import re
+import os, random, re
 
 
 def clamp(v, lo, hi):
     return max(lo, min(hi, v))
 
 
-def make_mana_cost(mv:int, colors:list)->str:
+def make_mana_cost(mv:int, colors:list, rng=random)->str:
     """Return a mana cost string based on the card's mana value (mv) and color identity.
 
     This version enforces:
@@ -15,8 +15,6 @@ def make_mana_cost(mv:int, colors:list)->str:
     Lands will have their cost cleared in cardgen.generate_card(), so we still
     return "0" here for mv==0 to keep artifacts with true 0 cost valid.
     """
-    import random
-
     order = ['W','U','B','R','G']
     # normalize/ordering for deterministic symbol order (WUBRG)
     cols = [c for c in order if c in (colors or [])]
@@ -28,7 +26,7 @@ def make_mana_cost(mv:int, colors:list)->str:
     # Multicolor special handling (2+ colors)
     if len(cols) >= 2:
         c1, c2 = cols[0], cols[1]
-        style_pick = random.random()
+        style_pick = rng.random()
         # try ~1/3 hybrid, ~1/3 phyrexian, ~1/3 normal multicolor
         if style_pick < 1/3:
             # Hybrid style: generic then two identical hybrid pips like (W/U)(W/U)
@@ -68,3 +66,12 @@ def make_mana_cost(mv:int, colors:list)->str:
 
 def sanitize_filename(name:str)->str:
     return re.sub(r'[^A-Za-z0-9_\-]+', '_', name)[:64]
+
+
+def cache_root()->str:
+    """Root of on-disk caches: PHYREXIAN_CACHE_DIR, else $XDG_CACHE_HOME or ~/.cache + /phyrexian_engine."""
+    env = os.environ.get("PHYREXIAN_CACHE_DIR")
+    if env:
+        return env
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "phyrexian_engine")
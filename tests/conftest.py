@@ -0,0 +1,11 @@
+import os, sys
+
+# the package lives in source/ and is run from there (see start.sh)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "source"))
+
+import pytest
+
+@pytest.fixture(autouse=True)
+def _cache_dir(tmp_path, monkeypatch):
+    # parsed packs and LLM replies must not land in (or come from) the user's cache
+    monkeypatch.setenv("PHYREXIAN_CACHE_DIR", str(tmp_path / "cache"))
@@ -0,0 +1,68 @@
+import threading
+
+import pytest
+
+from phyrexian_engine.llm.backends import MockBackend, RecordReplayBackend, ReplayMiss, make_backend
+from phyrexian_engine.pipeline import check_llm, enrich_cards, generate_cards
+from test_pipeline import SEED, _setup
+
+def _enriched(backend, batch_size=1, n=40):
+    spec, packs, plan = _setup(n)
+    cards = generate_cards(spec, plan, packs, SEED)
+    breaker = check_llm(backend.model, "", backend=backend)
+    enrich_cards(cards, plan.types, spec, model=backend.model, concurrency=4, batch_size=batch_size,
+                 breaker=breaker, backend=backend)
+    return [(c.name, c.art_description, c.flavor_text) for c in cards], breaker
+
+@pytest.mark.parametrize("batch_size", [1, 4])
+def test_record_then_replay_gives_the_same_replies(tmp_path, batch_size):
+    path = str(tmp_path / "rec.jsonl")
+    mock = MockBackend()
+    recorded, _ = _enriched(make_backend("mock", record=path), batch_size)
+    assert recorded == _enriched(mock, batch_size)[0]
+    for replay_batch in (batch_size, 1):
+        # batches are also stored per card, so a replay may batch differently
+        replay = make_backend(model="mock", replay=path)
+        replayed, breaker = _enriched(replay, replay_batch)
+        assert replayed == recorded
+        assert replay.misses == 0 and replay.hits > 0 and breaker.degraded == 0
+
+def test_replay_counts_misses(tmp_path):
+    path = str(tmp_path / "rec.jsonl")
+    recorder = RecordReplayBackend(path, inner=MockBackend())
+    recorder.generate("known")
+    replay = RecordReplayBackend(path, model="mock")
+    assert replay.generate("known") == MockBackend().generate("known")
+    with pytest.raises(ReplayMiss):
+        replay.generate("unknown")
+    with pytest.raises(ReplayMiss):
+        replay.generate_batch("unknown batch", 2, ["known", "unknown"])
+    assert (replay.hits, replay.misses) == (1, 2)
+    # replayed answers are copies
+    replay.generate("known")["name"] = "changed"
+    assert replay.generate("known")["name"] != "changed"
+    # a recording for another model answers nothing
+    assert RecordReplayBackend(path, model="gemma3:4b").probe() is None
+    with pytest.raises(ReplayMiss):
+        RecordReplayBackend(path, model="gemma3:4b").generate("known")
+    assert "no recorded" in RecordReplayBackend(str(tmp_path / "none.jsonl"), model="mock").probe()
+
+def test_interrupted_recording_line_is_skipped(tmp_path):
+    path = tmp_path / "rec.jsonl"
+    RecordReplayBackend(str(path), inner=MockBackend()).generate("known")
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"key": "cut sho')
+    assert RecordReplayBackend(str(path), model="mock").generate("known")["name"]
+
+def test_mock_counts_requests_from_many_threads():
+    mock = MockBackend()
+    def ask():
+        for k in range(500):
+            mock.generate(f"p{k}")
+            mock.generate_batch("b", 2)
+    threads = [threading.Thread(target=ask) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert mock.requests == 8 * 1000
@@ -0,0 +1,77 @@
+from phyrexian_engine.models import Card
+from phyrexian_engine.generation.dedup import DuplicateIndex, dedupe_names
+
+def card(rules, types=("Creature",), subtypes=("Elf",), name=None):
+    return Card(temp_id="C0", color_identity="G", types=list(types), mana_value=2, mana_cost="{1}{G}",
+                rules_text=rules, rarity="common", subtypes=list(subtypes), name=name)
+
+LONG = ("When this creature enters, draw a card, then discard a card unless you control "
+        "another Elf. Whenever you gain life, put a +1/+1 counter on target creature you control.")
+
+def test_exact_match_ignores_case_spacing_and_periods():
+    index = DuplicateIndex()
+    index.add(1, card("Flying.\nWhen this creature enters, draw a card."))
+    assert index.check(card("flying\nwhen  this creature enters, draw a card")) == "exact"
+    # same text on another type line is a different card
+    assert index.check(card("Flying.\nWhen this creature enters, draw a card.", subtypes=("Goblin",))) is None
+
+def test_near_match_found_through_lsh():
+    index = DuplicateIndex()
+    index.add(1, card(LONG))
+    assert index.check(card(LONG.replace("target creature", "each creature"))) == "near"
+    assert index.check(card("Trample. At the beginning of your upkeep, create a 1/1 green Saproling token.")) is None
+
+def test_cards_without_rules_text_are_never_duplicates():
+    index = DuplicateIndex()
+    index.add(1, card(""))
+    assert index.check(card("")) is None
+
+def test_admit_rerolls_until_unique():
+    index = DuplicateIndex()
+    index.admit(1, card("Flying."), lambda v: None)
+    tries = []
+    def reroll(variant):
+        tries.append(variant)
+        return card("Flying." if variant < 2 else "Reach.")
+    got = index.admit(2, card("Flying."), reroll)
+    assert got.rules_text == "Reach."
+    assert tries == [1, 2]
+    assert index.variants == {2: 2}
+    assert index.stats == {"exact": 2, "near": 0, "rerolls": 2, "unresolved": 0}
+    # the accepted re-roll is indexed, the rejected tries are not
+    assert index.check(card("Reach.")) == "exact"
+
+def test_admit_keeps_last_try_after_max_rerolls():
+    index = DuplicateIndex(max_rerolls=2)
+    index.admit(1, card("Flying."), lambda v: None)
+    got = index.admit(2, card("Flying."), lambda v: card("Flying."))
+    assert got.rules_text == "Flying."
+    assert index.variants == {2: 2}
+    assert index.stats == {"exact": 3, "near": 0, "rerolls": 2, "unresolved": 1}
+
+def test_unique_card_is_not_rerolled():
+    index = DuplicateIndex()
+    first = card("Flying.")
+    assert index.admit(1, first, lambda v: None) is first
+    assert index.variants == {}
+
+def _distinct(names):
+    names = [n.lower() for n in names if n]
+    return len(names) == len(set(names))
+
+def test_dedupe_names_numbers_repeats_in_order():
+    cards = [card("", name=n) for n in ("Nameless", "Grove Warden", "Nameless", "nameless", None, "Nameless II")]
+    assert dedupe_names(cards) == 3
+    # a repeat of a numbered name takes the next free numeral of its base name
+    assert [c.name for c in cards] == ["Nameless", "Grove Warden", "Nameless II", "nameless III", None,
+                                       "Nameless IV"]
+    assert _distinct(c.name for c in cards)
+
+def test_dedupe_names_skips_names_already_taken():
+    cards = [card("", name=n) for n in ("Nameless II", "Nameless", "Nameless")]
+    assert dedupe_names(cards) == 1
+    assert [c.name for c in cards] == ["Nameless II", "Nameless", "Nameless III"]
+    cards = [card("", name="Ash") for _ in range(12)] + [card("", name="Ash 12"), card("", name="ash x")]
+    dedupe_names(cards)
+    assert _distinct(c.name for c in cards)
+    assert [c.name for c in cards[9:]] == ["Ash X", "Ash 11", "Ash 12", "Ash 13", "ash 14"]
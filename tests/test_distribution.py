@@ -0,0 +1,51 @@
+import math, random
+from collections import Counter
+
+from phyrexian_engine.models import SetSpec
+from phyrexian_engine.generation.distribution import DEFAULT_CURVE, plan_skeleton
+
+# what plan_types drew from before the weights moved into SetSpec
+OLD_TYPE_WEIGHTS = {'Creature': 45, 'Instant': 15, 'Sorcery': 15, 'Enchantment': 10, 'Artifact': 8, 'Land': 5,
+                    'AuraCreature': 6, 'AuraLand': 4, 'Equipment': 6}
+
+def _spec(n, **kw):
+    return SetSpec(name="Test", code="TST", description="", total_cards=n, **kw)
+
+def _assert_apportioned(counts, weights, n):
+    total = sum(weights.values())
+    assert sum(counts.values()) == n
+    for key, w in weights.items():
+        share = w * n / total
+        assert math.floor(share) <= counts.get(key, 0) <= math.ceil(share), (key, counts.get(key), share)
+
+def test_exact_mode_hits_type_rarity_and_curve_counts():
+    n = 137
+    curve = {1: 3, 2: 7, 3: 7, 4: 5, 6: 1.5}
+    spec = _spec(n, rarity_weights={'Common': 10, 'uncommon': 4, 'RARE': 2.5, 'mythic': 0.5}, target_curve=curve)
+    plan = plan_skeleton(spec, random.Random(7), exact=True)
+    assert len(plan.types) == n
+    _assert_apportioned(Counter(plan.types), spec.type_weights, n)
+    _assert_apportioned(Counter(plan.rarities), {'Common': 10, 'Uncommon': 4, 'Rare': 2.5, 'Mythic': 0.5}, n)
+    nonland = [mv for t, mv in zip(plan.types, plan.mana_values) if t != 'Land']
+    _assert_apportioned(Counter(nonland), curve, len(nonland))
+    assert all(mv == 0 for t, mv in zip(plan.types, plan.mana_values) if t == 'Land')
+    # shuffled, not laid out type by type, and different seeds give different orders
+    assert plan.types != sorted(plan.types)
+    assert plan_skeleton(spec, random.Random(8), exact=True).types != plan.types
+
+def test_exact_mode_default_curve_and_toggles():
+    spec = _spec(250, include_lands=False, include_artifacts=False)
+    plan = plan_skeleton(spec, random.Random(1), exact=True)
+    kept = {k: w for k, w in spec.type_weights.items() if k not in ('Land', 'Artifact', 'Equipment')}
+    _assert_apportioned(Counter(plan.types), kept, 250)
+    _assert_apportioned(Counter(plan.mana_values), DEFAULT_CURVE, 250)
+
+def test_sampled_defaults_keep_the_old_type_proportions():
+    spec = _spec(40000)
+    assert spec.type_weights == OLD_TYPE_WEIGHTS
+    counts = Counter(plan_skeleton(spec, random.Random(3)).types)
+    total = sum(OLD_TYPE_WEIGHTS.values())
+    for key, w in OLD_TYPE_WEIGHTS.items():
+        p = w / total
+        # within 4.5 standard deviations of the old expected count
+        assert abs(counts[key] - p * 40000) < 4.5 * math.sqrt(40000 * p * (1 - p)), key
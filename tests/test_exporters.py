@@ -0,0 +1,60 @@
+import gzip, json
+
+from phyrexian_engine.models import Card, CardSet, SetSpec
+from phyrexian_engine.exporters.json_exporter import export_json, write_json
+
+SPEC = SetSpec(name="Test Set", code="TST", description="Æther-lit spires")
+
+def _cards():
+    return [
+        Card(temp_id="C1", color_identity="W", types=["Creature"], mana_value=2, mana_cost="{1}{W}",
+             rules_text="Flying\nWhen this creature enters, gain 2 life.", rarity="common", power=2, toughness=1,
+             subtypes=["Spirit", "Cleric"], name="Gilded Warden", art_description="A warden in gold.",
+             flavor_text="\"Hold the line.\" — Séverine"),
+        Card(temp_id="C2", color_identity=None, types=["Artifact"], mana_value=0, mana_cost="{0}",
+             rules_text="", rarity="rare"),
+    ]
+
+def _reference(spec, cards):
+    # what export_json wrote before it streamed: one json.dump of the whole set
+    data = {
+        "set": {"name": spec.name, "code": spec.code, "description": spec.description, "total": len(cards)},
+        "cards": [{
+            "name": c.name, "mana_cost": c.mana_cost, "mana_value": c.mana_value, "types": c.types,
+            "subtypes": c.subtypes, "rarity": c.rarity, "rules_text": c.rules_text, "power": c.power,
+            "toughness": c.toughness, "flavor_text": c.flavor_text, "art_description": c.art_description,
+            "color_identity": c.color_identity,
+        } for c in cards],
+    }
+    return json.dumps(data, indent=2, ensure_ascii=False)
+
+def test_json_matches_json_dump_byte_for_byte(tmp_path):
+    cards = _cards()
+    path = tmp_path / "set.json"
+    export_json(CardSet(spec=SPEC, cards=cards), str(path))
+    assert path.read_text(encoding="utf-8") == _reference(SPEC, cards)
+
+def test_json_empty_set(tmp_path):
+    path = tmp_path / "empty.json"
+    export_json(CardSet(spec=SPEC, cards=[]), str(path))
+    assert path.read_text(encoding="utf-8") == _reference(SPEC, [])
+
+def test_json_from_generator_puts_set_block_last(tmp_path):
+    cards = _cards()
+    path = tmp_path / "gen.json"
+    write_json(SPEC, (c for c in cards), str(path))
+    text = path.read_text(encoding="utf-8")
+    assert text.index('"cards"') < text.index('"set"')
+    assert json.loads(text) == json.loads(_reference(SPEC, cards))
+
+def test_json_from_empty_generator(tmp_path):
+    path = tmp_path / "gen-empty.json"
+    write_json(SPEC, iter(()), str(path))
+    assert json.loads(path.read_text(encoding="utf-8")) == json.loads(_reference(SPEC, []))
+
+def test_json_gzip_by_suffix(tmp_path):
+    cards = _cards()
+    path = tmp_path / "set.json.gz"
+    write_json(SPEC, cards, str(path))
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        assert f.read() == _reference(SPEC, cards)
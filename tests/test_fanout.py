@@ -0,0 +1,77 @@
+import os, re, sqlite3, threading, zipfile
+
+import pytest
+
+from phyrexian_engine.models import CardSet
+from phyrexian_engine.exporters.fanout import export_all
+from phyrexian_engine.exporters.json_exporter import write_json
+from phyrexian_engine.exporters.csv_exporter import write_csv
+from phyrexian_engine.exporters.mse_exporter import write_mse
+from phyrexian_engine.exporters.sqlite_exporter import write_sqlite
+from phyrexian_engine.pipeline import generate_cards
+from test_pipeline import SEED, _setup
+
+def _card_set(n=150):
+    spec, packs, plan = _setup(n)
+    return CardSet(spec=spec, cards=generate_cards(spec, plan, packs, SEED), plan=plan)
+
+def _mse(path):
+    with zipfile.ZipFile(path) as z:
+        text = z.read("set").decode("utf-8")
+    return re.sub(r"time_(created|modified): .*", r"time_\1: -", text)
+
+def _sqlite(path):
+    conn = sqlite3.connect(path)
+    try:
+        tables = [n for (n,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name")]
+        dump = {t: conn.execute(f"SELECT * FROM {t} ORDER BY rowid").fetchall() for t in tables}
+    finally:
+        conn.close()
+    dump["sets"] = [row[:6] for row in dump["sets"]]   # drop the creation time
+    return dump
+
+def _read(fmt, path):
+    if fmt == "mse":
+        return _mse(path)
+    if fmt == "sqlite":
+        return _sqlite(path)
+    with open(path, "rb") as f:
+        return f.read()
+
+def _single(card_set, fmt, path):
+    spec, cards = card_set.spec, card_set.cards
+    {"json": lambda: write_json(spec, cards, path, total=len(cards)), "csv": lambda: write_csv(cards, path),
+     "mse": lambda: write_mse(spec, cards, path), "sqlite": lambda: write_sqlite(spec, cards, path)}[fmt]()
+
+EXTS = {"json": ".json", "csv": ".csv", "mse": ".mse-set", "sqlite": ".db"}
+
+@pytest.mark.parametrize("processes", [False, True], ids=["threads", "processes"])
+def test_every_output_matches_its_own_exporter(tmp_path, processes):
+    card_set = _card_set()
+    paths = {fmt: str(tmp_path / f"all{ext}") for fmt, ext in EXTS.items()}
+    progress = []
+    assert export_all(card_set, paths, on_progress=lambda done, n: progress.append((done, n)),
+                      chunk_size=16, processes=processes) == paths
+    assert progress[-1] == (150, 150)
+    for fmt, ext in EXTS.items():
+        ref = str(tmp_path / f"one{ext}")
+        _single(card_set, fmt, ref)
+        assert _read(fmt, paths[fmt]) == _read(fmt, ref), fmt
+
+@pytest.mark.parametrize("processes", [False, True], ids=["threads", "processes"])
+def test_writer_error_is_raised_after_the_others_finish(tmp_path, processes):
+    card_set = _card_set(60)
+    (tmp_path / "taken.csv").mkdir()   # the CSV writer cannot open a directory
+    paths = {"json": str(tmp_path / "set.json"), "csv": str(tmp_path / "taken.csv"),
+             "sqlite": str(tmp_path / "set.db")}
+    with pytest.raises(OSError):
+        export_all(card_set, paths, chunk_size=8, depth=1, processes=processes)
+    assert not [t for t in threading.enumerate() if t.name.startswith("export-")]
+    assert not os.path.exists(str(tmp_path / "set.db.tmp"))
+    ref = str(tmp_path / "one.json")
+    _single(card_set, "json", ref)
+    assert _read("json", paths["json"]) == _read("json", ref)
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(ValueError, match="unknown export format"):
+        export_all(_card_set(10), {"pdf": str(tmp_path / "set.pdf")})
@@ -0,0 +1,23 @@
+import pstats, threading
+
+from phyrexian_engine import instrument
+
+def _spin_in_thread():
+    total = 0
+    for k in range(20000):
+        total += k
+    return total
+
+def test_profiling_covers_a_thread_started_inside(tmp_path):
+    path = str(tmp_path / "run.prof")
+    metrics = instrument.Metrics()
+    done = []
+    with instrument.profiling(metrics, path):
+        t = threading.Thread(target=lambda: done.append(_spin_in_thread()))
+        t.start()
+        t.join(10)
+    # the thread ran to the end instead of dying in its bootstrap
+    assert not t.is_alive() and done == [sum(range(20000))]
+    funcs = {name for _, _, name in pstats.Stats(path).stats}
+    assert "_spin_in_thread" in funcs
+    assert metrics.extra["cprofile"]["path"] == path
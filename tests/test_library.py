@@ -0,0 +1,100 @@
+import json, logging, os, random, shutil
+
+from phyrexian_engine.pipeline import PKG_DIR, list_packages
+from phyrexian_engine.generation.library import PackageLibrary
+from phyrexian_engine.generation.templates import load_packages
+
+PACKS = list_packages()[:12]
+
+def _copy_packs(dst):
+    for name in PACKS:
+        shutil.copy(os.path.join(PKG_DIR, name), dst / name)
+    return [n[:-5] for n in PACKS]
+
+def _probe(effects):
+    """Candidates for every (type, color order, mv) the table knows, filling its pick index."""
+    colors = tuple(sorted(effects))
+    types = sorted({t for by_type in effects.values() for t in by_type})
+    return {(t, order, mv): effects.candidates(t, order, mv)
+            for t in types for order in (colors[:1], colors[:2], colors) for mv in (1, 3, 5)}
+
+def _assert_same(lib_packs, ref_packs):
+    effects, subtypes, pools, keywords = lib_packs
+    ref_effects, ref_subtypes, ref_pools, ref_keywords = ref_packs
+    assert dict(effects) == dict(ref_effects)
+    assert subtypes == ref_subtypes
+    assert pools == ref_pools
+    assert keywords == ref_keywords
+    # also fills the view's pick index, which the next select() may carry over
+    assert _probe(effects) == _probe(ref_effects)
+
+def test_library_matches_load_packages(tmp_path):
+    names = _copy_packs(tmp_path)
+    originals = {n: (tmp_path / f"{n}.json").read_text(encoding="utf-8") for n in names}
+    lib = PackageLibrary(str(tmp_path), cache_dir=str(tmp_path / "cache"))
+    rng = random.Random(1234)
+    selected = []
+    tick = 0
+    for step in range(120):
+        action = rng.random()
+        if action < 0.5 or not selected:
+            # toggle a pack
+            n = rng.choice(names)
+            selected = [s for s in selected if s != n] if n in selected else selected + [n]
+        elif action < 0.8:
+            # edit a selected pack: another pack's content under its name
+            n = rng.choice(selected)
+            path = tmp_path / f"{n}.json"
+            path.write_text(originals[rng.choice(names)], encoding="utf-8")
+            tick += 1
+            st = os.stat(path)
+            os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + tick * 1_000_000_000))
+        elif action < 0.9:
+            # shuffle the selection order
+            rng.shuffle(selected)
+        else:
+            # a pack vanishes, then comes back on a later step
+            n = rng.choice(names)
+            path = tmp_path / f"{n}.json"
+            if path.exists():
+                path.unlink()
+            else:
+                path.write_text(originals[n], encoding="utf-8")
+        present = [n for n in selected if (tmp_path / f"{n}.json").exists()]
+        got = lib.select(selected)
+        ref = load_packages(str(tmp_path), present, use_cache=False, report_tokens=False)
+        _assert_same(got, ref)
+
+def test_poll_picks_up_edits(tmp_path):
+    names = _copy_packs(tmp_path)
+    lib = PackageLibrary(str(tmp_path), cache_dir=str(tmp_path / "cache"))
+    before = lib.select(names[:3])
+    path = tmp_path / f"{names[0]}.json"
+    data = json.loads(path.read_text(encoding="utf-8"))
+    data["creature_subtypes"] = {"W": ["Testling"]}
+    path.write_text(json.dumps(data), encoding="utf-8")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert lib.poll() == [names[0]]
+    assert lib.packs() is not before
+    _assert_same(lib.packs(), load_packages(str(tmp_path), names[:3], use_cache=False, report_tokens=False))
+    assert lib.poll() == []
+
+def test_unknown_tokens_are_reported_once_per_read(tmp_path, caplog):
+    names = _copy_packs(tmp_path)
+    path = tmp_path / "typo.json"
+    path.write_text(json.dumps({"effects_by_color": {"W": {"Instant": [["Gain {N} {LIEF}.", 1, 1, 5]]}}}),
+                    encoding="utf-8")
+    lib = PackageLibrary(str(tmp_path), cache_dir=str(tmp_path / "cache"))
+    caplog.set_level(logging.WARNING, logger="phyrexian_engine.generation.library")
+    lib.select(["typo"] + names[:2])
+    lib.select(["typo"] + names[:3])
+    lib.select(names[:1] + ["typo"])
+    assert [r.getMessage() for r in caplog.records] == \
+        ["Templates in typo.json reference tokens with no string pool: LIEF"]
+    caplog.clear()
+    path.write_text(path.read_text(encoding="utf-8").replace("5]", "4]"), encoding="utf-8")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert lib.poll() == ["typo"]
+    assert len(caplog.records) == 1
@@ -0,0 +1,67 @@
+import threading, time
+
+import pytest
+
+from phyrexian_engine.llm.cache import ResponseCache
+
+def test_hit_after_put(tmp_path):
+    cache = ResponseCache(str(tmp_path / "llm.sqlite"))
+    key = ResponseCache.key("m", "prompt")
+    assert cache.get(key) is None
+    cache.put(key, {"name": "A"})
+    assert cache.get(key) == {"name": "A"}
+    assert cache.get_or_compute(key, lambda: pytest.fail("computed despite a cached value")) == {"name": "A"}
+    cache.close()
+
+def _gated(cache, key, compute, waiters):
+    """Run one owner and `waiters` callers that join its flight; returns each outcome."""
+    started, release = threading.Event(), threading.Event()
+    calls = []
+    def owner_compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return compute()
+    outcomes = {}
+    def run(name, fn):
+        try:
+            outcomes[name] = ("ok", cache.get_or_compute(key, fn))
+        except Exception as e:
+            outcomes[name] = ("error", e)
+    owner = threading.Thread(target=run, args=("owner", owner_compute))
+    owner.start()
+    assert started.wait(5)
+    others = [threading.Thread(target=run, args=(i, lambda: calls.append(1) or {"name": "late"}))
+              for i in range(waiters)]
+    for t in others:
+        t.start()
+    # the waiters have registered once the shared counter says so
+    for _ in range(500):
+        if cache.shared == waiters:
+            break
+        time.sleep(0.01)
+    release.set()
+    for t in [owner] + others:
+        t.join(5)
+    return outcomes, len(calls)
+
+def test_single_flight_shares_one_result(tmp_path):
+    cache = ResponseCache(str(tmp_path / "llm.sqlite"))
+    outcomes, calls = _gated(cache, "k", lambda: {"name": "Once"}, waiters=4)
+    assert calls == 1 and cache.shared == 4
+    assert all(o == ("ok", {"name": "Once"}) for o in outcomes.values())
+    assert cache.get("k") == {"name": "Once"}
+    cache.close()
+
+def test_single_flight_propagates_errors_and_caches_nothing(tmp_path):
+    cache = ResponseCache(str(tmp_path / "llm.sqlite"))
+    boom = RuntimeError("endpoint down")
+    def fail():
+        raise boom
+    outcomes, calls = _gated(cache, "k", fail, waiters=3)
+    assert calls == 1
+    assert all(kind == "error" and err is boom for kind, err in outcomes.values())
+    assert cache.get("k") is None
+    # the failed flight is gone: the next caller computes again
+    assert cache.get_or_compute("k", lambda: {"name": "Retry"}) == {"name": "Retry"}
+    cache.close()
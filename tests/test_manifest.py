@@ -0,0 +1,92 @@
+import json, os
+
+import pytest
+
+from phyrexian_engine.generation import manifest as manifest_mod
+from phyrexian_engine.generation.manifest import PackageManifest, PackInfo, filter_packs, sort_packs
+
+def _pack(path, effects, subtypes=None):
+    path.write_text(json.dumps({"effects_by_color": effects, "creature_subtypes": subtypes or {}}), encoding="utf-8")
+
+def _touch(path):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+@pytest.fixture
+def folder(tmp_path):
+    packs = tmp_path / "packs"
+    packs.mkdir()
+    _pack(packs / "angels.json", {"W": {"Creature": [["Flying.", 1, 1, 6]], "Instant": [["Gain 3 life.", 1, 1, 3]]}},
+          {"W": ["Angel", "Cleric"]})
+    _pack(packs / "pirates.json", {"U": {"Creature": [["Flash.", 1, 1, 6]]}, "R": {"Sorcery": [["Loot.", 1, 1, 4]]}})
+    _pack(packs / "relics.json", {"any": {"Artifact": [["{T}: Add {C}.", 1, 1, 4]]}})
+    return packs
+
+def test_refresh_describes_only_new_and_changed_files(folder, tmp_path, monkeypatch):
+    described = []
+    real = manifest_mod.describe_package
+    def describe(path, *args):
+        described.append(os.path.basename(path))
+        return real(path, *args)
+    monkeypatch.setattr(manifest_mod, "describe_package", describe)
+    index = tmp_path / "manifest.json"
+    m = PackageManifest(str(folder), str(index))
+    assert [p.name for p in m.refresh()] == ["angels", "pirates", "relics"]
+    assert sorted(described) == ["angels.json", "pirates.json", "relics.json"] and m.described == 3
+    angels = m.get("angels.json")
+    assert (angels.colors, angels.templates, angels.types, angels.subtypes) == ("W", 2, {"Creature": 1, "Instant": 1}, 2)
+
+    described.clear()
+    m.refresh()
+    assert described == [] and m.described == 0
+
+    _pack(folder / "pirates.json", {"U": {"Creature": [["Flash.", 1, 1, 6], ["Ward 1.", 1, 2, 5]]}})
+    _touch(folder / "pirates.json")
+    (folder / "relics.json").unlink()
+    _pack(folder / "dragons.json", {"R": {"Creature": [["Flying.", 1, 4, 7]]}})
+    assert [p.name for p in m.refresh()] == ["angels", "dragons", "pirates"]
+    assert sorted(described) == ["dragons.json", "pirates.json"]
+    assert m.get("pirates").templates == 2 and m.get("pirates").colors == "U"
+
+    # a new manifest on the same index starts warm
+    described.clear()
+    again = PackageManifest(str(folder), str(index))
+    assert [p.name for p in again.refresh()] == ["angels", "dragons", "pirates"]
+    assert described == []
+    assert again.get("angels") == angels
+
+def test_old_manifest_version_and_unreadable_packs(folder, tmp_path):
+    index = tmp_path / "manifest.json"
+    PackageManifest(str(folder), str(index)).refresh()
+    data = json.loads(index.read_text(encoding="utf-8"))
+    data["version"] -= 1
+    index.write_text(json.dumps(data), encoding="utf-8")
+    m = PackageManifest(str(folder), str(index))
+    assert m.packs == {}
+    (folder / "broken.json").write_text("{not json", encoding="utf-8")
+    m.refresh()
+    assert m.described == 4 and m.get("broken").error
+    assert "unreadable" in m.get("broken").summary()
+
+def test_filter_by_text_colors_and_type(folder, tmp_path):
+    packs = PackageManifest(str(folder), str(tmp_path / "manifest.json")).refresh()
+    names = lambda ps: [p.name for p in ps]
+    assert names(filter_packs(packs, colors="W")) == ["angels"]
+    assert names(filter_packs(packs, colors="ur")) == ["pirates"]
+    assert names(filter_packs(packs, colors="WR")) == ["angels", "pirates"]
+    assert names(filter_packs(packs, card_type="creature")) == ["angels", "pirates"]
+    assert names(filter_packs(packs, card_type="Artifact")) == ["relics"]
+    assert names(filter_packs(packs, text=" PIR ", colors="U", card_type="Creature")) == ["pirates"]
+    assert names(filter_packs(packs, colors="G")) == []
+    assert names(filter_packs(packs)) == ["angels", "pirates", "relics"]
+
+def test_sort_packs():
+    packs = [PackInfo("b", templates=3, size=10, colors="WU"), PackInfo("a", templates=3, size=30, colors="W any"),
+             PackInfo("C", templates=9, size=20, colors="")]
+    assert [p.name for p in sort_packs(packs)] == ["a", "b", "C"]
+    assert [p.name for p in sort_packs(packs, "name", reverse=True)] == ["C", "b", "a"]
+    assert [p.name for p in sort_packs(packs, "templates", reverse=True)] == ["C", "a", "b"]
+    assert [p.name for p in sort_packs(packs, "size")] == ["b", "C", "a"]
+    assert [p.name for p in sort_packs(packs, "colors", reverse=True)] == ["b", "a", "C"]
+    with pytest.raises(ValueError):
+        sort_packs(packs, "weight")
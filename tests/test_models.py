@@ -0,0 +1,63 @@
+from dataclasses import astuple
+
+import pytest
+
+from phyrexian_engine.models import Card, CardColumns, CardSet, SetSpec, StringTable
+from phyrexian_engine.exporters.json_exporter import export_json
+from phyrexian_engine.pipeline import PKG_DIR, generate_cards, list_packages, plan_set
+from phyrexian_engine.generation.templates import load_packages
+
+SEED = 99
+
+def _generated(n=80):
+    spec = SetSpec(name="Test", code="TST", description="", total_cards=n, seed=SEED,
+                   selected_packages=[p[:-5] for p in list_packages()[:8]])
+    packs = load_packages(PKG_DIR, spec.selected_packages, report_tokens=False)
+    cards = generate_cards(spec, plan_set(spec, SEED), packs, SEED)
+    for i, c in enumerate(cards):
+        c.name = f"Card {i}" if i % 3 else None
+    return spec, cards
+
+def _plain(card):
+    # list fields come back from the columns as tuples
+    return tuple(tuple(v) if isinstance(v, list) else v for v in astuple(card))
+
+def test_card_columns_round_trip():
+    _, cards = _generated()
+    cols = CardColumns.from_cards(cards)
+    assert len(cols) == len(cards)
+    assert [_plain(v.to_card()) for v in cols] == [_plain(c) for c in cards]
+    # repeated strings are stored once
+    common = [v for v in cols if v.rarity == cards[0].rarity]
+    assert len(common) > 1 and all(v.rarity is common[0].rarity for v in common)
+
+def test_card_columns_edge_values():
+    card = Card(temp_id="C1", color_identity=None, types=["Land"], mana_value=0, mana_cost="", rules_text="",
+                rarity="common", power=0, toughness=None)
+    cols = CardColumns(1)
+    cols[0] = card
+    view = cols[0]
+    assert view.color_identity is None and view.rules_text == "" and view.power == 0 and view.toughness is None
+    assert view.typeline() == card.typeline()
+    view.name = "Renamed"
+    assert cols.get(0, "name") == "Renamed"
+    with pytest.raises(IndexError):
+        cols[1]
+
+def test_empty_card_columns():
+    for cols in (CardColumns(), CardColumns.from_cards([])):
+        assert len(cols) == 0
+        assert list(cols) == []
+        assert cols[:] == []
+
+def test_columnar_set_exports_the_same_json(tmp_path):
+    spec, cards = _generated()
+    export_json(CardSet(spec=spec, cards=cards), str(tmp_path / "list.json"))
+    export_json(CardSet(spec=spec, cards=list(cards)).compact(columnar=True), str(tmp_path / "cols.json"))
+    assert (tmp_path / "list.json").read_bytes() == (tmp_path / "cols.json").read_bytes()
+
+def test_string_table_interns_shared_copies():
+    table = StringTable()
+    a, b = table.intern(["Creature", "Elf"]), table.intern(("Creature", "Elf"))
+    assert a is b and a == ("Creature", "Elf")
+    assert table.id(None) == 0 and table.value(0) is None
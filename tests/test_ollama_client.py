@@ -0,0 +1,126 @@
+import socket, time
+
+import pytest
+
+from phyrexian_engine.llm import ollama_client
+from phyrexian_engine.llm.backends import MockBackend
+from phyrexian_engine.llm.cache import ResponseCache
+from phyrexian_engine.llm.fake_server import FakeOllama
+from phyrexian_engine.llm.ollama_client import CircuitBreaker, CircuitOpen, _guarded, _JsonEnd
+from phyrexian_engine.pipeline import check_llm
+
+def _end(*chunks):
+    """(index of the chunk the value closed in, offset in it), or None if it never did."""
+    scan = _JsonEnd()
+    for k, chunk in enumerate(chunks):
+        end = scan.feed(chunk)
+        if end >= 0:
+            return k, end
+    return None
+
+def test_stops_just_past_the_closing_brace():
+    text = '{"name": "A"}\n\nand then the model kept talking {}'
+    assert _end(text) == (0, text.index("}") + 1)
+
+def test_object_split_across_chunks():
+    assert _end('{"na', 'me": {"x"', ': 1}', '}trailing') == (3, 1)
+    assert _end('{"name": ', '"A"') is None
+
+def test_brackets_and_quotes_inside_strings_are_text():
+    text = '{"flavor": "\\"{[ not ]}\\" she said", "art": "}"}'
+    assert _end(text) == (0, len(text))
+    # an escape split from the quote it escapes
+    assert _end('{"a": "x\\', '"}', '"}') == (2, 2)
+
+def test_arrays_and_leading_text():
+    assert _end('[{"a": 1}, {"b": [2]}] rest') == (0, 22)
+    # prose before the value, quotes included, does not open a string
+    assert _end('Sure! "Here" it is: {"a": "}"}') == (0, 30)
+
+def test_generate_against_fake_server():
+    with FakeOllama(latency=0) as srv:
+        res = ollama_client.generate("prompt", model="gemma3:4b", host=srv.host)
+        assert res["name"] == "Quiet Spire 1"
+        assert set(res) == {"name", "art", "flavor"}
+        assert srv.requests == 1
+
+def _fail():
+    raise ConnectionRefusedError("down")
+
+def test_breaker_trips_after_threshold_and_fails_fast():
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=60)
+    for _ in range(2):
+        with pytest.raises(ConnectionRefusedError):
+            _guarded(_fail, breaker)
+    assert breaker.is_open and breaker.trips == 1
+    with pytest.raises(CircuitOpen, match="down"):
+        _guarded(lambda: pytest.fail("called while open"), breaker)
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=60)
+    with pytest.raises(ConnectionRefusedError):
+        _guarded(_fail, breaker)
+    assert _guarded(lambda: 1, breaker) == 1
+    with pytest.raises(ConnectionRefusedError):
+        _guarded(_fail, breaker)
+    assert not breaker.is_open
+
+def test_check_after_cooldown_closes_or_keeps_open():
+    answers = ["still down", None]
+    breaker = CircuitBreaker(cooldown=0.05, check=lambda: answers.pop(0))
+    breaker.trip("probe failed")
+    assert not breaker.allow()          # cooling down: the check is not run yet
+    assert answers == ["still down", None]
+    time.sleep(0.06)
+    assert not breaker.allow()
+    assert breaker.is_open and breaker.last_error == "still down"
+    assert not breaker.allow()          # a failed check starts a new cooldown
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert not breaker.is_open and answers == []
+
+def test_half_open_without_check_lets_one_trial_through():
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=0.05)
+    with pytest.raises(ConnectionRefusedError):
+        _guarded(_fail, breaker)
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert not breaker.allow()          # everyone else waits for the trial
+    breaker.record_success()
+    assert breaker.allow()
+
+def test_check_llm_probes_the_endpoint():
+    with FakeOllama(latency=0) as srv:
+        assert not check_llm("gemma3:4b", srv.host).is_open
+        missing = check_llm("llama3", srv.host)
+        assert missing.is_open and "not available" in missing.last_error
+    # a port nothing listens on (a stopped FakeOllama would still answer pooled connections)
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    down = check_llm("gemma3:4b", f"http://127.0.0.1:{port}")
+    assert down.is_open and "unreachable" in down.last_error
+
+class _NoBatches(MockBackend):
+    def generate_batch(self, prompt, count, singles=None):
+        raise ConnectionError("batch refused")
+
+ITEMS = [("Flying.", 2, "2/2", "Bird"), ("Draw a card.", 1), ("Trample.", 4, "4/4", "Beast")]
+
+def _misses_for_batch(tmp_path, backend, cached):
+    """(hits, misses) added by one batch call over ITEMS, with ITEMS[k] for k in cached stored first."""
+    cache = ResponseCache(str(tmp_path / "llm.sqlite"))
+    for k in cached:
+        cache.put(cache.key(backend.model, ollama_client.build_prompt("Ctx", *ITEMS[k])), {"name": f"cached {k}"})
+    answers = ollama_client.name_art_flavor_batch("Ctx", ITEMS, cache=cache, backend=backend)
+    stats = cache.stats()
+    cache.close()
+    assert [a["name"] for k, a in enumerate(answers) if k in cached] == [f"cached {k}" for k in cached]
+    assert all(a["name"] for a in answers)
+    return stats["hits"], stats["misses"]
+
+def test_lone_uncached_card_counts_one_miss(tmp_path):
+    assert _misses_for_batch(tmp_path, MockBackend(), cached=(0, 2)) == (2, 1)
+
+def test_failed_batch_counts_each_miss_once(tmp_path):
+    assert _misses_for_batch(tmp_path, _NoBatches(), cached=(1,)) == (1, 2)
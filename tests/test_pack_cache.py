@@ -0,0 +1,89 @@
+import json, os
+
+from phyrexian_engine.generation import pack_cache
+from phyrexian_engine.generation.pack_cache import _cache_path, _read_entry, load_compiled
+from phyrexian_engine.generation.templates import load_package
+
+def _set_mtime(path, mtime_ns):
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+class _Compiler:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, raw):
+        self.calls += 1
+        return {"text": raw.decode("utf-8")}
+
+def test_unchanged_stat_is_served_without_compiling(tmp_path):
+    src, cache = tmp_path / "pack.json", str(tmp_path / "cache")
+    src.write_text("one", encoding="utf-8")
+    compile_fn = _Compiler()
+    assert load_compiled(str(src), compile_fn, cache) == {"text": "one"}
+    assert load_compiled(str(src), compile_fn, cache) == {"text": "one"}
+    assert compile_fn.calls == 1
+
+def test_new_stat_with_the_same_content_is_reused(tmp_path):
+    src, cache = tmp_path / "pack.json", str(tmp_path / "cache")
+    src.write_text("one", encoding="utf-8")
+    compile_fn = _Compiler()
+    load_compiled(str(src), compile_fn, cache)
+    st = os.stat(src)
+    # touched, or checked out again: new mtime, same bytes
+    _set_mtime(src, st.st_mtime_ns + 5_000_000_000)
+    assert load_compiled(str(src), compile_fn, cache) == {"text": "one"}
+    assert compile_fn.calls == 1
+    # the entry now carries the new stat, so the next load skips hashing
+    assert _read_entry(_cache_path(cache, str(src)))["mtime_ns"] == st.st_mtime_ns + 5_000_000_000
+
+def test_changed_content_is_compiled_again(tmp_path):
+    src, cache = tmp_path / "pack.json", str(tmp_path / "cache")
+    src.write_text("one", encoding="utf-8")
+    compile_fn = _Compiler()
+    load_compiled(str(src), compile_fn, cache)
+    mtime = os.stat(src).st_mtime_ns
+    # same size, new bytes, new mtime
+    src.write_text("two", encoding="utf-8")
+    _set_mtime(src, mtime + 1_000_000_000)
+    assert load_compiled(str(src), compile_fn, cache) == {"text": "two"}
+    # new size, mtime put back
+    src.write_text("three", encoding="utf-8")
+    _set_mtime(src, mtime)
+    assert load_compiled(str(src), compile_fn, cache) == {"text": "three"}
+    assert compile_fn.calls == 3
+
+def test_version_bump_discards_old_entries(tmp_path, monkeypatch):
+    src, cache = tmp_path / "pack.json", str(tmp_path / "cache")
+    src.write_text("one", encoding="utf-8")
+    compile_fn = _Compiler()
+    load_compiled(str(src), compile_fn, cache)
+    monkeypatch.setattr(pack_cache, "CACHE_VERSION", pack_cache.CACHE_VERSION + 1)
+    assert _read_entry(_cache_path(cache, str(src))) is None
+    load_compiled(str(src), compile_fn, cache)
+    assert compile_fn.calls == 2
+    load_compiled(str(src), compile_fn, cache)
+    assert compile_fn.calls == 2
+
+def test_broken_or_unwritable_cache_is_not_an_error(tmp_path):
+    src, cache = tmp_path / "pack.json", str(tmp_path / "cache")
+    src.write_text("one", encoding="utf-8")
+    compile_fn = _Compiler()
+    load_compiled(str(src), compile_fn, cache)
+    with open(_cache_path(cache, str(src)), "wb") as f:
+        f.write(b"\x80\x05cut short")
+    assert load_compiled(str(src), compile_fn, cache) == {"text": "one"}
+    # a file where the cache folder should be
+    blocked = tmp_path / "blocked"
+    blocked.write_text("", encoding="utf-8")
+    assert load_compiled(str(src), compile_fn, str(blocked)) == {"text": "one"}
+    assert compile_fn.calls == 3
+
+def test_cached_package_equals_a_fresh_parse(tmp_path):
+    src = tmp_path / "pack.json"
+    src.write_text(json.dumps({"effects_by_color": {"W": {"Instant": [["Gain {N} life.", 2, 1, 4]]}},
+                               "creature_subtypes": {"W": ["Cleric"]}, "string_pools": {"X_POOL": ["a"]}}),
+                   encoding="utf-8")
+    cache = str(tmp_path / "cache")
+    fresh = load_package(str(src), use_cache=False)
+    assert load_package(str(src), cache_dir=cache) == fresh
+    assert load_package(str(src), cache_dir=cache) == fresh
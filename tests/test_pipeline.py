@@ -0,0 +1,49 @@
+import threading
+
+import pytest
+
+from phyrexian_engine.models import CardSet, SetSpec
+from phyrexian_engine.pipeline import PKG_DIR, generate_cards, list_packages, plan_set, reroll_card, run_pipeline
+from phyrexian_engine.generation.templates import load_packages
+
+SEED = 4242
+
+def _setup(n=120):
+    spec = SetSpec(name="Test", code="TST", description="", total_cards=n, seed=SEED,
+                   selected_packages=[p[:-5] for p in list_packages()[:10]])
+    packs = load_packages(PKG_DIR, spec.selected_packages, report_tokens=False)
+    return spec, packs, plan_set(spec, SEED)
+
+def test_output_does_not_depend_on_worker_count():
+    spec, packs, plan = _setup()
+    one = generate_cards(spec, plan, packs, SEED, workers=1)
+    two = generate_cards(spec, plan, packs, SEED, workers=2, chunk_size=7)
+    assert len(one) == len(plan)
+    assert one == two
+
+def test_reroll_changes_only_that_card():
+    spec, packs, plan = _setup(60)
+    card_set = CardSet(spec=spec, cards=generate_cards(spec, plan, packs, SEED), plan=plan)
+    before = list(card_set.cards)
+    new = reroll_card(card_set, 17, packs)
+    assert card_set.variants == {17: 1}
+    assert card_set.cards[16] is new
+    assert new != before[16]
+    assert new.types == before[16].types and new.rarity == before[16].rarity
+    assert [c for k, c in enumerate(card_set.cards) if k != 16] == [c for k, c in enumerate(before) if k != 16]
+    # regenerating the current variant gives the same card back
+    assert reroll_card(card_set, 17, packs, new_roll=False) == new
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_pipeline_fails_when_the_generate_thread_dies_early():
+    spec, packs, plan = _setup(20)
+    def kill_generate(*_):
+        # fails in the thread's bootstrap, before produce() can report anything
+        if threading.current_thread().name == "generate":
+            raise ValueError("Another profiling tool is already active")
+    threading.setprofile(kill_generate)
+    try:
+        with pytest.raises(RuntimeError, match="stopped without finishing"):
+            run_pipeline(spec, plan, packs, SEED, use_llm=False)
+    finally:
+        threading.setprofile(None)
@@ -0,0 +1,84 @@
+import os, sqlite3
+
+import pytest
+
+from phyrexian_engine.models import Card, SetSpec
+from phyrexian_engine.exporters.sqlite_exporter import SCHEMA_VERSION, write_sqlite
+
+SPEC = SetSpec(name="Test Set", code="TST", description="Æther-lit spires", seed=7)
+
+def _cards():
+    return [
+        Card(temp_id="C1", color_identity="WU", types=["Artifact", "Creature"], mana_value=3, mana_cost="{1}{W}{U}",
+             rules_text="Flying\nWhen this creature enters, scry 1.", rarity="uncommon", power=2, toughness=2,
+             subtypes=["Spirit"], name="Gilded Warden"),
+        Card(temp_id="C2", color_identity=None, types=["Artifact"], mana_value=0, mana_cost="{0}",
+             rules_text="", rarity="rare", name="Blank Idol"),
+    ]
+
+def _rows(path, sql):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+def test_schema_and_rows(tmp_path):
+    path = str(tmp_path / "set.db")
+    assert write_sqlite(SPEC, _cards(), path) == 1
+    assert not os.path.exists(path + ".tmp")
+    tables = {n for (n,) in _rows(path, "SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert tables == {"sets", "cards", "types", "subtypes", "card_types", "card_subtypes", "rules_lines"}
+    assert _rows(path, "PRAGMA user_version") == [(SCHEMA_VERSION,)]
+    assert _rows(path, "SELECT name, code, seed, total FROM sets") == [("Test Set", "TST", 7, 2)]
+    assert _rows(path, "SELECT number, name, color_identity FROM cards ORDER BY id") == [
+        (1, "Gilded Warden", "WU"), (2, "Blank Idol", "C")]
+    assert _rows(path, """SELECT t.name FROM card_types ct JOIN types t ON t.id = ct.type_id
+                          WHERE ct.card_id = 1 ORDER BY ct.position""") == [("Artifact",), ("Creature",)]
+    assert _rows(path, "SELECT card_id, line_no, text FROM rules_lines") == [
+        (1, 1, "Flying"), (1, 2, "When this creature enters, scry 1.")]
+
+def test_empty_set_has_total_zero(tmp_path):
+    path = str(tmp_path / "empty.db")
+    write_sqlite(SPEC, [], path)
+    assert _rows(path, "SELECT total FROM sets") == [(0,)]
+
+def test_append_adds_a_set_and_reuses_type_ids(tmp_path):
+    path = str(tmp_path / "set.db")
+    write_sqlite(SPEC, _cards(), path)
+    types = _rows(path, "SELECT id, name FROM types ORDER BY id")
+    assert write_sqlite(SPEC, iter(_cards()), path, append=True) == 2
+    assert _rows(path, "SELECT id, total FROM sets") == [(1, 2), (2, 2)]
+    assert _rows(path, "SELECT id, name FROM types ORDER BY id") == types
+    assert _rows(path, "SELECT COUNT(*) FROM subtypes") == [(1,)]
+    # the second set's cards point at the same type rows, with fresh card ids
+    assert _rows(path, "SELECT card_id, type_id FROM card_types WHERE card_id > 2 ORDER BY card_id, position") == \
+        [(3, types[0][0]), (3, types[1][0]), (4, types[0][0])]
+    # replacing drops the earlier sets
+    write_sqlite(SPEC, _cards(), path)
+    assert _rows(path, "SELECT id FROM sets") == [(1,)]
+
+def test_failed_replace_keeps_old_file_and_leaves_no_tmp(tmp_path):
+    path = str(tmp_path / "set.db")
+    write_sqlite(SPEC, _cards(), path)
+    with open(path, "rb") as f:
+        before = f.read()
+    def broken():
+        yield from _cards()
+        raise RuntimeError("generation failed")
+    with pytest.raises(RuntimeError, match="generation failed"):
+        write_sqlite(SPEC, broken(), path)
+    assert not os.path.exists(path + ".tmp")
+    with open(path, "rb") as f:
+        assert f.read() == before
+
+def test_failed_append_rolls_back(tmp_path):
+    path = str(tmp_path / "set.db")
+    write_sqlite(SPEC, _cards(), path)
+    def broken():
+        yield _cards()[0]
+        raise RuntimeError("generation failed")
+    with pytest.raises(RuntimeError):
+        write_sqlite(SPEC, broken(), path, append=True)
+    assert _rows(path, "SELECT id FROM sets") == [(1,)]
+    assert _rows(path, "SELECT COUNT(*) FROM cards") == [(2,)]
@@ -0,0 +1,70 @@
+import itertools, random, re
+
+from phyrexian_engine.pipeline import PKG_DIR, list_packages
+from phyrexian_engine.generation.strings import (DEFAULT_POOLS, SKIP_TOKENS, _pick_color_word, compile_template,
+                                                 finalize_effect_template, render_template, unknown_tokens)
+from phyrexian_engine.generation.templates import load_packages
+
+class _PoolRng:
+    """choice() depends on the seed and the pool only, not on how many draws came before."""
+    def __init__(self, seed):
+        self.seed = seed
+
+    def choice(self, seq):
+        return seq[random.Random(f"{self.seed}|{seq!r}").randrange(len(seq))]
+
+def _sub(text, token, value):
+    return re.sub(rf"(\{{{token}\}}|\[{token}\])", lambda m: value, text, flags=re.IGNORECASE)
+
+def _tokens(text):
+    return {(m.group(1) or m.group(2)).upper() for m in re.finditer(r"\{([A-Za-z0-9_/]+)\}|\[([A-Za-z0-9_/]+)\]", text)}
+
+def _reference(template, colors, mv, string_pools, subtypes_pool, rng, order):
+    # what finalize_effect_template did before templates were compiled: one regex pass per
+    # token, in the order its token set happened to iterate, then numbers and colors
+    text = template
+    for tok in order:
+        if tok in SKIP_TOKENS or tok in {"N", "X", "X/X", "C"}:
+            continue
+        if tok == "TOKEN_SUBTYPE":
+            merged = list(string_pools.get("TOKEN_SUBTYPE", []))
+            for c in colors or []:
+                merged += subtypes_pool.get(c, [])
+            value = rng.choice(merged or ["Soldier", "Spirit", "Zombie", "Wolf"])
+        elif tok in {"TOKEN_COLOR", "COLOR_WORD"}:
+            pool = string_pools.get(tok, DEFAULT_POOLS.get(tok, []))
+            value = rng.choice(pool) if pool else "{C}"
+        else:
+            pool = string_pools.get(tok)
+            if not pool or not isinstance(pool, list):
+                pool = DEFAULT_POOLS.get(tok)
+            value = rng.choice(pool) if pool else None
+        if value is not None:
+            text = _sub(text, tok, value)
+    text = _sub(text, "N", str(max(1, min(5, mv))))
+    x = max(1, min(6, mv))
+    text = re.sub(r"(\{X\}|\[X\])\s*/\s*(\{X\}|\[X\])", f"{x}/{x}", text, flags=re.IGNORECASE)
+    text = _sub(text, "X", str(x))
+    text = _sub(text, "C", _pick_color_word(colors))
+    lines = [re.sub(r"\s+", " ", ln).strip() for ln in text.splitlines()]
+    while lines and lines[-1] == "":
+        lines.pop()
+    return "\n".join(lines)
+
+def test_render_matches_the_regex_renderer_on_shipped_packs():
+    effects, subtypes, pools, _ = load_packages(PKG_DIR, list_packages(), use_cache=False, report_tokens=False)
+    templates = sorted({e[0] for by_type in effects.values() for entries in by_type.values() for e in entries})
+    assert len(templates) > 1000
+    for k, tpl in enumerate(templates):
+        colors, mv = (["WUBRG"[k % 5]] if k % 6 else []), k % 7
+        got = render_template(compile_template(tpl), colors, mv, pools, subtypes, _PoolRng(k))
+        assert finalize_effect_template(tpl, colors, mv, pools, subtypes, _PoolRng(k)) == got
+        # the old renderer's output hung on set order when a pool value holds another token
+        # of the template ({BOLSTER_REMINDER} carries {BOLSTER_N}); the new one is one of them
+        orders = itertools.permutations(sorted(_tokens(tpl)))
+        assert any(_reference(tpl, colors, mv, pools, subtypes, _PoolRng(k), order) == got for order in orders), tpl
+
+def test_symbols_are_not_unknown_tokens():
+    symbols = {"1", "10", "W", "1U", "2G", "2WW", "CC", "EEE", "X", "X2", "2/W", "G/P", "T", "Q", "TAP", "UNTAP"}
+    assert unknown_tokens(symbols, {}) == set()
+    assert unknown_tokens({"TRIGER_INTRO", "THIS", "TRIGGER_INTRO"}, {}) == {"TRIGER_INTRO", "THIS"}
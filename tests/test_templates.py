@@ -0,0 +1,104 @@
+import random
+from collections import Counter
+
+from phyrexian_engine.pipeline import PKG_DIR, list_packages
+from phyrexian_engine.generation.cardgen import _append_unique_effects
+from phyrexian_engine.generation.templates import EffectTable, load_packages, pick_effect, sample_effects
+
+def _linear_pick(effects, type_key, colors, mv, rng):
+    # pick_effect before the index: gather candidates in search order, walk the weights
+    order = list(dict.fromkeys(colors or []))
+    order += [c for c in ("any", "C") if c not in order]
+    candidates = [(t, w) for col in order for t, w, mn, mx in effects.get(col, {}).get(type_key, []) if mn <= mv <= mx]
+    if not candidates:
+        return ""
+    total = sum(max(0, w) for _, w in candidates)
+    if total <= 0:
+        return rng.choice(candidates)[0]
+    r = rng.randint(1, total)
+    acc = 0
+    for tmpl, w in candidates:
+        acc += max(0, w)
+        if r <= acc:
+            return tmpl
+
+KEYS = [(typ, colors, mv) for typ in ("Creature", "Instant", "Enchantment", "Artifact")
+        for colors in (["W"], ["U", "B"], ["G", "R", "G"], []) for mv in (1, 3, 6)]
+
+def test_indexed_pick_matches_linear_pick_draw_for_draw():
+    effects = load_packages(PKG_DIR, list_packages(), use_cache=False, report_tokens=False)[0]
+    assert isinstance(effects, EffectTable)
+    plain = {color: dict(by_type) for color, by_type in effects.items()}
+    picked = 0
+    for key in KEYS:
+        for seed in range(40):
+            got = pick_effect(effects, {}, {}, *key, rng=random.Random(seed))
+            assert got == _linear_pick(plain, *key, random.Random(seed)), key
+            picked += bool(got)
+    assert picked > len(KEYS) * 20
+
+def test_cumulative_weights_follow_template_weights():
+    effects = load_packages(PKG_DIR, list_packages(), use_cache=False, report_tokens=False)[0]
+    for typ, colors, mv in KEYS:
+        templates, cum, total = effects.candidates(typ, tuple(dict.fromkeys(colors + ["any", "C"])), mv)
+        weights = [w for col in dict.fromkeys(colors + ["any", "C"])
+                   for _, w, mn, mx in effects.get(col, {}).get(typ, []) if mn <= mv <= mx]
+        assert len(templates) == len(cum) == len(weights)
+        assert [c - p for c, p in zip(cum, (0,) + cum[:-1])] == [max(0, w) for w in weights]
+        assert total == (cum[-1] if cum else 0)
+
+def test_zero_and_negative_weights():
+    table = EffectTable({"W": {"Instant": [["a", 0, 1, 5], ["b", -2, 1, 5], ["c", 3, 1, 5]]},
+                         "U": {"Instant": [["d", 0, 1, 5]]}})
+    # zero-weight templates are never drawn while any weight is positive
+    assert {pick_effect(table, {}, {}, "Instant", ["W"], 2, random.Random(s)) for s in range(50)} == {"c"}
+    # all zero: uniform, as before
+    for s in range(50):
+        assert (pick_effect(table, {}, {}, "Instant", ["U"], 2, random.Random(s))
+                == _linear_pick(table, "Instant", ["U"], 2, random.Random(s)))
+    assert pick_effect(table, {}, {}, "Instant", ["W"], 9, random.Random(0)) == ""
+
+def _table(entries, other=()):
+    return EffectTable({"W": {"Instant": [list(e) for e in entries]}, "any": {"Instant": [list(e) for e in other]}})
+
+def test_sample_effects_yields_each_template_once():
+    # "a" is in two buckets; "z" has no weight
+    table = _table([("a", 2, 1, 5), ("b", 1, 1, 5), ("z", 0, 1, 5)], [("a", 1, 1, 5), ("c", 1, 1, 5)])
+    for seed in range(30):
+        got = list(sample_effects(table, "Instant", ["W"], 3, random.Random(seed)))
+        assert sorted(got) == ["a", "b", "c"]
+        # the first draw is the one pick_effect makes
+        assert got[0] == pick_effect(table, {}, {}, "Instant", ["W"], 3, random.Random(seed))
+
+def test_sample_effects_with_one_heavy_template():
+    # after "heavy" is drawn, redraws from the full index almost always hit it again,
+    # so the rest comes from the explicit list, still weighted
+    table = _table([("heavy", 100000, 1, 5), ("x", 1, 1, 5), ("y", 3, 1, 5)])
+    seconds = Counter()
+    for seed in range(2000):
+        got = list(sample_effects(table, "Instant", ["W"], 3, random.Random(seed)))
+        assert sorted(got) == ["heavy", "x", "y"]
+        if got[0] == "heavy":
+            seconds[got[1]] += 1
+    assert sum(seconds.values()) > 1990
+    assert 0.70 < seconds["y"] / sum(seconds.values()) < 0.80
+
+def test_sample_effects_all_zero_weights_is_a_uniform_order():
+    table = _table([("a", 0, 1, 5), ("b", 0, 1, 5), ("a", 0, 1, 5)])
+    firsts = Counter(next(sample_effects(table, "Instant", ["W"], 3, random.Random(s))) for s in range(400))
+    assert set(firsts) == {"a", "b"} and min(firsts.values()) > 150
+    assert sorted(sample_effects(table, "Instant", ["W"], 3, random.Random(1))) == ["a", "b"]
+
+def test_append_unique_effects_skips_existing_lines_and_runs_dry():
+    table = _table([("Draw a card.", 5, 1, 5), ("Scry {N}.", 1, 1, 5), ("draw a card.", 1, 1, 5)])
+    for seed in range(20):
+        parts = ["Draw a card."]
+        added = _append_unique_effects(parts, type_key="Instant", slots=3, colors=["W"], mv=2, effects=table,
+                                       string_pools={}, subtypes_pool={}, fallback_text="Fallback.",
+                                       rng=random.Random(seed))
+        # only "Scry 2." is new; the pool is too small for three slots
+        assert added == 1 and parts == ["Draw a card.", "Scry 2."]
+    parts = ["Scry 2.", "draw a card."]
+    assert _append_unique_effects(parts, type_key="Instant", slots=2, colors=["W"], mv=2, effects=table,
+                                  string_pools={}, subtypes_pool={}, fallback_text="Gain {N} life.") == 0
+    assert parts == ["Scry 2.", "draw a card.", "Gain 2 life."]